@@ -14,6 +14,7 @@ from pathlib import Path
 import django.contrib.auth.management
 import os
 from dotenv import load_dotenv
+from kombu import Queue
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -187,6 +188,47 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 
+# Colas separadas para que una rafaga de uniones no deje sin workers al
+# analisis (y viceversa):
+# - media: union de videos y transferencias a S3 (I/O, alta concurrencia)
+# - analysis: analisis de comportamiento (CPU, concurrencia = nucleos)
+# - maintenance: limpieza y tareas livianas (cola por defecto)
+# Ejemplo de workers:
+#   celery -A administradormonitoreo worker -Q media -c 16
+#   celery -A administradormonitoreo worker -Q analysis -c <nucleos>
+#   celery -A administradormonitoreo worker -Q maintenance -c 2
+CELERY_TASK_QUEUES = (
+    Queue("media"),
+    Queue("analysis"),
+    Queue("maintenance"),
+)
+CELERY_TASK_DEFAULT_QUEUE = "maintenance"
+CELERY_TASK_ROUTES = {
+    "behavior_analysis.tasks.process_participant_completion_task": {"queue": "media"},
+    "behavior_analysis.tasks.merge_participant_videos_task": {"queue": "media"},
+    "behavior_analysis.tasks.rolling_merge_task": {"queue": "media"},
+    "behavior_analysis.tasks.analyze_behavior_task": {"queue": "analysis"},
+    "behavior_analysis.tasks.analyze_fragment_task": {"queue": "analysis"},
+    "behavior_analysis.tasks.stitch_fragments_task": {"queue": "analysis"},
+    "behavior_analysis.tasks.analyze_merged_video_task": {"queue": "analysis"},
+    "behavior_analysis.tasks.finalize_event_completion_task": {"queue": "maintenance"},
+    "behavior_analysis.tasks.render_report_task": {"queue": "maintenance"},
+    "events.tasks.*": {"queue": "maintenance"},
+}
+# Las tareas son largas: cada proceso reserva una sola a la vez y las de
+# analisis se confirman al terminar (acks_late) para reencolarse si el
+# worker muere
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Locks en Redis para no repetir uniones/analisis/fin de evento en curso
+TASK_LOCKS_ENABLED = os.getenv("TASK_LOCKS", "true").strip().lower() in ("1", "true", "yes")
+# Prioridades 0-9 por cola en Redis (0 = mas alta); el planificador de fin de
+# evento despacha primero a los participantes con mas carga
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    "queue_order_strategy": "priority",
+}
+
 CORS_ALLOW_ALL_ORIGINS = False
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
@@ -12,3 +12,6 @@ DATABASES = {
 PASSWORD_HASHERS = [
     "django.contrib.auth.hashers.MD5PasswordHasher",
 ]
+
+# Los tests no tienen Redis; los locks de tareas se prueban con un cliente falso.
+TASK_LOCKS_ENABLED = False
@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+    import resource
+except ImportError:  # Windows: sin flock no se comparte el presupuesto entre procesos
+    fcntl = None
+    resource = None
+
+from events.s3_service import s3_service
+from .probe import probar_video
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Memoria fija de un proceso de analisis (modelos de MediaPipe, OpenCV, etc.)
+MEMORIA_BASE = int(os.getenv("ANALYSIS_MEMORY_BASE_MB", "600")) * MB
+# Lipsync carga el audio a 44.1 kHz estereo en float64 y lo copia a mono y
+# filtrado (~4 canales de float64 vivos a la vez)
+BYTES_AUDIO_LIPSYNC_POR_SEGUNDO = 44100 * 8 * 4
+# Voz: audio a 16 kHz en float32 mas sus segmentos
+BYTES_AUDIO_VOZ_POR_SEGUNDO = 16000 * 4 * 2
+# Listas por frame (envolventes, timestamps, detecciones)
+BYTES_POR_FRAME = 64
+# Buffers de frame simultaneos (BGR, RGB, copias de MediaPipe)
+FRAMES_EN_MEMORIA = 8
+# Peso de cada nueva medicion en el factor de correccion
+ALFA_CORRECCION = 0.3
+
+
+class AdmisionDiferida(Exception):
+    """El trabajo no cabe ahora en el presupuesto de memoria del host."""
+
+
+def _memoria_fisica():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return 8 * 1024 * MB
+
+
+def _rss_actual():
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return 0
+        # ru_maxrss esta en KB en Linux: es el pico del proceso, no el actual
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ControlAdmision:
+    """
+    Presupuesto de memoria por host compartido entre los procesos worker:
+    las reservas viven en un archivo JSON protegido con flock dentro de
+    `directorio`. El historial de picos medidos ajusta un factor de
+    correccion que escala las estimaciones.
+    """
+
+    def __init__(self, directorio, presupuesto):
+        self.directorio = directorio
+        self.presupuesto = presupuesto
+        os.makedirs(directorio, exist_ok=True)
+        self._reservas = os.path.join(directorio, "reservas.json")
+        self._historial = os.path.join(directorio, "historial.json")
+
+    def estimar(self, info, perfil="completo"):
+        """Pico de memoria estimado (bytes, sin corregir) a partir de ffprobe."""
+        info = info or {}
+        duracion = info.get("duracion") or 0.0
+        video = info.get("video") or {}
+        ancho = int(video.get("width") or 1280)
+        alto = int(video.get("height") or 720)
+        fps = _fps(video.get("r_frame_rate")) or 30.0
+
+        estimado = MEMORIA_BASE + ancho * alto * 3 * FRAMES_EN_MEMORIA
+        estimado += duracion * fps * BYTES_POR_FRAME
+        estimado += duracion * BYTES_AUDIO_VOZ_POR_SEGUNDO
+        if perfil == "completo":
+            estimado += duracion * BYTES_AUDIO_LIPSYNC_POR_SEGUNDO
+        return int(estimado)
+
+    def factor_correccion(self):
+        with self._bloqueo():
+            return self._leer(self._historial).get("factor", 1.0)
+
+    def reservar(self, bytes_):
+        """
+        Reserva `bytes_` del presupuesto. Retorna un token, o None si no cabe.
+        Un trabajo siempre se admite si no hay otros en curso, para que los
+        que superan el presupuesto no esperen para siempre.
+        """
+        with self._bloqueo():
+            reservas = {
+                token: r
+                for token, r in self._leer(self._reservas).items()
+                if _proceso_vivo(r["pid"])
+            }
+            en_uso = sum(r["bytes"] for r in reservas.values())
+            if reservas and en_uso + bytes_ > self.presupuesto:
+                self._escribir(self._reservas, reservas)
+                return None
+            token = uuid.uuid4().hex
+            reservas[token] = {"bytes": bytes_, "pid": os.getpid(), "desde": time.time()}
+            self._escribir(self._reservas, reservas)
+            return token
+
+    def liberar(self, token):
+        with self._bloqueo():
+            reservas = self._leer(self._reservas)
+            if reservas.pop(token, None) is not None:
+                self._escribir(self._reservas, reservas)
+
+    def registrar_pico(self, estimado, medido):
+        """Actualiza el factor de correccion con el pico medido de un trabajo."""
+        if estimado <= 0 or medido <= 0:
+            return
+        with self._bloqueo():
+            historial = self._leer(self._historial)
+            factor = historial.get("factor", 1.0)
+            ratio = medido / estimado
+            historial["factor"] = round(
+                (1 - ALFA_CORRECCION) * factor + ALFA_CORRECCION * ratio, 4
+            )
+            historial["muestras"] = historial.get("muestras", 0) + 1
+            self._escribir(self._historial, historial)
+
+    def _leer(self, path):
+        try:
+            with open(path) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def _escribir(self, path, data):
+        parcial = f"{path}.{os.getpid()}.tmp"
+        with open(parcial, "w") as handle:
+            json.dump(data, handle)
+        os.replace(parcial, path)
+
+    @contextmanager
+    def _bloqueo(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directorio, "admision.lock"), "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _fps(valor):
+    try:
+        num, den = str(valor).split("/")
+        return float(num) / float(den) if float(den) else None
+    except (ValueError, TypeError):
+        return None
+
+
+@contextmanager
+def medir_pico_rss(intervalo=0.5):
+    """
+    Muestrea el RSS del proceso durante el bloque y deja en el dict el pico
+    por encima del RSS al entrar: la memoria que el worker ya ocupaba (otros
+    trabajos, modelos cargados antes) no se atribuye a este trabajo.
+    """
+    medicion = {"pico": 0}
+    inicial = _rss_actual()
+    detener = threading.Event()
+
+    def muestrear():
+        while True:
+            medicion["pico"] = max(medicion["pico"], _rss_actual() - inicial)
+            if detener.wait(intervalo):
+                return
+
+    hilo = threading.Thread(target=muestrear, daemon=True)
+    hilo.start()
+    try:
+        yield medicion
+    finally:
+        detener.set()
+        hilo.join()
+        medicion["pico"] = max(medicion["pico"], _rss_actual() - inicial)
+
+
+def admision_habilitada():
+    return os.getenv("ANALYSIS_ADMISSION", "false").strip().lower() in ("1", "true", "yes")
+
+
+def control_desde_env():
+    """ControlAdmision segun ANALYSIS_MEMORY_BUDGET_MB / ANALYSIS_ADMISSION_DIR."""
+    presupuesto_mb = int(os.getenv("ANALYSIS_MEMORY_BUDGET_MB", "0"))
+    presupuesto = presupuesto_mb * MB if presupuesto_mb > 0 else int(_memoria_fisica() * 0.8)
+    directorio = os.getenv("ANALYSIS_ADMISSION_DIR") or os.path.join(
+        tempfile.gettempdir(), "evaltech-admission"
+    )
+    return ControlAdmision(directorio, presupuesto)
+
+
+@contextmanager
+def admitir(video_path, perfil="completo"):
+    """
+    Reserva la memoria estimada de analizar `video_path` (key de S3 o ruta
+    local) mientras dura el bloque; lanza AdmisionDiferida si no cabe.
+    Al terminar registra el crecimiento del RSS medido para mejorar la
+    estimacion.
+    """
+    if not admision_habilitada():
+        yield
+        return
+
+    control = control_desde_env()
+    fuente = video_path if os.path.exists(video_path) else s3_service.generate_presigned_url(video_path)
+    estimado = control.estimar(probar_video(fuente) if fuente else None, perfil)
+    reservado = int(estimado * control.factor_correccion())
+    token = control.reservar(reservado)
+    if token is None:
+        raise AdmisionDiferida(
+            f"Analysis of {video_path} needs ~{reservado // MB} MB; budget {control.presupuesto // MB} MB in use"
+        )
+
+    logger.info(f"Admitted analysis of {video_path} (~{reservado // MB} MB reserved)")
+    try:
+        with medir_pico_rss() as medicion:
+            yield
+        control.registrar_pico(estimado, medicion["pico"])
+    finally:
+        control.liberar(token)
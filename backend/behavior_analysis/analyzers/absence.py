@@ -1,6 +1,8 @@
 import mediapipe as mp
 import cv2
 
+from ..intervalos import ConjuntoIntervalos
+
 
 class AnalizadorAusencia:
     def __init__(
@@ -23,35 +25,14 @@ class AnalizadorAusencia:
         self.absent_since = None
         self.present_since = None
         self.absence_intervals = []  # (start, end)
-        self._interval_keys = set()
         self.last_timestamp = 0
 
     def _append_interval(self, start_time, end_time):
+        # Los repetidos se funden al finalizar (misma fusion que el resto)
         if end_time <= start_time:
             return
-        start_rounded = round(start_time, 2)
-        end_rounded = round(end_time, 2)
-        key = (start_rounded, end_rounded)
-        if key in self._interval_keys:
-            return
-        self._interval_keys.add(key)
         self.absence_intervals.append((start_time, end_time))
 
-    def _merge_intervals(self, intervals):
-        if not intervals:
-            return []
-        intervals = sorted(intervals, key=lambda item: item[0])
-        merged = []
-        current_start, current_end = intervals[0]
-        for start, end in intervals[1:]:
-            if start <= current_end + self.merge_gap_seconds:
-                current_end = max(current_end, end)
-            else:
-                merged.append((current_start, current_end))
-                current_start, current_end = start, end
-        merged.append((current_start, current_end))
-        return merged
-
     def procesar_frame(self, frame, timestamp):
         self.last_timestamp = timestamp
         image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -93,11 +74,10 @@ class AnalizadorAusencia:
         if self.absence_start_time is not None:
             self._append_interval(self.absence_start_time, final_timestamp)
             self.absence_start_time = None
-        merged = self._merge_intervals(self.absence_intervals)
-        resultados = []
-        for start, end in merged:
-            duration = end - start
-            if duration < self.min_absence_duration:
-                continue
-            resultados.append((round(start, 2), round(end, 2), round(duration, 2)))
-        return resultados
+        return (
+            ConjuntoIntervalos.desde_pares(self.absence_intervals)
+            .unir(self.merge_gap_seconds)
+            .filtrar_duracion(self.min_absence_duration)
+            .redondear()
+            .a_tuplas(duracion=True)
+        )
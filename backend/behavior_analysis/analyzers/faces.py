@@ -3,11 +3,13 @@ import os
 import numpy as np
 from urllib.request import urlretrieve
 
+from ..intervalos import ConjuntoIntervalos
+
 
 class AnalizadorRostros:
-    def __init__(self):
+    def __init__(self, frame_stride=5):
         self.process_width = 640
-        self.frame_stride = 5
+        self.frame_stride = frame_stride
         self.frame_count = 0
 
         self.det_path, self.rec_path = self._ensure_models_exist()
@@ -134,15 +136,8 @@ class AnalizadorRostros:
                     }
                     self.next_person_id += 1
 
-    def obtener_resultados(self):
-        """
-        Retorna una lista de diccionarios con los intervalos detectados.
-        Filtra ruido (apariciones menores a 1 segundo) y renumera IDs secuencialmente.
-        """
-        resultados = []
-        seen = set()
-
-        # Filtrar y ordenar personas por primera aparición
+    def _personas_validas(self):
+        """Personas con al menos 1s de aparición, ordenadas por primera aparición."""
         valid_people = []
         for pid, data in self.known_people.items():
             total_time = sum([end - start for start, end in data["intervals"]])
@@ -153,23 +148,35 @@ class AnalizadorRostros:
 
         # Ordenar por tiempo de primera aparición
         valid_people.sort(key=lambda x: x[0])
+        return valid_people
+
+    def obtener_firmas(self):
+        """
+        Retorna {persona_id: embedding} con los mismos IDs que obtener_resultados,
+        para poder reconciliar identidades entre análisis de distintos fragmentos.
+        """
+        return {
+            idx: np.asarray(data["embedding"], dtype=float).ravel().tolist()
+            for idx, (_, _, data) in enumerate(self._personas_validas(), start=1)
+        }
+
+    def obtener_resultados(self):
+        """
+        Retorna una lista de diccionarios con los intervalos detectados.
+        Filtra ruido (apariciones menores a 1 segundo) y renumera IDs secuencialmente.
+        """
+        valid_people = self._personas_validas()
 
         # Renumerar con IDs limpios (1, 2, 3...)
+        pares, personas = [], []
         for idx, (_, old_pid, data) in enumerate(valid_people, start=1):
-            for start, end in data["intervals"]:
-                start_rounded = round(start, 2)
-                end_rounded = round(end, 2)
-                key = (idx, start_rounded, end_rounded)
-                if key in seen:
-                    continue
-                seen.add(key)
-                resultados.append(
-                    {
-                        "persona_id": idx,
-                        "tiempo_inicio": start_rounded,
-                        "tiempo_fin": end_rounded,
-                    }
-                )
+            pares.extend(data["intervals"])
+            personas.extend([idx] * len(data["intervals"]))
+        resultados = (
+            ConjuntoIntervalos.desde_pares(pares, personas)
+            .redondear()
+            .a_filas("persona_id")
+        )
 
         print(
             f"\n  [Rostros] Detectadas {len(valid_people)} personas únicas (filtrado ruido < 1s)"
@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 
+from ..intervalos import ConjuntoIntervalos
+
 class AnalizadorGestos:
     def __init__(self, consulta_min_duration=1.5):
         self.consulta_min_duration = consulta_min_duration
@@ -105,40 +107,17 @@ class AnalizadorGestos:
             self.current_gesture = "Forward"
 
     def obtener_resultados(self):
-        # Tu misma lógica de filtrado, sin cambios
-        grouped_gestures = {}
-        for interval in self.gesture_intervals:
-            duration = interval["end"] - interval["start"]
-            if duration <= 0.2:
-                continue
-
-            g_type = interval["gesture"]
-            if g_type not in grouped_gestures:
-                grouped_gestures[g_type] = []
-
-            if grouped_gestures[g_type] and (
-                interval["start"] - grouped_gestures[g_type][-1][1] < 0.5
-            ):
-                prev_start, prev_end = grouped_gestures[g_type].pop()
-                grouped_gestures[g_type].append((prev_start, interval["end"]))
-            else:
-                grouped_gestures[g_type].append((interval["start"], interval["end"]))
-
-        resultados = []
-        seen = set()
-        for gesture, ranges in grouped_gestures.items():
-            for start, end in ranges:
-                duracion = end - start
-                if duracion >= self.consulta_min_duration:
-                    item = {
-                        "tipo_gesto": gesture,
-                        "tiempo_inicio": round(start, 2),
-                        "tiempo_fin": round(end, 2),
-                        "duracion": round(duracion, 2),
-                    }
-                    key = (item["tipo_gesto"], item["tiempo_inicio"], item["tiempo_fin"])
-                    if key in seen:
-                        continue
-                    seen.add(key)
-                    resultados.append(item)
-        return resultados
+        # Descarta parpadeos (<= 0.2 s), funde los del mismo gesto separados
+        # por menos de 0.5 s y conserva los que alcanzan la duracion minima
+        return (
+            ConjuntoIntervalos(
+                [i["start"] for i in self.gesture_intervals],
+                [i["end"] for i in self.gesture_intervals],
+                [i["gesture"] for i in self.gesture_intervals],
+            )
+            .filtrar_duracion(0.2, estricto=True)
+            .unir(0.5, estricto=True)
+            .filtrar_duracion(self.consulta_min_duration)
+            .redondear()
+            .a_filas("tipo_gesto", duracion=True)
+        )
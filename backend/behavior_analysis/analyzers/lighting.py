@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 
+from ..intervalos import ConjuntoIntervalos
+
 
 class AnalizadorIluminacion:
     def __init__(self):
@@ -259,57 +261,11 @@ class AnalizadorIluminacion:
 
     def obtener_resultados(self):
         """Fusiona intervalos cercanos y filtra por duración"""
-        if not self.anomaly_intervals:
-            return []
-
-        # Ordenar intervalos
-        intervals = sorted(self.anomaly_intervals, key=lambda x: x[0])
-
-        # Fusionar intervalos cercanos (múltiples pasadas para asegurar unión completa)
-        merged = []
-        curr_start, curr_end = intervals[0]
-
-        for next_start, next_end in intervals[1:]:
-            # Si el gap es menor o igual al umbral, fusionar
-            if next_start <= curr_end + self.MERGE_GAP_SECONDS:
-                curr_end = max(curr_end, next_end)
-            else:
-                merged.append((curr_start, curr_end))
-                curr_start, curr_end = next_start, next_end
-        merged.append((curr_start, curr_end))
-
-        # Segunda pasada de fusión (por si hay casos complejos)
-        if len(merged) > 1:
-            final_merged = []
-            curr_start, curr_end = merged[0]
-
-            for next_start, next_end in merged[1:]:
-                if next_start <= curr_end + self.MERGE_GAP_SECONDS:
-                    curr_end = max(curr_end, next_end)
-                else:
-                    final_merged.append((curr_start, curr_end))
-                    curr_start, curr_end = next_start, next_end
-            final_merged.append((curr_start, curr_end))
-            merged = final_merged
-
-        # Filtrar por duración razonable
-        resultados = []
-        seen = set()
-        for start, end in merged:
-            duration = end - start
-            # Solo validar duración mínima, el máximo es más flexible después de fusionar
-            if duration >= self.SUSPICIOUS_MIN_DURATION:
-                start_rounded = round(start, 2)
-                end_rounded = round(end, 2)
-                key = (start_rounded, end_rounded)
-                if key in seen:
-                    continue
-                seen.add(key)
-                resultados.append(
-                    {
-                        "tiempo_inicio": start_rounded,
-                        "tiempo_fin": end_rounded,
-                    }
-                )
-
-        return resultados
+        # Solo validar duración mínima, el máximo es más flexible después de fusionar
+        return (
+            ConjuntoIntervalos.desde_pares(self.anomaly_intervals)
+            .unir(self.MERGE_GAP_SECONDS)
+            .filtrar_duracion(self.SUSPICIOUS_MIN_DURATION)
+            .redondear()
+            .a_filas()
+        )
@@ -2,6 +2,8 @@ import numpy as np
 from moviepy import VideoFileClip
 from scipy import signal
 
+from ..intervalos import ConjuntoIntervalos
+
 
 class AnalizadorLipsync:
 
@@ -12,7 +14,7 @@ class AnalizadorLipsync:
     AUDIO_SMOOTH_SEC = 0.18
     MERGE_GAP_SEC = 0.8
 
-    def __init__(self, video_path):
+    def __init__(self, video_path, cargar_audio=True):
         self.video_path = video_path
         self.visual_envelope = []
         self.frame_timestamps = []
@@ -20,8 +22,16 @@ class AnalizadorLipsync:
         self.audio_array = None
         self.sample_rate = 44100
 
+        if cargar_audio:
+            self.cargar_audio()
+
+    def cargar_audio(self):
+        """
+        Carga y filtra la pista de audio. Se puede diferir hasta que el archivo
+        termine de descargarse, ya que solo se usa en obtener_resultados.
+        """
         try:
-            clip = VideoFileClip(video_path)
+            clip = VideoFileClip(self.video_path)
             if clip.audio is not None:
                 raw_audio = clip.audio.to_soundarray(fps=self.sample_rate)
                 if raw_audio.ndim == 2:
@@ -284,52 +294,13 @@ class AnalizadorLipsync:
         return anomalies
 
     def _merge_anomaly_intervals(self, intervals, gap_threshold):
-        if not intervals:
-            return []
-
-        merged = []
-        labels = set(label for _, _, label in intervals)
-        for label in labels:
-            label_intervals = sorted(
-                [
-                    (start, end)
-                    for start, end, current_label in intervals
-                    if current_label == label
-                ],
-                key=lambda item: item[0],
-            )
-            if not label_intervals:
-                continue
-
-            current_start, current_end = label_intervals[0]
-            for start, end in label_intervals[1:]:
-                if start - current_end <= gap_threshold:
-                    current_end = max(current_end, end)
-                else:
-                    merged.append(
-                        {
-                            "tiempo_inicio": round(current_start, 2),
-                            "tiempo_fin": round(current_end, 2),
-                            "tipo_anomalia": label,
-                        }
-                    )
-                    current_start, current_end = start, end
-
-            merged.append(
-                {
-                    "tiempo_inicio": round(current_start, 2),
-                    "tiempo_fin": round(current_end, 2),
-                    "tipo_anomalia": label,
-                }
+        return (
+            ConjuntoIntervalos(
+                [start for start, _, _ in intervals],
+                [end for _, end, _ in intervals],
+                [label for _, _, label in intervals],
             )
-
-        merged.sort(key=lambda item: item["tiempo_inicio"])
-        unique = []
-        seen = set()
-        for item in merged:
-            key = (item["tipo_anomalia"], item["tiempo_inicio"], item["tiempo_fin"])
-            if key in seen:
-                continue
-            seen.add(key)
-            unique.append(item)
-        return unique
+            .unir(gap_threshold)
+            .redondear()
+            .a_filas("tipo_anomalia")
+        )
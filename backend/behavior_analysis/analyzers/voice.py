@@ -7,12 +7,16 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import silhouette_score
 import warnings
 
+from ..intervalos import ConjuntoIntervalos
+
 warnings.filterwarnings("ignore")
 
 
 class AnalizadorVoz:
-    def __init__(self, video_path):
+    def __init__(self, video_path, segment_duration=0.5):
         self.video_path = video_path
+        # Segmentos mas largos = pasada mas gruesa (menos MFCC por minuto de audio)
+        self.segment_duration = segment_duration
         self.temp_audio = f"temp_analysis_audio_{os.getpid()}.wav"
 
     def procesar(self):
@@ -31,7 +35,7 @@ class AnalizadorVoz:
             if os.path.exists(self.temp_audio):
                 os.remove(self.temp_audio)
 
-            segment_duration = 0.5
+            segment_duration = self.segment_duration
             samples_per_segment = int(segment_duration * sr)
             total_segments = int(len(y) / samples_per_segment)
 
@@ -98,7 +102,7 @@ class AnalizadorVoz:
             # Estructurar resultados
             resultados = {
                 "num_speakers": best_n_speakers,
-                "susurros": self._merge_intervals(whisper_timestamps),
+                "susurros": self._merge_intervals(whisper_timestamps).a_tuplas(),
                 "hablantes": [],
             }
 
@@ -106,16 +110,9 @@ class AnalizadorVoz:
                 speaker_intervals.items(), key=lambda item: item[1][0] if item[1] else 0
             )
             for idx, (label_original, times) in enumerate(sorted_speakers):
-                ranges = self._merge_intervals(times, gap_threshold=1.5)
-                for start, end in ranges:
-                    if (end - start) >= 1.0:
-                        resultados["hablantes"].append(
-                            {
-                                "etiqueta": f"Voz {idx + 1}",
-                                "tiempo_inicio": start,
-                                "tiempo_fin": end,
-                            }
-                        )
+                ranges = self._merge_intervals(times, gap_threshold=1.5).filtrar_duracion(1.0)
+                for fila in ranges.a_filas():
+                    resultados["hablantes"].append({"etiqueta": f"Voz {idx + 1}", **fila})
 
             return resultados
 
@@ -126,16 +123,6 @@ class AnalizadorVoz:
             return None
 
     def _merge_intervals(self, times, gap_threshold=1.0):
-        if not times:
-            return []
-        times = sorted(set(times))
-        ranges = []
-        start = times[0]
-        prev = times[0]
-        for t in times[1:]:
-            if t - prev > gap_threshold:
-                ranges.append((start, prev + 0.5))
-                start = t
-            prev = t
-        ranges.append((start, prev + 0.5))
-        return ranges
+        return ConjuntoIntervalos.desde_puntos(
+            times, self.segment_duration, gap_threshold
+        )
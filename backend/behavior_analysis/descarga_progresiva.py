@@ -0,0 +1,112 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from events.s3_service import s3_service
+
+logger = logging.getLogger(__name__)
+
+# Bytes que se pasan al decodificador por escritura
+BLOQUE = 1024 * 1024
+
+
+class _ArchivoEnDescarga:
+    """Destino de la descarga: se escribe en orden y cuenta los bytes recibidos."""
+
+    def __init__(self, path):
+        self._handle = open(path, "wb")
+        self._cond = threading.Condition()
+        self.escritos = 0
+        self.terminado = False
+
+    def write(self, data):
+        self._handle.write(data)
+        self._handle.flush()
+        with self._cond:
+            self.escritos += len(data)
+            self._cond.notify_all()
+        return len(data)
+
+    def terminar(self):
+        self._handle.close()
+        with self._cond:
+            self.terminado = True
+            self._cond.notify_all()
+
+    def esperar(self, posicion):
+        """Bytes disponibles desde `posicion`; 0 cuando la descarga termino."""
+        with self._cond:
+            while self.escritos <= posicion and not self.terminado:
+                self._cond.wait()
+            return self.escritos - posicion
+
+
+class DescargaProgresiva:
+    """
+    Descarga `key` a `destino` una sola vez y entrega lo que ya llego por un
+    FIFO, para que OpenCV decodifique los frames mientras la descarga sigue.
+    El archivo completo queda en `destino` para el audio (voz y lipsync).
+    """
+
+    def __init__(self, key, destino):
+        self.key = key
+        self.destino = destino
+        self.archivo = None
+        self.futuro = None
+        self.fifo = None
+        self._directorio = None
+        self._cancelado = threading.Event()
+
+    @staticmethod
+    def disponible():
+        return hasattr(os, "mkfifo")
+
+    def iniciar(self):
+        """Inicia la descarga y la alimentacion del FIFO; retorna la ruta del FIFO."""
+        self._directorio = tempfile.mkdtemp(prefix="analisis-")
+        self.fifo = os.path.join(self._directorio, "video" + os.path.splitext(self.destino)[1])
+        os.mkfifo(self.fifo)
+        self.archivo = _ArchivoEnDescarga(self.destino)
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.futuro = executor.submit(self._descargar)
+        executor.shutdown(wait=False)
+        threading.Thread(target=self._alimentar, daemon=True).start()
+        return self.fifo
+
+    def _descargar(self):
+        try:
+            return s3_service.download_fileobj(self.key, self.archivo)
+        finally:
+            self.archivo.terminar()
+
+    def _alimentar(self):
+        # open() del FIFO bloquea hasta que el decodificador lo abre
+        try:
+            with open(self.fifo, "wb") as pipe, open(self.destino, "rb") as origen:
+                posicion = 0
+                while not self._cancelado.is_set():
+                    disponibles = self.archivo.esperar(posicion)
+                    if disponibles <= 0:
+                        break
+                    datos = origen.read(min(disponibles, BLOQUE))
+                    pipe.write(datos)
+                    posicion += len(datos)
+        except OSError as e:
+            # El decodificador cerro el FIFO antes del final
+            logger.debug(f"Progressive feed of {self.key} stopped: {e}")
+
+    def cerrar(self):
+        """Detiene la alimentacion del FIFO y lo elimina."""
+        self._cancelado.set()
+        if self.fifo and os.path.exists(self.fifo):
+            try:
+                # Libera al alimentador si sigue esperando a un lector
+                os.close(os.open(self.fifo, os.O_RDONLY | os.O_NONBLOCK))
+            except OSError:
+                pass
+        if self._directorio:
+            shutil.rmtree(self._directorio, ignore_errors=True)
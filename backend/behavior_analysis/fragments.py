@@ -0,0 +1,361 @@
+import logging
+import os
+import tempfile
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import Q
+from django.utils import timezone
+
+from events.models import ParticipantLog
+from events.s3_service import s3_service
+from events.storage import extract_s3_key
+from .intervalos import ConjuntoIntervalos
+from .models import AnalisisComportamiento, AnalisisFragmento
+from .probe import duracion_video
+from .services import analizar_video_local, guardar_resultados
+
+logger = logging.getLogger(__name__)
+
+# Duracion nominal de un fragmento del cliente de escritorio (5 minutos), usada
+# cuando aun no se conoce la duracion real de un fragmento anterior.
+FRAGMENTO_SEGUNDOS_DEFAULT = 300.0
+
+# Segundos tras los cuales un fragmento "procesando" se da por abandonado
+# (worker caido) y vuelve a analizarse al unir.
+FRAGMENTO_TIMEOUT_DEFAULT = 1800
+
+# Umbral de similitud coseno para considerar que dos firmas son la misma
+# persona (mismo valor que AnalizadorRostros.match_threshold).
+UMBRAL_MISMA_PERSONA = 0.4
+
+# Separacion maxima (fin -> inicio) para unir intervalos del mismo tipo al
+# juntar fragmentos; replica la fusion que hace cada analizador internamente.
+GAPS_UNION = {
+    "rostros": 2.0,
+    "gestos": 0.5,
+    "iluminacion": 2.0,
+    "ausencia": 3.0,
+    "lipsync": 0.8,
+    "susurros": 0.5,
+    "hablantes": 1.0,
+}
+
+
+def _video_logs(participant_event_id):
+    return ParticipantLog.objects.filter(
+        participant_event_id=participant_event_id,
+        name="audio/video",
+        url__isnull=False,
+    ).order_by("timestamp", "id")
+
+
+def _timeout_fragmento():
+    return int(os.getenv("FRAGMENT_ANALYSIS_TIMEOUT", str(FRAGMENTO_TIMEOUT_DEFAULT)))
+
+
+def analizar_fragmento(participant_log_id):
+    """
+    Analiza un fragmento de audio/video individual y guarda sus intervalos
+    (relativos al inicio del fragmento) en AnalisisFragmento.
+    """
+    try:
+        log = ParticipantLog.objects.get(id=participant_log_id, name="audio/video")
+    except ParticipantLog.DoesNotExist:
+        return {"success": False, "error": "Fragment log not found"}
+
+    key = extract_s3_key(log.url)
+    if not key or not log.participant_event_id:
+        return {"success": False, "error": "Fragment log missing URL/key"}
+
+    fragmento, _ = AnalisisFragmento.objects.get_or_create(
+        participant_log=log,
+        defaults={"participant_event_id": log.participant_event_id},
+    )
+    if fragmento.status == "completado":
+        return {"success": True, "skipped": True, "fragment_id": fragmento.id}
+
+    fragmento.status = "procesando"
+    fragmento.save(update_fields=["status", "fecha_procesamiento"])
+
+    _, ext = os.path.splitext(key)
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=ext or ".webm")
+    temp_path = temp_file.name
+    temp_file.close()
+    try:
+        return _analizar_descarga(log, fragmento, key, temp_path)
+    except Exception as e:
+        logger.error(f"Error analyzing fragment {key}: {e}")
+        fragmento.status = "error"
+        fragmento.save(update_fields=["status", "fecha_procesamiento"])
+        return {"success": False, "error": str(e)}
+    finally:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError as e:
+                logger.warning(f"Could not remove temp fragment {temp_path}: {e}")
+
+
+def _analizar_descarga(log, fragmento, key, temp_path):
+    """Descarga el fragmento a `temp_path`, lo analiza y guarda el resultado."""
+    download_result = s3_service.download_file(key, temp_path)
+    if not download_result.get("success"):
+        logger.error(
+            f"Could not download fragment {key}: {download_result.get('error')}"
+        )
+        fragmento.status = "error"
+        fragmento.save(update_fields=["status", "fecha_procesamiento"])
+        return {"success": False, "error": download_result.get("error")}
+
+    resultados = analizar_video_local(temp_path, "completo", incluir_firmas=True)
+    if resultados is None:
+        fragmento.status = "error"
+        fragmento.save(update_fields=["status", "fecha_procesamiento"])
+        return {"success": False, "error": "Could not open fragment"}
+
+    # La duracion del contenedor define el offset de los fragmentos
+    # siguientes; la del ultimo frame leido queda como respaldo.
+    fragmento.resultados = resultados
+    fragmento.duracion = duracion_video(temp_path) or resultados.get("duracion")
+    fragmento.offset_segundos = _offset_de(log)
+    fragmento.status = "completado"
+    fragmento.save()
+    return {"success": True, "fragment_id": fragmento.id}
+
+
+def _offset_de(log):
+    """Offset del fragmento en la sesion segun las duraciones de los anteriores."""
+    anteriores = _video_logs(log.participant_event_id).filter(
+        Q(timestamp__lt=log.timestamp) | Q(timestamp=log.timestamp, id__lt=log.id)
+    )
+    duraciones = dict(
+        AnalisisFragmento.objects.filter(participant_log__in=anteriores).values_list(
+            "participant_log_id", "duracion"
+        )
+    )
+    return sum(
+        duraciones.get(log_id) or FRAGMENTO_SEGUNDOS_DEFAULT
+        for log_id in anteriores.values_list("id", flat=True)
+    )
+
+
+def unir_fragmentos(participant_event_id, analizar_pendientes=True):
+    """
+    Une los resultados por fragmento de un participante en su
+    AnalisisComportamiento. Con `analizar_pendientes` se analizan aqui los
+    fragmentos sin analisis, con error o abandonados en "procesando"; los que
+    otro worker esta analizando no se repiten. Los intervalos se desplazan
+    segun el orden de los logs y se funden los que cruzan el limite entre
+    fragmentos.
+    """
+    try:
+        analisis = AnalisisComportamiento.objects.get(
+            participant_event_id=participant_event_id
+        )
+    except AnalisisComportamiento.DoesNotExist:
+        return {"success": False, "error": "analysis_missing"}
+
+    analisis.status = "procesando"
+    analisis.save(update_fields=["status"])
+
+    logs = list(_video_logs(participant_event_id))
+    fragmentos = {
+        f.participant_log_id: f
+        for f in AnalisisFragmento.objects.filter(participant_log__in=logs)
+    }
+    limite = timezone.now() - timedelta(seconds=_timeout_fragmento())
+    en_curso = [
+        log.id
+        for log in logs
+        if log.id in fragmentos
+        and fragmentos[log.id].status == "procesando"
+        and fragmentos[log.id].fecha_procesamiento >= limite
+    ]
+    pendientes = [
+        log.id
+        for log in logs
+        if log.id not in en_curso
+        and (log.id not in fragmentos or fragmentos[log.id].status != "completado")
+    ]
+    if analizar_pendientes and pendientes:
+        for log_id in pendientes:
+            analizar_fragmento(log_id)
+        fragmentos = {
+            f.participant_log_id: f
+            for f in AnalisisFragmento.objects.filter(participant_log__in=logs)
+        }
+
+    partes = []
+    offset = 0.0
+    fallidos = 0
+    for log in logs:
+        fragmento = fragmentos.get(log.id)
+        if fragmento is None or fragmento.status != "completado":
+            fallidos += 1
+            offset += FRAGMENTO_SEGUNDOS_DEFAULT
+            continue
+        if fragmento.offset_segundos != offset:
+            fragmento.offset_segundos = offset
+            fragmento.save(update_fields=["offset_segundos"])
+        partes.append((offset, fragmento.resultados))
+        offset += fragmento.duracion or FRAGMENTO_SEGUNDOS_DEFAULT
+
+    if not partes:
+        analisis.status = "error"
+        analisis.save(update_fields=["status"])
+        return {"success": False, "error": "No fragment could be analyzed"}
+
+    guardar_resultados(analisis, combinar_resultados(partes))
+    return {
+        "success": True,
+        "id": analisis.id,
+        "status": "completado",
+        "fragments": len(partes),
+        "failed_fragments": fallidos,
+        "in_flight_fragments": len(en_curso),
+    }
+
+
+def combinar_resultados(partes):
+    """
+    Combina [(offset, resultados), ...] en un unico dict de resultados con el
+    formato de analizar_video_local, en tiempo de sesion.
+    """
+    gestos = _unir_intervalos(
+        _desplazar(partes, "gestos"), GAPS_UNION["gestos"], clave="tipo_gesto"
+    )
+    for g in gestos:
+        g["duracion"] = round(g["tiempo_fin"] - g["tiempo_inicio"], 2)
+
+    ausencias = _unir_intervalos(
+        [
+            {"tiempo_inicio": r[0] + offset, "tiempo_fin": r[1] + offset}
+            for offset, res in partes
+            for r in res.get("ausencia", [])
+        ],
+        GAPS_UNION["ausencia"],
+    )
+
+    susurros = _unir_intervalos(
+        [
+            {"tiempo_inicio": s[0] + offset, "tiempo_fin": s[1] + offset}
+            for offset, res in partes
+            for s in res.get("voz", {}).get("susurros", [])
+        ],
+        GAPS_UNION["susurros"],
+    )
+    hablantes = _unir_intervalos(
+        [
+            dict(h, tiempo_inicio=h["tiempo_inicio"] + offset, tiempo_fin=h["tiempo_fin"] + offset)
+            for offset, res in partes
+            for h in res.get("voz", {}).get("hablantes", [])
+        ],
+        GAPS_UNION["hablantes"],
+        clave="etiqueta",
+    )
+
+    return {
+        "duracion": round(
+            max(offset + (res.get("duracion") or 0.0) for offset, res in partes), 2
+        ),
+        "rostros": _reconciliar_rostros(partes),
+        "gestos": gestos,
+        "iluminacion": _unir_intervalos(
+            _desplazar(partes, "iluminacion"), GAPS_UNION["iluminacion"]
+        ),
+        "ausencia": [
+            [a["tiempo_inicio"], a["tiempo_fin"], round(a["tiempo_fin"] - a["tiempo_inicio"], 2)]
+            for a in ausencias
+        ],
+        "lipsync": _unir_intervalos(
+            _desplazar(partes, "lipsync"), GAPS_UNION["lipsync"], clave="tipo_anomalia"
+        ),
+        "voz": {
+            "susurros": [[s["tiempo_inicio"], s["tiempo_fin"]] for s in susurros],
+            "hablantes": hablantes,
+        },
+    }
+
+
+def _desplazar(partes, tipo):
+    return [
+        dict(
+            item,
+            tiempo_inicio=item["tiempo_inicio"] + offset,
+            tiempo_fin=item["tiempo_fin"] + offset,
+        )
+        for offset, res in partes
+        for item in res.get(tipo, [])
+    ]
+
+
+def _unir_intervalos(items, gap, clave=None):
+    """Funde intervalos (dicts) del mismo `clave` separados por <= gap segundos."""
+    return (
+        ConjuntoIntervalos(
+            [item["tiempo_inicio"] for item in items],
+            [item["tiempo_fin"] for item in items],
+            [item.get(clave) for item in items] if clave else None,
+        )
+        .unir(gap)
+        .redondear()
+        .a_filas(clave)
+    )
+
+
+def _similitud(a, b):
+    norma = np.linalg.norm(a) * np.linalg.norm(b)
+    if norma == 0:
+        return 0.0
+    return float(np.dot(a, b) / norma)
+
+
+def _reconciliar_rostros(partes):
+    """
+    Asigna IDs de persona globales comparando las firmas (embeddings) de cada
+    fragmento con las personas ya vistas, y renumera por primera aparicion.
+    """
+    personas = []  # [{"firma": np.ndarray | None, "intervalos": [...]}]
+    for offset, res in partes:
+        firmas = {
+            int(pid): np.asarray(firma, dtype=float)
+            for pid, firma in (res.get("firmas_rostros") or {}).items()
+        }
+        mapa = {}
+        for pid, firma in firmas.items():
+            mejor, mejor_score = None, UMBRAL_MISMA_PERSONA
+            for idx, persona in enumerate(personas):
+                if persona["firma"] is None or idx in mapa.values():
+                    continue
+                score = _similitud(firma, persona["firma"])
+                if score > mejor_score:
+                    mejor, mejor_score = idx, score
+            if mejor is None:
+                personas.append({"firma": firma, "intervalos": []})
+                mejor = len(personas) - 1
+            else:
+                personas[mejor]["firma"] = (personas[mejor]["firma"] + firma) / 2
+            mapa[pid] = mejor
+
+        for r in res.get("rostros", []):
+            idx = mapa.get(r["persona_id"])
+            if idx is None:
+                personas.append({"firma": None, "intervalos": []})
+                idx = mapa[r["persona_id"]] = len(personas) - 1
+            personas[idx]["intervalos"].append(
+                {
+                    "tiempo_inicio": r["tiempo_inicio"] + offset,
+                    "tiempo_fin": r["tiempo_fin"] + offset,
+                }
+            )
+
+    personas = [p for p in personas if p["intervalos"]]
+    personas.sort(key=lambda p: min(i["tiempo_inicio"] for i in p["intervalos"]))
+
+    resultados = []
+    for persona_id, persona in enumerate(personas, start=1):
+        for intervalo in _unir_intervalos(persona["intervalos"], GAPS_UNION["rostros"]):
+            resultados.append(dict(intervalo, persona_id=persona_id))
+    resultados.sort(key=lambda r: (r["tiempo_inicio"], r["persona_id"]))
+    return resultados
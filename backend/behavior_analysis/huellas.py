@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+
+from events.models import ParticipantLog
+from events.s3_service import s3_service
+from events.storage import extract_s3_key
+from .services import PERFILES_ANALISIS
+
+# Subir al cambiar la salida de algun analizador: invalida los analisis previos
+VERSION_ANALIZADORES = "1"
+
+# Variables de entorno que cambian el video unido o su copia para analisis
+AJUSTES_UNION = (
+    "FFMPEG_STREAM_COPY",
+    "FFMPEG_PRESET",
+    "FFMPEG_CRF",
+    "FFMPEG_FPS",
+    "ANALYSIS_PROXY",
+    "ANALYSIS_PROXY_HEIGHT",
+    "ANALYSIS_PROXY_FPS",
+)
+
+
+def reutilizacion_habilitada():
+    return os.getenv("ANALYSIS_REUSE", "false").strip().lower() in ("1", "true", "yes")
+
+
+def _digest(partes):
+    return hashlib.sha256(
+        json.dumps(partes, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def _version_objeto(key):
+    """ETag del objeto en storage, o None si no existe."""
+    info = s3_service.get_media_fragment_info(key) if key else None
+    if not info:
+        return None
+    return info.get("etag") or f"{info.get('size')}-{info.get('last_modified')}"
+
+
+def huella_union(participant_event_id):
+    """
+    Huella de los fragmentos de audio/video del participante (keys y ETags,
+    en orden) y de los ajustes de la union. None si falta algun fragmento.
+    """
+    fragmentos = []
+    for url in ParticipantLog.objects.filter(
+        participant_event_id=participant_event_id,
+        name="audio/video",
+        url__isnull=False,
+    ).order_by("timestamp", "id").values_list("url", flat=True):
+        key = extract_s3_key(url)
+        etag = _version_objeto(key)
+        if etag is None:
+            return None
+        fragmentos.append((key, etag))
+    if not fragmentos:
+        return None
+    return _digest(
+        {
+            "fragmentos": fragmentos,
+            "ajustes": {nombre: os.getenv(nombre, "") for nombre in AJUSTES_UNION},
+        }
+    )
+
+
+def huella_analisis(video_key, perfil):
+    """
+    Huella del video analizado (key y ETag) con la version de los
+    analizadores y la configuracion del perfil. None si el video no existe.
+    """
+    video_key = extract_s3_key(video_key)
+    etag = _version_objeto(video_key)
+    if etag is None:
+        return None
+    return _digest(
+        {
+            "video": (video_key, etag),
+            "version": VERSION_ANALIZADORES,
+            "perfil": perfil,
+            "config": PERFILES_ANALISIS.get(perfil),
+        }
+    )
+
+
+def union_reutilizable(analisis, huella):
+    """
+    True si el video unido del analisis corresponde a `huella` y sigue en
+    storage (y su copia para analisis, si la tiene).
+    """
+    if not huella or not analisis or analisis.huella_union != huella:
+        return False
+    if _version_objeto(analisis.video_link) is None:
+        return False
+    if analisis.video_analisis_link and _version_objeto(analisis.video_analisis_link) is None:
+        return False
+    return True
+
+
+def analisis_reutilizable(analisis, huella):
+    """True si los resultados guardados del analisis corresponden a `huella`."""
+    return bool(
+        huella
+        and analisis
+        and analisis.status == "completado"
+        and analisis.huella_analisis == huella
+    )
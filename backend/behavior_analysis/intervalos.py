@@ -0,0 +1,184 @@
+import numpy as np
+
+
+class ConjuntoIntervalos:
+    """
+    Conjunto de intervalos [inicio, fin] con etiqueta opcional, guardado como
+    arrays de NumPy. Lo usan todos los analizadores para fusionar, filtrar,
+    redondear y convertir sus intervalos, de modo que la finalizacion sea
+    la misma en todos y se haga con operaciones sobre arrays.
+
+    Las operaciones retornan un conjunto nuevo ordenado por inicio.
+    """
+
+    __slots__ = ("inicios", "fines", "etiquetas")
+
+    def __init__(self, inicios=(), fines=(), etiquetas=None):
+        self.inicios = np.asarray(inicios, dtype=float).ravel()
+        self.fines = np.asarray(fines, dtype=float).ravel()
+        if etiquetas is None:
+            self.etiquetas = None
+        else:
+            self.etiquetas = np.empty(len(self.inicios), dtype=object)
+            self.etiquetas[:] = list(etiquetas)
+
+    @classmethod
+    def desde_pares(cls, pares, etiquetas=None):
+        """Desde [(inicio, fin), ...]."""
+        pares = np.asarray(list(pares), dtype=float).reshape(-1, 2)
+        return cls(pares[:, 0], pares[:, 1], etiquetas)
+
+    @classmethod
+    def desde_puntos(cls, tiempos, ancho, gap):
+        """
+        Agrupa instantes (p.ej. inicios de segmentos de audio de `ancho`
+        segundos): un punto a mas de `gap` del anterior abre un intervalo
+        nuevo, que termina en el ultimo punto del grupo + `ancho`.
+        """
+        tiempos = np.unique(np.asarray(list(tiempos), dtype=float))
+        if not len(tiempos):
+            return cls()
+        nuevos = np.concatenate(([True], np.diff(tiempos) > gap))
+        ultimos = np.concatenate((nuevos[1:], [True]))
+        return cls(tiempos[nuevos], tiempos[ultimos] + ancho)
+
+    def __len__(self):
+        return len(self.inicios)
+
+    @property
+    def duraciones(self):
+        return self.fines - self.inicios
+
+    def _subconjunto(self, indices):
+        return ConjuntoIntervalos(
+            self.inicios[indices],
+            self.fines[indices],
+            None if self.etiquetas is None else self.etiquetas[indices],
+        )
+
+    def _grupos(self):
+        """Indices de cada etiqueta, en orden de primera aparicion."""
+        if self.etiquetas is None:
+            return [np.arange(len(self))]
+        grupos = {}
+        for idx, etiqueta in enumerate(self.etiquetas):
+            grupos.setdefault(etiqueta, []).append(idx)
+        return [np.asarray(indices) for indices in grupos.values()]
+
+    def ordenar(self):
+        return self._subconjunto(np.argsort(self.inicios, kind="stable"))
+
+    def unir(self, gap=0.0, estricto=False):
+        """
+        Fusiona los intervalos de la misma etiqueta separados por <= `gap`
+        segundos (< `gap` con estricto=True) del fin mas lejano del bloque.
+        """
+        if not len(self):
+            return ConjuntoIntervalos(etiquetas=None if self.etiquetas is None else [])
+
+        inicios, fines, etiquetas = [], [], []
+        for indices in self._grupos():
+            orden = indices[np.argsort(self.inicios[indices], kind="stable")]
+            ini, fin = self.inicios[orden], self.fines[orden]
+            max_previo = np.maximum.accumulate(fin)
+            separacion = ini[1:] - max_previo[:-1]
+            cortes = separacion >= gap if estricto else separacion > gap
+            nuevos = np.concatenate(([True], cortes))
+            bloques = np.cumsum(nuevos) - 1
+            fin_bloque = np.full(bloques[-1] + 1, -np.inf)
+            np.maximum.at(fin_bloque, bloques, fin)
+            inicios.append(ini[nuevos])
+            fines.append(fin_bloque)
+            if self.etiquetas is not None:
+                etiquetas.extend(self.etiquetas[orden][nuevos])
+
+        return ConjuntoIntervalos(
+            np.concatenate(inicios),
+            np.concatenate(fines),
+            None if self.etiquetas is None else etiquetas,
+        ).ordenar()
+
+    def filtrar_duracion(self, minima=None, maxima=None, estricto=False):
+        """Conserva duracion >= minima (> con estricto=True) y <= maxima."""
+        duraciones = self.duraciones
+        mascara = np.ones(len(self), dtype=bool)
+        if minima is not None:
+            mascara &= duraciones > minima if estricto else duraciones >= minima
+        if maxima is not None:
+            mascara &= duraciones <= maxima
+        return self._subconjunto(np.flatnonzero(mascara))
+
+    def redondear(self, decimales=2):
+        """Redondea y descarta repetidos (misma etiqueta, inicio y fin)."""
+        if not len(self):
+            return self
+        inicios = np.round(self.inicios, decimales)
+        fines = np.round(self.fines, decimales)
+        if self.etiquetas is None:
+            codigos = np.zeros(len(self))
+        else:
+            _, codigos = np.unique(self.etiquetas.astype(str), return_inverse=True)
+        claves = np.column_stack((codigos, inicios, fines))
+        _, primeros = np.unique(claves, axis=0, return_index=True)
+        primeros = np.sort(primeros)
+        return ConjuntoIntervalos(
+            inicios[primeros],
+            fines[primeros],
+            None if self.etiquetas is None else self.etiquetas[primeros],
+        ).ordenar()
+
+    def union(self, otro):
+        """Union de ambos conjuntos, sin solapes (ignora etiquetas)."""
+        return ConjuntoIntervalos(
+            np.concatenate((self.inicios, otro.inicios)),
+            np.concatenate((self.fines, otro.fines)),
+        ).unir(0.0)
+
+    def interseccion(self, otro):
+        """
+        Tramos en que ambos conjuntos estan activos a la vez (ignora
+        etiquetas): barrido con dos punteros sobre las uniones ordenadas.
+        """
+        a = ConjuntoIntervalos(self.inicios, self.fines).unir(0.0)
+        b = ConjuntoIntervalos(otro.inicios, otro.fines).unir(0.0)
+        inicios, fines = [], []
+        i = j = 0
+        while i < len(a) and j < len(b):
+            inicio = max(a.inicios[i], b.inicios[j])
+            fin = min(a.fines[i], b.fines[j])
+            if inicio <= fin:
+                inicios.append(inicio)
+                fines.append(fin)
+            # Avanza el que termina primero: ya no puede solaparse con nada mas
+            if a.fines[i] < b.fines[j]:
+                i += 1
+            else:
+                j += 1
+        return ConjuntoIntervalos(inicios, fines)
+
+    def a_tuplas(self, duracion=False):
+        """[(inicio, fin)] o [(inicio, fin, duracion)] con floats de Python."""
+        if duracion:
+            return list(
+                zip(
+                    self.inicios.tolist(),
+                    self.fines.tolist(),
+                    np.round(self.duraciones, 2).tolist(),
+                )
+            )
+        return list(zip(self.inicios.tolist(), self.fines.tolist()))
+
+    def a_filas(self, campo_etiqueta=None, duracion=False):
+        """Dicts con el formato de los registros (tiempo_inicio, tiempo_fin, ...)."""
+        filas = []
+        duraciones = np.round(self.duraciones, 2).tolist() if duracion else None
+        for idx, (inicio, fin) in enumerate(zip(self.inicios.tolist(), self.fines.tolist())):
+            fila = {}
+            if campo_etiqueta:
+                fila[campo_etiqueta] = self.etiquetas[idx]
+            fila["tiempo_inicio"] = inicio
+            fila["tiempo_fin"] = fin
+            if duracion:
+                fila["duracion"] = duraciones[idx]
+            filas.append(fila)
+        return filas
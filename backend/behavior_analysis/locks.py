@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# TTL de los locks por etapa; mientras la tarea corre el heartbeat lo renueva
+STAGE_LOCK_TTL = int(os.getenv("TASK_LOCK_TTL", "3600"))
+# El lock de fin de evento lo libera el callback del chord; el TTL solo
+# cubre el caso en que el callback nunca llegue a ejecutarse
+EVENT_LOCK_TTL = int(os.getenv("EVENT_COMPLETION_LOCK_TTL", str(12 * 3600)))
+
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_client = None
+
+
+def _redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.CELERY_BROKER_URL, decode_responses=True)
+    return _client
+
+
+class TaskLock:
+    """
+    Lock en Redis (SET NX EX) cuyo valor es el id de la tarea que hace el
+    trabajo, para que una solicitud duplicada pueda devolver la tarea en
+    curso en vez de repetirla. Con TASK_LOCKS_ENABLED=False (o si Redis no
+    responde) el lock siempre se concede.
+    """
+
+    def __init__(self, nombre, ttl=STAGE_LOCK_TTL, client=None):
+        self.key = f"task-lock:{nombre}"
+        self.ttl = ttl
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or _redis()
+
+    def _enabled(self):
+        return getattr(settings, "TASK_LOCKS_ENABLED", True)
+
+    def adquirir(self, owner):
+        """
+        Intenta tomar el lock para `owner`. Retorna el id del dueño actual:
+        igual a `owner` si se concedio (o ya era suyo), otro id si hay una
+        tarea en curso.
+        """
+        if not self._enabled():
+            return owner
+        try:
+            if self.client.set(self.key, owner, nx=True, ex=self.ttl):
+                return owner
+            actual = self.client.get(self.key)
+            # None: expiro entre el SET y el GET, se reintenta
+            return actual if actual is not None else self.adquirir(owner)
+        except redis.RedisError as e:
+            logger.warning(f"Task lock {self.key} unavailable, continuing without it: {e}")
+            return owner
+
+    def renovar(self, owner):
+        if not self._enabled():
+            return True
+        try:
+            return bool(self.client.eval(_RENEW_SCRIPT, 1, self.key, owner, self.ttl))
+        except redis.RedisError as e:
+            logger.warning(f"Could not renew task lock {self.key}: {e}")
+            return False
+
+    def liberar(self, owner):
+        if not self._enabled():
+            return
+        try:
+            self.client.eval(_RELEASE_SCRIPT, 1, self.key, owner)
+        except redis.RedisError as e:
+            logger.warning(f"Could not release task lock {self.key}: {e}")
+
+    @contextmanager
+    def mantener(self, owner):
+        """Renueva el lock cada ttl/3 mientras dura el bloque y luego lo libera."""
+        detener = threading.Event()
+
+        def heartbeat():
+            while not detener.wait(max(1, self.ttl // 3)):
+                if not self.renovar(owner):
+                    logger.warning(f"Task lock {self.key} lost by {owner}")
+                    return
+
+        hilo = threading.Thread(target=heartbeat, daemon=True)
+        hilo.start()
+        try:
+            yield
+        finally:
+            detener.set()
+            hilo.join()
+            self.liberar(owner)
+
+
+def lock_etapa(etapa, participant_event_id):
+    """Lock de una etapa ("merge" o "analysis") de un participante."""
+    return TaskLock(f"{etapa}:{participant_event_id}")
+
+
+def lock_fin_evento(event_id):
+    """Lock del procesamiento de fin de evento."""
+    return TaskLock(f"event-completion:{event_id}", ttl=EVENT_LOCK_TTL)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('behavior_analysis', '0009_translate_status_to_spanish'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analisiscomportamiento',
+            name='nivel',
+            field=models.CharField(choices=[('preliminar', 'Preliminar'), ('completo', 'Completo')], default='completo', max_length=20),
+        ),
+    ]
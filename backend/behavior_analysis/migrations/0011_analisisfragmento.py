@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('behavior_analysis', '0010_analisiscomportamiento_nivel'),
+        ('events', '0012_eventconsent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalisisFragmento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('duracion', models.FloatField(blank=True, null=True)),
+                ('offset_segundos', models.FloatField(blank=True, null=True)),
+                ('resultados', models.JSONField(blank=True, default=dict)),
+                ('fecha_procesamiento', models.DateTimeField(auto_now=True)),
+                ('participant_event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analisis_fragmentos', to='events.participantevent')),
+                ('participant_log', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analisis_fragmento', to='events.participantlog')),
+            ],
+            options={
+                'db_table': 'analisis_fragmento',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('behavior_analysis', '0011_analisisfragmento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analisiscomportamiento',
+            name='video_analisis_link',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+    ]
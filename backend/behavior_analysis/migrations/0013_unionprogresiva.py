@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('behavior_analysis', '0012_analisiscomportamiento_video_analisis_link'),
+        ('events', '0012_eventconsent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnionProgresiva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_key', models.CharField(blank=True, default='', max_length=500)),
+                ('fragmentos', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('participant_event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='union_progresiva', to='events.participantevent')),
+                ('ultimo_log', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='events.participantlog')),
+            ],
+            options={
+                'db_table': 'union_progresiva',
+            },
+        ),
+    ]
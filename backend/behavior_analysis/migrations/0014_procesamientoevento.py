@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('behavior_analysis', '0013_unionprogresiva'),
+        ('events', '0012_eventconsent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcesamientoEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('procesando', 'Procesando'), ('completado', 'Completado'), ('con_errores', 'Completado con errores')], default='procesando', max_length=20)),
+                ('total_participantes', models.PositiveIntegerField(default=0)),
+                ('completados', models.PositiveIntegerField(default=0)),
+                ('fallidos', models.PositiveIntegerField(default=0)),
+                ('task_id', models.CharField(blank=True, default='', max_length=255)),
+                ('fecha_inicio', models.DateTimeField(auto_now_add=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='procesamiento_analisis', to='events.event')),
+            ],
+            options={
+                'db_table': 'procesamiento_evento',
+            },
+        ),
+    ]
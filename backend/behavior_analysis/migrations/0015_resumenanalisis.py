@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('behavior_analysis', '0014_procesamientoevento'),
+        ('events', '0012_eventconsent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenAnalisis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_rostros_detectados', models.PositiveIntegerField(default=0)),
+                ('total_gestos', models.PositiveIntegerField(default=0)),
+                ('total_anomalias_iluminacion', models.PositiveIntegerField(default=0)),
+                ('total_anomalias_voz', models.PositiveIntegerField(default=0)),
+                ('total_hablantes', models.PositiveIntegerField(default=0)),
+                ('total_anomalias_lipsync', models.PositiveIntegerField(default=0)),
+                ('total_ausencias', models.PositiveIntegerField(default=0)),
+                ('tiempo_total_ausencia_segundos', models.FloatField(default=0.0)),
+                ('total_screenshots', models.PositiveIntegerField(default=0)),
+                ('total_videos', models.PositiveIntegerField(default=0)),
+                ('total_blocked_requests', models.PositiveIntegerField(default=0)),
+                ('total_proxy_disconnections', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('participant_event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_analisis', to='events.participantevent')),
+            ],
+            options={
+                'db_table': 'resumen_analisis',
+            },
+        ),
+    ]
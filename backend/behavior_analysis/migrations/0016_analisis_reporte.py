@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('behavior_analysis', '0015_resumenanalisis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analisiscomportamiento',
+            name='reporte_key',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='analisiscomportamiento',
+            name='reporte_version',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('behavior_analysis', '0016_analisis_reporte'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='anomalialipsync',
+            index=models.Index(fields=['analisis', 'tiempo_inicio', 'id'], name='registro_li_analisi_5804c5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroausencia',
+            index=models.Index(fields=['analisis', 'tiempo_inicio', 'id'], name='registro_au_analisi_63cedb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrogesto',
+            index=models.Index(fields=['analisis', 'tiempo_inicio', 'id'], name='registro_ge_analisi_3378a9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroiluminacion',
+            index=models.Index(fields=['analisis', 'tiempo_inicio', 'id'], name='registro_il_analisi_2ea7f0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrorostro',
+            index=models.Index(fields=['analisis', 'tiempo_inicio', 'id'], name='registro_ro_analisi_1cfe61_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrovoz',
+            index=models.Index(fields=['analisis', 'tiempo_inicio', 'id'], name='registro_vo_analisi_4124ee_idx'),
+        ),
+    ]
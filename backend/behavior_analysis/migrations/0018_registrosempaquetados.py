@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('behavior_analysis', '0017_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrosEmpaquetados',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('rostros', 'Rostros'), ('gestos', 'Gestos'), ('iluminacion', 'Iluminacion'), ('voz', 'Voz'), ('lipsync', 'Lipsync'), ('ausencias', 'Ausencias')], max_length=20)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('columnas', models.JSONField(default=dict)),
+                ('analisis', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registros_empaquetados', to='behavior_analysis.analisiscomportamiento')),
+            ],
+            options={
+                'db_table': 'registros_empaquetados',
+                'unique_together': {('analisis', 'tipo')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('behavior_analysis', '0018_registrosempaquetados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analisiscomportamiento',
+            name='huella_analisis',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='analisiscomportamiento',
+            name='huella_union',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
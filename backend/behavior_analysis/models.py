@@ -1,5 +1,5 @@
 from django.db import models
-from events.models import ParticipantEvent
+from events.models import Event, ParticipantEvent, ParticipantLog
 
 
 class AnalisisComportamiento(models.Model):
@@ -10,14 +10,33 @@ class AnalisisComportamiento(models.Model):
         ("error", "Error"),
     ]
 
+    # Nivel de los resultados guardados: la pasada preliminar (baja tasa de
+    # muestreo) se reemplaza por la completa cuando esta termina.
+    NIVEL_CHOICES = [
+        ("preliminar", "Preliminar"),
+        ("completo", "Completo"),
+    ]
+
     participant_event = models.OneToOneField(
         ParticipantEvent,
         on_delete=models.CASCADE,
         related_name="analisis_comportamiento",
     )
     video_link = models.CharField(max_length=500)
+    # Copia reducida (baja resolucion/fps, audio mono 16 kHz) generada junto al
+    # video unido; el analisis la usa si existe, la reproduccion usa video_link
+    video_analisis_link = models.CharField(max_length=500, blank=True, default="")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pendiente")
+    nivel = models.CharField(max_length=20, choices=NIVEL_CHOICES, default="completo")
     fecha_procesamiento = models.DateTimeField(auto_now_add=True)
+    # Reporte completo pre-renderizado (JSON gzip en storage); la version
+    # cambia con cada ejecucion del analisis y sirve de ETag
+    reporte_key = models.CharField(max_length=500, blank=True, default="")
+    reporte_version = models.CharField(max_length=32, blank=True, default="")
+    # Huellas de la ultima union (fragmentos + ajustes) y del ultimo analisis
+    # (video + version de los analizadores + perfil), para no repetir trabajo
+    huella_union = models.CharField(max_length=64, blank=True, default="")
+    huella_analisis = models.CharField(max_length=64, blank=True, default="")
     class Meta:
         db_table = "analisis_comportamiento"
 
@@ -37,6 +56,8 @@ class RegistroRostro(models.Model):
 
     class Meta:
         db_table = "registro_rostro"
+        # Paginacion por cursor (tiempo_inicio, id) dentro de un analisis
+        indexes = [models.Index(fields=["analisis", "tiempo_inicio", "id"])]
 
 
 class RegistroGesto(models.Model):
@@ -52,6 +73,8 @@ class RegistroGesto(models.Model):
 
     class Meta:
         db_table = "registro_gesto"
+        # Paginacion por cursor (tiempo_inicio, id) dentro de un analisis
+        indexes = [models.Index(fields=["analisis", "tiempo_inicio", "id"])]
 
 
 class RegistroIluminacion(models.Model):
@@ -65,6 +88,8 @@ class RegistroIluminacion(models.Model):
 
     class Meta:
         db_table = "registro_iluminacion"
+        # Paginacion por cursor (tiempo_inicio, id) dentro de un analisis
+        indexes = [models.Index(fields=["analisis", "tiempo_inicio", "id"])]
 
 
 class RegistroVoz(models.Model):
@@ -80,6 +105,8 @@ class RegistroVoz(models.Model):
 
     class Meta:
         db_table = "registro_voz"
+        # Paginacion por cursor (tiempo_inicio, id) dentro de un analisis
+        indexes = [models.Index(fields=["analisis", "tiempo_inicio", "id"])]
 
 
 class AnomaliaLipsync(models.Model):
@@ -94,6 +121,8 @@ class AnomaliaLipsync(models.Model):
 
     class Meta:
         db_table = "registro_lipsync"
+        # Paginacion por cursor (tiempo_inicio, id) dentro de un analisis
+        indexes = [models.Index(fields=["analisis", "tiempo_inicio", "id"])]
 
 
 class RegistroAusencia(models.Model):
@@ -108,3 +137,156 @@ class RegistroAusencia(models.Model):
 
     class Meta:
         db_table = "registro_ausencia"
+        # Paginacion por cursor (tiempo_inicio, id) dentro de un analisis
+        indexes = [models.Index(fields=["analisis", "tiempo_inicio", "id"])]
+
+
+class RegistrosEmpaquetados(models.Model):
+    """
+    Salida completa de un analizador para un analisis, guardada en columnas
+    (listas paralelas de tiempo_inicio, tiempo_fin y campos extra) en vez de
+    una fila por intervalo. behavior_analysis.registros la expone con el
+    mismo formato que las tablas registro_*.
+    """
+
+    TIPO_CHOICES = [
+        ("rostros", "Rostros"),
+        ("gestos", "Gestos"),
+        ("iluminacion", "Iluminacion"),
+        ("voz", "Voz"),
+        ("lipsync", "Lipsync"),
+        ("ausencias", "Ausencias"),
+    ]
+
+    analisis = models.ForeignKey(
+        AnalisisComportamiento,
+        on_delete=models.CASCADE,
+        related_name="registros_empaquetados",
+    )
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    cantidad = models.PositiveIntegerField(default=0)
+    columnas = models.JSONField(default=dict)
+
+    class Meta:
+        db_table = "registros_empaquetados"
+        unique_together = ("analisis", "tipo")
+
+
+class AnalisisFragmento(models.Model):
+    """
+    Resultados de un fragmento de audio/video analizado apenas llega, durante
+    el evento. Los intervalos se guardan relativos al inicio del fragmento; al
+    finalizar se desplazan con `offset_segundos` y se unen en el análisis del
+    participante.
+    """
+
+    participant_event = models.ForeignKey(
+        ParticipantEvent,
+        on_delete=models.CASCADE,
+        related_name="analisis_fragmentos",
+    )
+    participant_log = models.OneToOneField(
+        ParticipantLog,
+        on_delete=models.CASCADE,
+        related_name="analisis_fragmento",
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=AnalisisComportamiento.STATUS_CHOICES,
+        default="pendiente",
+    )
+    duracion = models.FloatField(null=True, blank=True)
+    offset_segundos = models.FloatField(null=True, blank=True)
+    resultados = models.JSONField(default=dict, blank=True)
+    fecha_procesamiento = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "analisis_fragmento"
+
+
+class UnionProgresiva(models.Model):
+    """
+    Checkpoint de la union progresiva de fragmentos durante el evento: el
+    video intermedio en S3 contiene todos los fragmentos hasta `ultimo_log`.
+    Al finalizar solo se agregan los fragmentos posteriores.
+    """
+
+    participant_event = models.OneToOneField(
+        ParticipantEvent,
+        on_delete=models.CASCADE,
+        related_name="union_progresiva",
+    )
+    video_key = models.CharField(max_length=500, blank=True, default="")
+    ultimo_log = models.ForeignKey(
+        ParticipantLog,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    fragmentos = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "union_progresiva"
+
+
+class ProcesamientoEvento(models.Model):
+    """
+    Estado del procesamiento de fin de evento: lo crea el planificador al
+    despachar los participantes y lo cierra el callback del chord cuando
+    terminan todos.
+    """
+
+    STATUS_CHOICES = [
+        ("procesando", "Procesando"),
+        ("completado", "Completado"),
+        ("con_errores", "Completado con errores"),
+    ]
+
+    event = models.OneToOneField(
+        Event,
+        on_delete=models.CASCADE,
+        related_name="procesamiento_analisis",
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="procesando")
+    total_participantes = models.PositiveIntegerField(default=0)
+    completados = models.PositiveIntegerField(default=0)
+    fallidos = models.PositiveIntegerField(default=0)
+    task_id = models.CharField(max_length=255, blank=True, default="")
+    fecha_inicio = models.DateTimeField(auto_now_add=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "procesamiento_evento"
+
+
+class ResumenAnalisis(models.Model):
+    """
+    Estadisticas materializadas del analisis y contadores de actividad de un
+    participante. Se recalcula al guardar resultados y los contadores se
+    incrementan al llegar cada log, para que las vistas de listado no tengan
+    que leer todos los registros.
+    """
+
+    participant_event = models.OneToOneField(
+        ParticipantEvent,
+        on_delete=models.CASCADE,
+        related_name="resumen_analisis",
+    )
+    total_rostros_detectados = models.PositiveIntegerField(default=0)
+    total_gestos = models.PositiveIntegerField(default=0)
+    total_anomalias_iluminacion = models.PositiveIntegerField(default=0)
+    total_anomalias_voz = models.PositiveIntegerField(default=0)
+    total_hablantes = models.PositiveIntegerField(default=0)
+    total_anomalias_lipsync = models.PositiveIntegerField(default=0)
+    total_ausencias = models.PositiveIntegerField(default=0)
+    tiempo_total_ausencia_segundos = models.FloatField(default=0.0)
+    total_screenshots = models.PositiveIntegerField(default=0)
+    total_videos = models.PositiveIntegerField(default=0)
+    total_blocked_requests = models.PositiveIntegerField(default=0)
+    total_proxy_disconnections = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "resumen_analisis"
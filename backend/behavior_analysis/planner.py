@@ -0,0 +1,126 @@
+from django.db.models import Count, FloatField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from events.models import ParticipantEvent
+from .fragments import FRAGMENTO_SEGUNDOS_DEFAULT
+from .models import AnalisisFragmento
+
+# Prioridades de Celery (0 = mas alta en el transporte de Redis)
+PRIORIDAD_MAXIMA = 0
+PRIORIDAD_MINIMA = 9
+
+
+def _suma_fragmentos(campo):
+    # Subconsulta correlacionada: se resuelve dentro de la misma consulta
+    return Coalesce(
+        Subquery(
+            AnalisisFragmento.objects.filter(
+                participant_event=OuterRef("pk"), duracion__isnull=False
+            )
+            .values("participant_event")
+            .annotate(total=campo)
+            .values("total")[:1],
+            output_field=FloatField(),
+        ),
+        0.0,
+        output_field=FloatField(),
+    )
+
+
+def _segundos_por_byte(participantes):
+    """
+    Relacion duracion/tamaño del evento: la de los fragmentos ya analizados
+    con tamaño conocido o, sin ellos, la de un fragmento promedio del evento
+    con la duracion nominal. None si ningun fragmento tiene tamaño.
+    """
+    bytes_medidos = sum(pe.bytes_medidos for pe in participantes)
+    if bytes_medidos:
+        return sum(pe.segundos_medidos for pe in participantes) / bytes_medidos
+    bytes_totales = sum(pe.bytes_totales for pe in participantes)
+    if bytes_totales:
+        con_tamano = sum(pe.fragmentos_con_tamano for pe in participantes)
+        return con_tamano * FRAGMENTO_SEGUNDOS_DEFAULT / bytes_totales
+    return None
+
+
+def estimar_cargas(event):
+    """
+    Estima la carga de cada participante del evento en una sola consulta
+    agregada: cantidad de fragmentos de audio/video, duracion conocida (de
+    los fragmentos ya analizados) y tamaño de los fragmentos subidos. Los
+    fragmentos sin duracion se estiman por su tamaño (un fragmento cortado
+    pesa menos); sin tamaño cuentan con la duracion nominal del cliente de
+    escritorio.
+    """
+    media = Q(participantlog__name="audio/video", participantlog__url__isnull=False)
+    con_tamano = media & Q(participantlog__size_bytes__isnull=False)
+    medido = con_tamano & Q(participantlog__analisis_fragmento__duracion__isnull=False)
+    sin_medir = con_tamano & Q(participantlog__analisis_fragmento__duracion__isnull=True)
+    participantes = list(
+        ParticipantEvent.objects.filter(event=event)
+        .select_related("participant")
+        .annotate(
+            fragmentos=Count("participantlog", filter=media),
+            duracion_conocida=_suma_fragmentos(Sum("duracion")),
+            fragmentos_con_duracion=_suma_fragmentos(Count("id")),
+            fragmentos_con_tamano=Count("participantlog", filter=con_tamano),
+            bytes_totales=Coalesce(Sum("participantlog__size_bytes", filter=con_tamano), 0),
+            bytes_medidos=Coalesce(Sum("participantlog__size_bytes", filter=medido), 0),
+            segundos_medidos=Coalesce(
+                Sum("participantlog__analisis_fragmento__duracion", filter=medido),
+                0.0,
+                output_field=FloatField(),
+            ),
+            fragmentos_sin_medir=Count("participantlog", filter=sin_medir),
+            bytes_sin_medir=Coalesce(Sum("participantlog__size_bytes", filter=sin_medir), 0),
+        )
+    )
+    segundos_por_byte = _segundos_por_byte(participantes)
+
+    cargas = []
+    for pe in participantes:
+        sin_duracion = max(0, pe.fragmentos - int(pe.fragmentos_con_duracion))
+        segundos = pe.duracion_conocida
+        if segundos_por_byte is not None:
+            sin_duracion = max(0, sin_duracion - pe.fragmentos_sin_medir)
+            segundos += pe.bytes_sin_medir * segundos_por_byte
+        cargas.append(
+            {
+                "participant_event_id": pe.id,
+                "participant_name": pe.participant.name,
+                "fragmentos": pe.fragmentos,
+                "segundos_estimados": round(
+                    segundos + sin_duracion * FRAGMENTO_SEGUNDOS_DEFAULT, 2
+                ),
+            }
+        )
+    return cargas
+
+
+def planificar_evento(event):
+    """
+    Ordena a los participantes con media de mayor a menor carga (LPT: el
+    trabajo mas largo primero acorta el tiempo total del evento con un numero
+    fijo de workers) y les asigna una prioridad de Celery decreciente.
+
+    Returns:
+        tuple: (plan, omitidos)
+    """
+    cargas = estimar_cargas(event)
+    omitidos = [
+        {
+            "participant_event_id": c["participant_event_id"],
+            "participant_name": c["participant_name"],
+            "reason": "sin_videos",
+        }
+        for c in cargas
+        if not c["fragmentos"]
+    ]
+    plan = sorted(
+        (c for c in cargas if c["fragmentos"]),
+        key=lambda c: (-c["segundos_estimados"], c["participant_event_id"]),
+    )
+    niveles = PRIORIDAD_MINIMA - PRIORIDAD_MAXIMA + 1
+    for posicion, carga in enumerate(plan):
+        carga["prioridad"] = PRIORIDAD_MAXIMA + posicion * niveles // len(plan)
+    return plan, omitidos
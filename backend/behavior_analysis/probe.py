@@ -0,0 +1,54 @@
+import json
+import logging
+import subprocess
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def probar_video(path: str, timeout: int = 60) -> Optional[Dict[str, Any]]:
+    """
+    Ejecuta ffprobe sobre `path` y retorna {"duracion", "video", "audio"} con
+    los parametros de la primera pista de cada tipo, o None si falla.
+    """
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=duration:stream=codec_type,codec_name,width,height,"
+        "r_frame_rate,time_base,pix_fmt,sample_rate,channels",
+        "-of",
+        "json",
+        path,
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except (FileNotFoundError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"ffprobe unavailable for {path}: {e}")
+        return None
+    if result.returncode != 0:
+        logger.warning(f"ffprobe failed for {path}: {result.stderr.strip()}")
+        return None
+
+    try:
+        data = json.loads(result.stdout or "{}")
+    except json.JSONDecodeError:
+        return None
+
+    info = {"duracion": None, "video": None, "audio": None}
+    try:
+        info["duracion"] = float(data.get("format", {}).get("duration"))
+    except (TypeError, ValueError):
+        pass
+    for stream in data.get("streams", []):
+        tipo = stream.get("codec_type")
+        if tipo in ("video", "audio") and info[tipo] is None:
+            info[tipo] = {k: v for k, v in stream.items() if k != "codec_type"}
+    return info
+
+
+def duracion_video(path: str) -> Optional[float]:
+    """Duracion en segundos segun ffprobe (None si no se puede determinar)."""
+    info = probar_video(path)
+    return info["duracion"] if info else None
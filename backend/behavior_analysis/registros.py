@@ -0,0 +1,185 @@
+import os
+
+from .models import (
+    AnomaliaLipsync,
+    RegistroAusencia,
+    RegistroGesto,
+    RegistroIluminacion,
+    RegistroRostro,
+    RegistrosEmpaquetados,
+    RegistroVoz,
+)
+
+# Tipo de registro -> (modelo, relacion en AnalisisComportamiento, columnas)
+REGISTROS = {
+    "rostros": (
+        RegistroRostro,
+        "registros_rostros",
+        ("id", "persona_id", "tiempo_inicio", "tiempo_fin"),
+    ),
+    "gestos": (
+        RegistroGesto,
+        "registros_gestos",
+        ("id", "tipo_gesto", "tiempo_inicio", "tiempo_fin", "duracion"),
+    ),
+    "iluminacion": (
+        RegistroIluminacion,
+        "registros_iluminacion",
+        ("id", "tiempo_inicio", "tiempo_fin"),
+    ),
+    "voz": (
+        RegistroVoz,
+        "registros_voz",
+        ("id", "tipo_log", "etiqueta_hablante", "tiempo_inicio", "tiempo_fin"),
+    ),
+    "lipsync": (
+        AnomaliaLipsync,
+        "anomalias_lipsync",
+        ("id", "tipo_anomalia", "tiempo_inicio", "tiempo_fin"),
+    ),
+    "ausencias": (
+        RegistroAusencia,
+        "registros_ausencia",
+        ("id", "tiempo_inicio", "tiempo_fin", "duracion"),
+    ),
+}
+
+
+def empaquetado_habilitado():
+    return os.getenv("ANALYSIS_PACKED_STORAGE", "false").strip().lower() in ("1", "true", "yes")
+
+
+def filas_de_resultados(resultados):
+    """Convierte la salida de analizar_video_local en filas por tipo de registro."""
+    voz = resultados["voz"]
+    return {
+        "rostros": [
+            {
+                "persona_id": r["persona_id"],
+                "tiempo_inicio": r["tiempo_inicio"],
+                "tiempo_fin": r["tiempo_fin"],
+            }
+            for r in resultados["rostros"]
+        ],
+        "gestos": [
+            {
+                "tipo_gesto": g["tipo_gesto"],
+                "tiempo_inicio": g["tiempo_inicio"],
+                "tiempo_fin": g["tiempo_fin"],
+                "duracion": g["duracion"],
+            }
+            for g in resultados["gestos"]
+        ],
+        "iluminacion": [
+            {"tiempo_inicio": i["tiempo_inicio"], "tiempo_fin": i["tiempo_fin"]}
+            for i in resultados["iluminacion"]
+        ],
+        "voz": [
+            {
+                "tipo_log": "susurro",
+                "etiqueta_hablante": None,
+                "tiempo_inicio": s[0],
+                "tiempo_fin": s[1],
+            }
+            for s in voz["susurros"]
+        ]
+        + [
+            {
+                "tipo_log": "hablante",
+                "etiqueta_hablante": h["etiqueta"],
+                "tiempo_inicio": h["tiempo_inicio"],
+                "tiempo_fin": h["tiempo_fin"],
+            }
+            for h in voz["hablantes"]
+        ],
+        "lipsync": [
+            {
+                "tipo_anomalia": a["tipo_anomalia"],
+                "tiempo_inicio": a["tiempo_inicio"],
+                "tiempo_fin": a["tiempo_fin"],
+            }
+            for a in resultados["lipsync"]
+        ],
+        "ausencias": [
+            {"tiempo_inicio": start, "tiempo_fin": end, "duracion": duration}
+            for start, end, duration in resultados["ausencia"]
+        ],
+    }
+
+
+def _empaquetar(analisis, tipo, filas):
+    columnas = REGISTROS[tipo][2][1:]
+    filas = sorted(filas, key=lambda fila: fila["tiempo_inicio"])
+    return RegistrosEmpaquetados(
+        analisis=analisis,
+        tipo=tipo,
+        cantidad=len(filas),
+        columnas={columna: [fila[columna] for fila in filas] for columna in columnas},
+    )
+
+
+def guardar_registros(analisis, resultados):
+    """
+    Guarda los resultados como filas en las tablas registro_* o, con
+    ANALYSIS_PACKED_STORAGE, como un registro empaquetado por analizador.
+    """
+    filas = filas_de_resultados(resultados)
+    if empaquetado_habilitado():
+        RegistrosEmpaquetados.objects.bulk_create(
+            [_empaquetar(analisis, tipo, filas[tipo]) for tipo in REGISTROS]
+        )
+    else:
+        for tipo, (modelo, _, _) in REGISTROS.items():
+            modelo.objects.bulk_create(
+                [modelo(analisis=analisis, **fila) for fila in filas[tipo]]
+            )
+    analisis._empaquetados = None
+
+
+def eliminar_registros(analisis):
+    """Borra los registros de una ejecucion anterior (en filas o empaquetados)."""
+    for modelo, _, _ in REGISTROS.values():
+        modelo.objects.filter(analisis=analisis).delete()
+    RegistrosEmpaquetados.objects.filter(analisis=analisis).delete()
+    analisis._empaquetados = None
+
+
+def empaquetados(analisis):
+    """{tipo: RegistrosEmpaquetados} del analisis (una consulta, cacheada en la instancia)."""
+    if getattr(analisis, "_empaquetados", None) is None:
+        analisis._empaquetados = {
+            paquete.tipo: paquete for paquete in analisis.registros_empaquetados.all()
+        }
+    return analisis._empaquetados
+
+
+def _desempaquetar(paquete, columnas):
+    datos = paquete.columnas
+    return [
+        {
+            columna: idx + 1 if columna == "id" else datos[columna][idx]
+            for columna in columnas
+        }
+        for idx in range(paquete.cantidad)
+    ]
+
+
+def filas_registro(analisis, tipo):
+    """
+    Registros de `tipo` con las columnas de REGISTROS, ordenados por
+    (tiempo_inicio, id), sin importar como se guardaron. En los empaquetados
+    el id es la posicion (1..n) dentro del paquete.
+    """
+    _, relacion, columnas = REGISTROS[tipo]
+    paquetes = empaquetados(analisis)
+    if paquetes:
+        paquete = paquetes.get(tipo)
+        return _desempaquetar(paquete, columnas) if paquete else []
+    return list(
+        getattr(analisis, relacion).values(*columnas).order_by("tiempo_inicio", "id")
+    )
+
+
+def todas_las_filas(analisis):
+    """{tipo: filas} de los seis analizadores."""
+    return {tipo: filas_registro(analisis, tipo) for tipo in REGISTROS}
@@ -0,0 +1,322 @@
+import base64
+import bisect
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from events.models import ParticipantLog
+from events.s3_service import s3_service
+from .models import AnalisisComportamiento
+from .registros import REGISTROS, empaquetados, filas_registro, todas_las_filas
+from .resumen import obtener_resumen, resumen_a_dict
+
+logger = logging.getLogger(__name__)
+
+# Vigencia de las URLs firmadas que se agregan al reporte
+REPORT_URL_EXPIRATION = int(os.getenv("REPORT_URL_EXPIRATION", "3600"))
+# Las URLs se firman por ventana de media vigencia: una copia cacheada por el
+# cliente (304) siempre conserva al menos la mitad del tiempo de validez
+VENTANA_FIRMA = max(1, REPORT_URL_EXPIRATION // 2)
+
+
+# Tamano de pagina de registros/screenshots del reporte
+PAGINA_DEFAULT = 200
+PAGINA_MAXIMA = 1000
+
+def reportes_habilitados():
+    return os.getenv("REPORT_ARTIFACTS", "false").strip().lower() in ("1", "true", "yes")
+
+
+def construir_reporte(participant_event, analysis):
+    """
+    Reporte completo del analisis con keys de storage en lugar de URLs
+    firmadas (ver firmar_reporte), para poder guardarlo y reutilizarlo.
+    """
+    # Una consulta por tabla, o una sola si el analisis esta empaquetado
+    registros = todas_las_filas(analysis)
+
+    # Logs de actividad del participante (excluyendo keylogger); "url" guarda la key
+    screenshots_logs = list(
+        ParticipantLog.objects.filter(
+            participant_event=participant_event, name="screen"
+        )
+        .values("id", "timestamp", "url", "message")
+        .order_by("timestamp")
+    )
+    # Solo peticiones bloqueadas (las unicas que se guardan en logs HTTP)
+    blocked_requests = list(
+        ParticipantLog.objects.filter(participant_event=participant_event, name="http")
+        .values("id", "message", "timestamp", "url")
+        .order_by("-timestamp")[:100]
+    )
+
+    return {
+        "event": {
+            "id": participant_event.event.id,
+            "name": participant_event.event.name,
+            "duration": participant_event.event.duration,
+        },
+        "participant": {
+            "id": participant_event.participant.id,
+            "name": participant_event.participant.name,
+            "email": participant_event.participant.email,
+        },
+        "analysis": {
+            "id": analysis.id,
+            "status": analysis.status,
+            # Resultados preliminares (baja tasa) hasta que termine la pasada completa
+            "nivel": analysis.nivel,
+            "es_preliminar": analysis.nivel == "preliminar",
+            "video_link": analysis.video_link,
+            "video_key": analysis.video_link,
+            "fecha_procesamiento": analysis.fecha_procesamiento,
+        },
+        # Estadisticas materializadas (se calculan una vez al guardar el analisis)
+        "statistics": resumen_a_dict(obtener_resumen(analysis)),
+        "registros": registros,
+        "activity_logs": {
+            "screenshots": screenshots_logs,
+            "blocked_requests": blocked_requests,  # Limitado a las ultimas 100
+        },
+        "monitoring": {
+            "total_duration_seconds": participant_event.monitoring_total_duration or 0,
+            "sessions_count": participant_event.monitoring_sessions_count or 0,
+            "last_change": participant_event.monitoring_last_change,
+        },
+    }
+
+
+def _firmar(key):
+    if not key or not s3_service.is_configured():
+        return None
+    try:
+        return s3_service.generate_presigned_url(key, expiration=REPORT_URL_EXPIRATION)
+    except Exception:
+        return None
+
+
+def firmar_reporte(data, video_key=None):
+    """
+    Reemplaza las keys del reporte por URLs firmadas vigentes. `video_key` es
+    el video actual del analisis: la union en segundo plano (fan-out) puede
+    cambiarlo despues de renderizar el artefacto.
+    """
+    analysis = data["analysis"]
+    if video_key:
+        analysis["video_key"] = video_key
+    analysis["video_link"] = _firmar(analysis["video_key"]) or analysis["video_key"]
+    for screenshot in data["activity_logs"]["screenshots"]:
+        screenshot["url"] = _firmar(screenshot["url"])
+    return data
+
+
+def ventana_firma(ahora=None):
+    return int((ahora if ahora is not None else time.time()) // VENTANA_FIRMA)
+
+
+def _version_video(analysis):
+    return hashlib.sha1((analysis.video_link or "").encode("utf-8")).hexdigest()[:8]
+
+
+def etag_reporte(analysis, ventana=None):
+    """
+    ETag debil: la version del artefacto, el video actual del analisis y la
+    ventana de firma de URLs.
+    """
+    if not analysis.reporte_version:
+        return None
+    ventana = ventana_firma() if ventana is None else ventana
+    return f'W/"{analysis.reporte_version}-{_version_video(analysis)}-{ventana}"'
+
+
+def renderizar_reporte(analysis):
+    """
+    Renderiza el reporte de un analisis completado a JSON gzip en storage y
+    guarda su key y version. Reemplaza (y borra) el artefacto anterior.
+
+    Returns:
+        dict: {'success': bool, 'key': str, 'version': str, 'error': str}
+    """
+    if analysis.status != "completado":
+        return {"success": False, "error": f"Analysis status is {analysis.status}"}
+
+    participant_event = analysis.participant_event
+    data = construir_reporte(participant_event, analysis)
+    version = uuid.uuid4().hex
+    data["analysis"]["report_version"] = version
+    contenido = gzip.compress(
+        json.dumps(data, cls=DjangoJSONEncoder).encode("utf-8"), compresslevel=6
+    )
+
+    resultado = s3_service.upload_media_fragment(
+        io.BytesIO(contenido), participant_event.id, "analysis_report"
+    )
+    if not resultado["success"]:
+        return {"success": False, "error": resultado.get("error")}
+
+    anterior = analysis.reporte_key
+    actualizados = AnalisisComportamiento.objects.filter(
+        id=analysis.id, status="completado"
+    ).update(reporte_key=resultado["key"], reporte_version=version)
+    if not actualizados:
+        s3_service.delete_media_fragment(resultado["key"])
+        return {"success": False, "error": "Analysis changed while rendering report"}
+
+    if anterior:
+        s3_service.delete_media_fragment(anterior)
+    analysis.reporte_key = resultado["key"]
+    analysis.reporte_version = version
+    logger.info(
+        f"Rendered report for analysis {analysis.id}: {resultado['key']} ({len(contenido)} bytes)"
+    )
+    return {"success": True, "key": resultado["key"], "version": version}
+
+
+def _leer_artefacto(key):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "report.json.gz")
+        resultado = s3_service.download_file(key, path)
+        if not resultado["success"]:
+            return None
+        with gzip.open(path, "rb") as handle:
+            return json.load(handle)
+
+
+def reporte_servido(analysis, ventana=None):
+    """
+    Cuerpo JSON (bytes) del reporte pre-renderizado con las URLs de la
+    ventana de firma actual, o None si no hay artefacto disponible. El
+    resultado firmado se cachea por version y ventana.
+    """
+    if not analysis.reporte_key or not analysis.reporte_version:
+        return None
+
+    ventana = ventana_firma() if ventana is None else ventana
+    cache_key = (
+        f"analysis_report:{analysis.reporte_version}:{_version_video(analysis)}:{ventana}"
+    )
+    cuerpo = cache.get(cache_key)
+    if cuerpo is not None:
+        return cuerpo
+
+    try:
+        data = _leer_artefacto(analysis.reporte_key)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Unreadable report artifact {analysis.reporte_key}: {e}")
+        data = None
+    if data is None:
+        return None
+
+    cuerpo = json.dumps(
+        firmar_reporte(data, analysis.video_link), cls=DjangoJSONEncoder
+    ).encode("utf-8")
+    cache.set(cache_key, cuerpo, VENTANA_FIRMA)
+    return cuerpo
+
+
+def codificar_cursor(valor, id_):
+    """Cursor opaco con la clave (valor, id) de la ultima fila entregada."""
+    # isoformat completo: DjangoJSONEncoder recorta los microsegundos
+    if hasattr(valor, "isoformat"):
+        valor = valor.isoformat()
+    crudo = json.dumps([valor, id_]).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii")
+
+
+def decodificar_cursor(cursor):
+    """Retorna (valor, id); lanza ValueError si el cursor no es valido."""
+    try:
+        valor, id_ = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return valor, int(id_)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _paginar(queryset, campo, limite, cursor):
+    """
+    Paginacion keyset sobre (campo, id): el filtro y el LIMIT van en SQL, asi
+    cada pagina cuesta lo mismo sin importar cuantas filas la preceden.
+    """
+    if cursor:
+        valor, id_ = decodificar_cursor(cursor)
+        if campo == "timestamp":
+            valor = parse_datetime(valor) if isinstance(valor, str) else None
+            if valor is None:
+                raise ValueError(f"Invalid cursor: {cursor}")
+        queryset = queryset.filter(
+            Q(**{f"{campo}__gt": valor}) | Q(**{campo: valor, "id__gt": id_})
+        )
+    filas = list(queryset.order_by(campo, "id")[: limite + 1])
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor(filas[-1][campo], filas[-1]["id"])
+    return {"items": filas, "next_cursor": siguiente}
+
+
+def _paginar_filas(filas, campo, limite, cursor):
+    """Misma paginacion keyset que _paginar sobre filas ya ordenadas por (campo, id)."""
+    desde = 0
+    if cursor:
+        desde = bisect.bisect_right(
+            [(fila[campo], fila["id"]) for fila in filas], decodificar_cursor(cursor)
+        )
+    pagina = filas[desde : desde + limite]
+    siguiente = None
+    if desde + limite < len(filas):
+        siguiente = codificar_cursor(pagina[-1][campo], pagina[-1]["id"])
+    return {"items": pagina, "next_cursor": siguiente}
+
+
+def pagina_registros(analysis, tipo, t0=None, t1=None, cursor=None, limite=PAGINA_DEFAULT):
+    """
+    Pagina de registros de `tipo` que se solapan con la ventana [t0, t1)
+    (segundos del video), ordenados por (tiempo_inicio, id).
+    """
+    if empaquetados(analysis):
+        filas = [
+            fila
+            for fila in filas_registro(analysis, tipo)
+            if (t0 is None or fila["tiempo_fin"] >= t0)
+            and (t1 is None or fila["tiempo_inicio"] < t1)
+        ]
+        return _paginar_filas(filas, "tiempo_inicio", limite, cursor)
+
+    _, relacion, columnas = REGISTROS[tipo]
+    queryset = getattr(analysis, relacion).all()
+    if t0 is not None:
+        queryset = queryset.filter(tiempo_fin__gte=t0)
+    if t1 is not None:
+        queryset = queryset.filter(tiempo_inicio__lt=t1)
+    return _paginar(queryset.values(*columnas), "tiempo_inicio", limite, cursor)
+
+
+def pagina_screenshots(participant_event, desde=None, hasta=None, cursor=None, limite=PAGINA_DEFAULT):
+    """
+    Pagina de screenshots con timestamp en [desde, hasta), ordenados por
+    (timestamp, id), con URLs firmadas.
+    """
+    queryset = ParticipantLog.objects.filter(
+        participant_event=participant_event, name="screen"
+    )
+    if desde is not None:
+        queryset = queryset.filter(timestamp__gte=desde)
+    if hasta is not None:
+        queryset = queryset.filter(timestamp__lt=hasta)
+    pagina = _paginar(
+        queryset.values("id", "timestamp", "url", "message"), "timestamp", limite, cursor
+    )
+    for screenshot in pagina["items"]:
+        screenshot["url"] = _firmar(screenshot["url"])
+    return pagina
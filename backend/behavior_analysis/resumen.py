@@ -0,0 +1,153 @@
+from django.db.models import Count, F, Q, Sum
+
+from events.models import ParticipantLog
+from .models import AnalisisComportamiento, ResumenAnalisis
+from .registros import empaquetados
+
+# Nombre del ParticipantLog -> contador de actividad del resumen
+CONTADORES_LOG = {
+    "screen": "total_screenshots",
+    "audio/video": "total_videos",
+    "http": "total_blocked_requests",
+    "proxy": "total_proxy_disconnections",
+}
+
+CAMPOS_RESUMEN = (
+    "total_rostros_detectados",
+    "total_gestos",
+    "total_anomalias_iluminacion",
+    "total_anomalias_voz",
+    "total_hablantes",
+    "total_anomalias_lipsync",
+    "total_ausencias",
+    "tiempo_total_ausencia_segundos",
+    *CONTADORES_LOG.values(),
+)
+
+
+def _estadisticas_empaquetadas(paquetes):
+    def columna(tipo, nombre):
+        paquete = paquetes.get(tipo)
+        return paquete.columnas.get(nombre, []) if paquete else []
+
+    def cantidad(tipo):
+        paquete = paquetes.get(tipo)
+        return paquete.cantidad if paquete else 0
+
+    tipos_voz = columna("voz", "tipo_log")
+    return {
+        "total_rostros_detectados": len(set(columna("rostros", "persona_id"))),
+        "total_gestos": cantidad("gestos"),
+        "total_anomalias_iluminacion": cantidad("iluminacion"),
+        "total_anomalias_voz": tipos_voz.count("susurro"),
+        "total_hablantes": tipos_voz.count("hablante"),
+        "total_anomalias_lipsync": cantidad("lipsync"),
+        "total_ausencias": cantidad("ausencias"),
+        "tiempo_total_ausencia_segundos": round(sum(columna("ausencias", "duracion")), 2),
+    }
+
+
+def _estadisticas_analisis(analisis):
+    """Agregados de los registros del analisis (una consulta por tabla)."""
+    paquetes = empaquetados(analisis)
+    if paquetes:
+        return _estadisticas_empaquetadas(paquetes)
+    voz = analisis.registros_voz.aggregate(
+        susurros=Count("id", filter=Q(tipo_log="susurro")),
+        hablantes=Count("id", filter=Q(tipo_log="hablante")),
+    )
+    ausencias = analisis.registros_ausencia.aggregate(
+        total=Count("id"), segundos=Sum("duracion")
+    )
+    return {
+        "total_rostros_detectados": analisis.registros_rostros.values("persona_id")
+        .distinct()
+        .count(),
+        "total_gestos": analisis.registros_gestos.count(),
+        "total_anomalias_iluminacion": analisis.registros_iluminacion.count(),
+        "total_anomalias_voz": voz["susurros"],
+        "total_hablantes": voz["hablantes"],
+        "total_anomalias_lipsync": analisis.anomalias_lipsync.count(),
+        "total_ausencias": ausencias["total"],
+        "tiempo_total_ausencia_segundos": round(ausencias["segundos"] or 0.0, 2),
+    }
+
+
+def _contadores_actividad(participant_event_id):
+    return ParticipantLog.objects.filter(
+        participant_event_id=participant_event_id
+    ).aggregate(
+        **{
+            campo: Count("id", filter=Q(name=nombre))
+            for nombre, campo in CONTADORES_LOG.items()
+        }
+    )
+
+
+def contadores_actividad_por_participante(participant_event_ids):
+    """Contadores de actividad de varios participantes desde sus logs, en una consulta."""
+    filas = (
+        ParticipantLog.objects.filter(participant_event_id__in=participant_event_ids)
+        .values("participant_event_id")
+        .annotate(
+            **{
+                campo: Count("id", filter=Q(name=nombre))
+                for nombre, campo in CONTADORES_LOG.items()
+            }
+        )
+        .order_by()
+    )
+    return {fila.pop("participant_event_id"): fila for fila in filas}
+
+
+def actualizar_resumen_analisis(analisis):
+    """
+    Recalcula el resumen del participante a partir de los registros del
+    analisis y de sus logs. Se llama al guardar resultados, asi las vistas
+    de listado leen una fila en vez de agregar todos los registros.
+    """
+    valores = _estadisticas_analisis(analisis)
+    valores.update(_contadores_actividad(analisis.participant_event_id))
+    resumen, _ = ResumenAnalisis.objects.update_or_create(
+        participant_event_id=analisis.participant_event_id, defaults=valores
+    )
+    return resumen
+
+
+def registrar_log_en_resumen(participant_event_id, name):
+    """
+    Incrementa el contador de actividad correspondiente a un log nuevo. Si el
+    participante aun no tiene resumen lo crea, con los contadores calculados
+    desde sus logs, para que el monitoreo en vivo lea una fila.
+    """
+    campo = CONTADORES_LOG.get(name)
+    if campo is None:
+        return
+    if ResumenAnalisis.objects.filter(participant_event_id=participant_event_id).update(
+        **{campo: F(campo) + 1}
+    ):
+        return
+    analisis = AnalisisComportamiento.objects.filter(
+        participant_event_id=participant_event_id
+    ).first()
+    if analisis is not None:
+        actualizar_resumen_analisis(analisis)
+    else:
+        ResumenAnalisis.objects.get_or_create(
+            participant_event_id=participant_event_id,
+            defaults=_contadores_actividad(participant_event_id),
+        )
+
+
+def obtener_resumen(analisis):
+    """Resumen del participante; lo calcula si el analisis es anterior al resumen."""
+    resumen = ResumenAnalisis.objects.filter(
+        participant_event_id=analisis.participant_event_id
+    ).first()
+    if resumen is None:
+        resumen = actualizar_resumen_analisis(analisis)
+    return resumen
+
+
+def resumen_a_dict(resumen):
+    return {campo: getattr(resumen, campo) for campo in CAMPOS_RESUMEN}
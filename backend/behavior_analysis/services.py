@@ -6,16 +6,13 @@ import tempfile
 from django.utils import timezone
 from django.db import IntegrityError, transaction
 from events.s3_service import s3_service
-from .models import (
-    AnalisisComportamiento,
-    RegistroRostro,
-    RegistroGesto,
-    RegistroIluminacion,
-    RegistroVoz,
-    AnomaliaLipsync,
-    RegistroAusencia,
-)
+from events.storage import extract_s3_key
+from .models import AnalisisComportamiento
 from events.models import ParticipantEvent
+from .registros import eliminar_registros, guardar_registros
+from .reportes import reportes_habilitados
+from .resumen import actualizar_resumen_analisis
+from .descarga_progresiva import DescargaProgresiva
 from .analyzers.faces import AnalizadorRostros
 from .analyzers.gestures import AnalizadorGestos
 from .analyzers.lighting import AnalizadorIluminacion
@@ -24,13 +21,51 @@ from .analyzers.voice import AnalizadorVoz
 from .analyzers.absence import AnalizadorAusencia
 
 
-def procesar_video_completo(video_path, participant_event_id):
-    print(f"Iniciando análisis unificado para: {video_path}")
+# Perfiles de analisis. "preliminar" es una pasada rapida (2 fps, voz gruesa,
+# solo ausencia y multiples rostros) cuyos resultados se marcan como
+# provisionales hasta que la pasada "completo" los reemplaza.
+PERFILES_ANALISIS = {
+    "completo": {
+        "fps_muestreo": None,
+        "analizadores": (
+            "rostros",
+            "gestos",
+            "iluminacion",
+            "ausencia",
+            "lipsync",
+            "voz",
+        ),
+        "rostros_stride": 5,
+        "voz_segmento": 0.5,
+    },
+    "preliminar": {
+        "fps_muestreo": 2,
+        "analizadores": ("rostros", "ausencia", "voz"),
+        "rostros_stride": 1,
+        "voz_segmento": 1.0,
+    },
+}
+
+
+def _progresivo_habilitado():
+    return os.getenv("ANALYSIS_PROGRESSIVE", "false").strip().lower() in ("1", "true", "yes")
+
+
+def procesar_video_completo(video_path, participant_event_id, perfil="completo"):
+    print(f"Iniciando análisis unificado ({perfil}) para: {video_path}")
+
+    config = PERFILES_ANALISIS.get(perfil)
+    if config is None:
+        print(f"Error: perfil de análisis desconocido: {perfil}")
+        return None
 
     temp_file_path = None
     local_video_path = video_path
+    progresiva = None
 
     def _cleanup_temp():
+        if progresiva is not None:
+            progresiva.cerrar()
         if temp_file_path and os.path.exists(temp_file_path):
             try:
                 os.remove(temp_file_path)
@@ -56,6 +91,20 @@ def procesar_video_completo(video_path, participant_event_id):
     # Obtener registro existente y actualizar estado
     try:
         analisis = AnalisisComportamiento.objects.get(participant_event=pe)
+        if (
+            perfil == "preliminar"
+            and analisis.nivel == "completo"
+            and analisis.status == "completado"
+        ):
+            # La pasada completa ya termino; el preliminar no aporta nada
+            print(f"Análisis completo ya disponible para {participant_event_id}")
+            return {"skipped": True, "reason": "full_analysis_available"}
+        # Si la pasada completa falla, los resultados preliminares siguen vigentes
+        conserva_preliminar = (
+            perfil == "completo"
+            and analisis.nivel == "preliminar"
+            and analisis.status == "completado"
+        )
         analisis.status = "procesando"
         analisis.save()
     except AnalisisComportamiento.DoesNotExist:
@@ -65,6 +114,17 @@ def procesar_video_completo(video_path, participant_event_id):
         _cleanup_temp()
         return None
 
+    def _marcar_error():
+        if conserva_preliminar:
+            print(
+                f"La pasada completa de {participant_event_id} falló; "
+                "se conservan los resultados preliminares"
+            )
+            analisis.status = "completado"
+        else:
+            analisis.status = "error"
+        analisis.save()
+
     # Ajustar threading de OpenCV si se define en env
     try:
         cv2.setUseOptimized(True)
@@ -78,13 +138,33 @@ def procesar_video_completo(video_path, participant_event_id):
     except Exception as e:
         print(f"OpenCV thread config error: {e}")
 
+    # Modo progresivo: decodificar lo que ya llego de la descarga (necesaria
+    # para el audio) mientras continua; el objeto se transfiere una sola vez
+    fuente_video = None
+    descarga = None
+    if (
+        _progresivo_habilitado()
+        and DescargaProgresiva.disponible()
+        and isinstance(video_path, str)
+        and not os.path.exists(video_path)
+    ):
+        key = extract_s3_key(video_path)
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=_infer_suffix(key))
+        temp_file_path = temp_file.name
+        temp_file.close()
+        progresiva = DescargaProgresiva(key, temp_file_path)
+        fuente_video = progresiva.iniciar()
+        descarga = progresiva.futuro
+        local_video_path = temp_file_path
+        print(f"Análisis progresivo de {key} durante la descarga")
+
     # Descargar el video si viene como URL o clave de S3 para procesarlo localmente
     try:
-        if isinstance(video_path, str):
+        if descarga is None and isinstance(video_path, str):
             key = None
             if video_path.startswith("http"):
                 # Extraer la key del objeto desde la URL p�blica de S3
-                key = video_path.split(".amazonaws.com/")[-1].split("?")[0]
+                key = extract_s3_key(video_path)
             elif not os.path.exists(video_path):
                 # No es una ruta local existente, asumir que es la key de S3
                 key = video_path
@@ -99,55 +179,22 @@ def procesar_video_completo(video_path, participant_event_id):
                     print(
                         f"Error: no se pudo descargar el video desde S3: {download_result.get('error')}"
                     )
-                    analisis.status = "error"
-                    analisis.save()
+                    _marcar_error()
                     _cleanup_temp()
                     return None
 
                 local_video_path = temp_file_path
     except Exception as e:
         print(f"Error descargando video remoto: {e}")
-        analisis.status = "error"
-        analisis.save()
+        _marcar_error()
         _cleanup_temp()
         return None
-    # Inicializar analizadores con la ruta local (descargada o original)
-    rostros = AnalizadorRostros()
-    gestos = AnalizadorGestos()
-    iluminacion = AnalizadorIluminacion()
-    lipsync = AnalizadorLipsync(local_video_path)
-    voz = AnalizadorVoz(local_video_path)
-    ausencia = AnalizadorAusencia()
-
-    # Ejecutar análisis de voz en hilo separado
-    voz_resultado = {}
-
-    def run_voice():
-        nonlocal voz_resultado
-        voz_resultado = voz.procesar()
-
-    voice_thread = threading.Thread(target=run_voice)
-    voice_thread.start()
-
-    # Configurar MediaPipe FaceMesh (compartido)
-    mp_face_mesh = mp.solutions.face_mesh
-    face_mesh = mp_face_mesh.FaceMesh(
-        static_image_mode=False,
-        max_num_faces=1,
-        refine_landmarks=True,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5,
-    )
-
     # Fallback: si todav�a tenemos una referencia remota, intenta descargar ahora
     if isinstance(local_video_path, str) and (
         local_video_path.startswith("http") or not os.path.exists(local_video_path)
     ):
         try:
-            if local_video_path.startswith("http"):
-                key = local_video_path.split(".amazonaws.com/")[-1].split("?")[0]
-            else:
-                key = local_video_path
+            key = extract_s3_key(local_video_path)
 
             temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=_infer_suffix(key))
             temp_file_path = temp_file.name
@@ -158,8 +205,7 @@ def procesar_video_completo(video_path, participant_event_id):
                 print(
                     f"Error: no se pudo descargar el video (fallback) desde S3: {download_result.get('error')}"
                 )
-                analisis.status = "error"
-                analisis.save()
+                _marcar_error()
                 _cleanup_temp()
                 return None
 
@@ -167,33 +213,146 @@ def procesar_video_completo(video_path, participant_event_id):
             local_video_path = temp_file_path
         except Exception as e:
             print(f"Error descargando video remoto (fallback): {e}")
-            analisis.status = "error"
-            analisis.save()
+            _marcar_error()
             _cleanup_temp()
             return None
     # Verificar existencia de archivo
     if not os.path.exists(local_video_path):
         print(f"Error: archivo no existe: {local_video_path}")
-        try:
-            analisis = AnalisisComportamiento.objects.get(
-                participant_event_id=participant_event_id
-            )
-            analisis.status = "error"
-            analisis.save()
-        except AnalisisComportamiento.DoesNotExist:
-            pass
+        _marcar_error()
         _cleanup_temp()
         return None
 
+    resultados = analizar_video_local(
+        local_video_path, perfil, fuente_video=fuente_video, descarga=descarga
+    )
+    if resultados is None:
+        _marcar_error()
+        _cleanup_temp()
+        return None
+
+    print("\nGuardando resultados en base de datos...")
+
+    actual = AnalisisComportamiento.objects.filter(pk=analisis.pk).first()
+    if actual is None:
+        print(f"Analysis {analisis.id} no longer exists; skipping save.")
+        _cleanup_temp()
+        return {"skipped": True, "reason": "analysis_deleted"}
+    if perfil == "preliminar" and actual.nivel == "completo" and actual.status == "completado":
+        # La pasada completa termino mientras corria el preliminar: no pisarla
+        print(f"Analysis {analisis.id} already has full results; discarding preview.")
+        _cleanup_temp()
+        return {"skipped": True, "reason": "full_analysis_available"}
+
+    try:
+        guardar_resultados(analisis, resultados, perfil)
+    except IntegrityError as e:
+        if not AnalisisComportamiento.objects.filter(pk=analisis.pk).exists():
+            print(f"Analysis {analisis.id} removed before save; skipping. ({e})")
+            _cleanup_temp()
+            return {"skipped": True, "reason": "analysis_deleted"}
+        raise
+
+    print("Analisis completado y guardado.")
+    _cleanup_temp()
+    return {"success": True, "id": analisis.id, "status": "completado", "nivel": perfil}
+
+
+def analizar_video_local(
+    local_video_path,
+    perfil="completo",
+    incluir_firmas=False,
+    fuente_video=None,
+    descarga=None,
+):
+    """
+    Ejecuta los analizadores del perfil sobre un archivo local y devuelve los
+    resultados en memoria (sin tocar la base de datos). Retorna None si el
+    video no se puede abrir.
+
+    Con `incluir_firmas` se agregan los embeddings medios de cada persona,
+    necesarios para reconciliar identidades entre fragmentos.
+
+    Con `fuente_video` (el FIFO de una DescargaProgresiva) los frames se
+    decodifican desde ahi mientras `descarga` (Future con el resultado de la
+    descarga) completa `local_video_path`; voz y lipsync esperan a que termine
+    para leer el audio.
+    """
+    config = PERFILES_ANALISIS[perfil]
+    activos = set(config["analizadores"])
+    fuente = fuente_video or local_video_path
+
+    def esperar_descarga():
+        if descarga is None:
+            return True
+        try:
+            resultado = descarga.result()
+        except Exception as e:
+            print(f"Error en la descarga en segundo plano: {e}")
+            return False
+        if not resultado.get("success"):
+            print(f"Error en la descarga en segundo plano: {resultado.get('error')}")
+            return False
+        return True
+
+    # Inicializar analizadores con la ruta local (descargada o original).
+    # Los que no forman parte del perfil quedan en None.
+    rostros = (
+        AnalizadorRostros(frame_stride=config["rostros_stride"])
+        if "rostros" in activos
+        else None
+    )
+    gestos = AnalizadorGestos() if "gestos" in activos else None
+    iluminacion = AnalizadorIluminacion() if "iluminacion" in activos else None
+    lipsync = (
+        AnalizadorLipsync(local_video_path, cargar_audio=descarga is None)
+        if "lipsync" in activos
+        else None
+    )
+    voz = (
+        AnalizadorVoz(local_video_path, segment_duration=config["voz_segmento"])
+        if "voz" in activos
+        else None
+    )
+    ausencia = AnalizadorAusencia() if "ausencia" in activos else None
+
+    # Ejecutar análisis de voz en hilo separado
+    voz_resultado = {}
+
+    def run_voice():
+        nonlocal voz_resultado
+        if esperar_descarga():
+            voz_resultado = voz.procesar()
+
+    voice_thread = threading.Thread(target=run_voice)
+    if voz is not None:
+        voice_thread.start()
+
+    # Configurar MediaPipe FaceMesh (compartido por gestos y lipsync)
+    face_mesh = None
+    if gestos is not None or lipsync is not None:
+        mp_face_mesh = mp.solutions.face_mesh
+        face_mesh = mp_face_mesh.FaceMesh(
+            static_image_mode=False,
+            max_num_faces=1,
+            refine_landmarks=True,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5,
+        )
+
     # Abrir video
-    cap = cv2.VideoCapture(local_video_path, cv2.CAP_FFMPEG)
+    cap = cv2.VideoCapture(fuente, cv2.CAP_FFMPEG)
     if not cap.isOpened():
-        cap = cv2.VideoCapture(local_video_path)
+        cap = cv2.VideoCapture(fuente)
+    if not cap.isOpened() and fuente != local_video_path and esperar_descarga():
+        print("No se pudo abrir el stream; usando el archivo descargado.")
+        cap = cv2.VideoCapture(local_video_path, cv2.CAP_FFMPEG)
+        if not cap.isOpened():
+            cap = cv2.VideoCapture(local_video_path)
     if not cap.isOpened():
         print("Error al abrir el video.")
-        analisis.status = "error"
-        analisis.save()
-        _cleanup_temp()
+        if voz is not None:
+            voice_thread.join()
         return None
 
     try:
@@ -205,13 +364,26 @@ def procesar_video_completo(video_path, participant_event_id):
     fps = cap.get(cv2.CAP_PROP_FPS)
     if fps <= 0:
         fps = 30
-    lipsync.set_fps(fps)
+    if lipsync is not None:
+        lipsync.set_fps(fps)
+
+    # Paso de muestreo: con fps_muestreo solo se decodifica 1 de cada N frames
+    paso_muestreo = 1
+    if config["fps_muestreo"]:
+        paso_muestreo = max(1, int(round(fps / config["fps_muestreo"])))
 
     frame_count = 0
     last_timestamp = 0
 
     print("Procesando video frame a frame...")
     while cap.isOpened():
+        if paso_muestreo > 1 and frame_count % paso_muestreo:
+            # grab() avanza sin decodificar el frame completo
+            if not cap.grab():
+                break
+            frame_count += 1
+            continue
+
         success, frame = cap.read()
         if not success:
             break
@@ -231,28 +403,34 @@ def procesar_video_completo(video_path, participant_event_id):
         h, w = frame.shape[:2]
 
         # 1. Rostros (YuNet) - Tiene su propio stride interno
-        rostros.procesar_frame(frame, timestamp)
+        if rostros is not None:
+            rostros.procesar_frame(frame, timestamp)
 
         # 2. Iluminación (OpenCV puro)
-        iluminacion.procesar_frame(frame, timestamp)
+        if iluminacion is not None:
+            iluminacion.procesar_frame(frame, timestamp)
 
         # 3. Ausencia (MediaPipe Face Detection)
-        ausencia.procesar_frame(frame, timestamp)
+        if ausencia is not None:
+            ausencia.procesar_frame(frame, timestamp)
 
         # 4. MediaPipe (Gestos + Lipsync)
-        # Convertir a RGB una vez
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = face_mesh.process(frame_rgb)
+        if face_mesh is not None:
+            # Convertir a RGB una vez
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            results = face_mesh.process(frame_rgb)
 
-        landmarks = None
-        if results.multi_face_landmarks:
-            landmarks = results.multi_face_landmarks[0]  # Tomamos el primero
+            landmarks = None
+            if results.multi_face_landmarks:
+                landmarks = results.multi_face_landmarks[0]  # Tomamos el primero
 
-        # Gestos
-        gestos.procesar_frame(landmarks, w, h, timestamp)
+            # Gestos
+            if gestos is not None:
+                gestos.procesar_frame(landmarks, w, h, timestamp)
 
-        # Lipsync
-        lipsync.procesar_frame(landmarks, timestamp)
+            # Lipsync
+            if lipsync is not None:
+                lipsync.procesar_frame(landmarks, timestamp)
 
         frame_count += 1
         if frame_count % 100 == 0:
@@ -262,110 +440,69 @@ def procesar_video_completo(video_path, participant_event_id):
             print(f"Procesado: {minutes:02d}:{seconds:02d}", end="\r")
 
     cap.release()
-    face_mesh.close()
+    if face_mesh is not None:
+        face_mesh.close()
 
     # Finalizar analizadores que requieran cierre
     # Usar el último timestamp real en lugar de calcularlo
     final_timestamp = last_timestamp if last_timestamp > 0 else frame_count / fps
-    gestos.finalizar(final_timestamp)
-    iluminacion.finalizar(final_timestamp)
-    res_ausencia = ausencia.finalizar(final_timestamp)
-
-    # Esperar a voz
-    voice_thread.join()
-
-    print("\nGuardando resultados en base de datos...")
+    if gestos is not None:
+        gestos.finalizar(final_timestamp)
+    if iluminacion is not None:
+        iluminacion.finalizar(final_timestamp)
+    res_ausencia = ausencia.finalizar(final_timestamp) if ausencia is not None else []
 
-    if not AnalisisComportamiento.objects.filter(pk=analisis.pk).exists():
-        print(f"Analysis {analisis.id} no longer exists; skipping save.")
-        _cleanup_temp()
-        return {"skipped": True, "reason": "analysis_deleted"}
+    # El audio de lipsync se carga cuando el archivo local esta completo
+    if lipsync is not None and descarga is not None and esperar_descarga():
+        lipsync.cargar_audio()
 
-    try:
-        with transaction.atomic():
-            # --- GUARDAR RESULTADOS ---
-
-            # 1. Rostros
-            res_rostros = rostros.obtener_resultados()
-            for r in res_rostros:
-                RegistroRostro.objects.create(
-                    analisis=analisis,
-                    persona_id=r["persona_id"],
-                    tiempo_inicio=r["tiempo_inicio"],
-                    tiempo_fin=r["tiempo_fin"],
-                )
-
-            # 2. Gestos
-            res_gestos = gestos.obtener_resultados()
-            for g in res_gestos:
-                RegistroGesto.objects.create(
-                    analisis=analisis,
-                    tipo_gesto=g["tipo_gesto"],
-                    tiempo_inicio=g["tiempo_inicio"],
-                    tiempo_fin=g["tiempo_fin"],
-                    duracion=g["duracion"],
-                )
-
-            # 3. Iluminacion
-            res_ilum = iluminacion.obtener_resultados()
-            for i in res_ilum:
-                RegistroIluminacion.objects.create(
-                    analisis=analisis,
-                    tiempo_inicio=i["tiempo_inicio"],
-                    tiempo_fin=i["tiempo_fin"],
-                )
-
-            # 4. Ausencia
-            for start, end, duration in res_ausencia:
-                RegistroAusencia.objects.create(
-                    analisis=analisis,
-                    tiempo_inicio=start,
-                    tiempo_fin=end,
-                    duracion=duration,
-                )
-
-            # 5. Lipsync
-            res_lipsync = lipsync.obtener_resultados()
-            for a in res_lipsync.get("anomalias", []):
-                AnomaliaLipsync.objects.create(
-                    analisis=analisis,
-                    tipo_anomalia=a["tipo_anomalia"],
-                    tiempo_inicio=a["tiempo_inicio"],
-                    tiempo_fin=a["tiempo_fin"],
-                )
-
-            # 6. Voz
-            if voz_resultado:
-                for susurro in voz_resultado.get("susurros", []):
-                    RegistroVoz.objects.create(
-                        analisis=analisis,
-                        tipo_log="susurro",
-                        tiempo_inicio=susurro[0],
-                        tiempo_fin=susurro[1],
-                    )
-
-                for hab in voz_resultado.get("hablantes", []):
-                    RegistroVoz.objects.create(
-                        analisis=analisis,
-                        tipo_log="hablante",
-                        etiqueta_hablante=hab["etiqueta"],
-                        tiempo_inicio=hab["tiempo_inicio"],
-                        tiempo_fin=hab["tiempo_fin"],
-                    )
-
-            analisis.status = "completado"
-            analisis.save()
-    except IntegrityError as e:
-        if not AnalisisComportamiento.objects.filter(pk=analisis.pk).exists():
-            print(f"Analysis {analisis.id} removed before save; skipping. ({e})")
-            _cleanup_temp()
-            return {"skipped": True, "reason": "analysis_deleted"}
-        raise
+    # Esperar a voz
+    if voz is not None:
+        voice_thread.join()
+    esperar_descarga()
+
+    resultados = {
+        "duracion": round(final_timestamp, 2),
+        "rostros": rostros.obtener_resultados() if rostros is not None else [],
+        "gestos": gestos.obtener_resultados() if gestos is not None else [],
+        "iluminacion": (
+            iluminacion.obtener_resultados() if iluminacion is not None else []
+        ),
+        "ausencia": [list(r) for r in res_ausencia],
+        "lipsync": (
+            lipsync.obtener_resultados().get("anomalias", [])
+            if lipsync is not None
+            else []
+        ),
+        "voz": {
+            "susurros": [
+                list(s) for s in (voz_resultado or {}).get("susurros", [])
+            ],
+            "hablantes": (voz_resultado or {}).get("hablantes", []),
+        },
+    }
+    if incluir_firmas and rostros is not None:
+        resultados["firmas_rostros"] = rostros.obtener_firmas()
+    return resultados
+
+
+def guardar_resultados(analisis, resultados, perfil="completo"):
+    """Reemplaza los registros del analisis por `resultados` y lo marca completado."""
+    with transaction.atomic():
+        # Reemplazar resultados previos (p.ej. los del preliminar)
+        eliminar_registros(analisis)
+        guardar_registros(analisis, resultados)
+
+        analisis.status = "completado"
+        analisis.nivel = perfil
+        # El artefacto del reporte anterior deja de servirse hasta renderizar el nuevo
+        analisis.reporte_version = ""
+        # La huella se registra despues, solo si el analisis vino de un video
+        analisis.huella_analisis = ""
+        analisis.save()
+        actualizar_resumen_analisis(analisis)
 
-    print("Analisis completado y guardado.")
-    _cleanup_temp()
-    return {"id": analisis.id, "status": "completado"}
+    if perfil == "completo" and reportes_habilitados():
+        from .tasks import render_report_task
 
-    # Limpieza del archivo temporal en caso de haber descargado desde S3
-    # (Se ejecutará al salir de la función)
-    # Nota: el código no llega aquí por los returns anteriores, se maneja en finally
+        transaction.on_commit(lambda: render_report_task.delay(analisis.id))
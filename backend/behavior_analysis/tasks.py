@@ -1,39 +1,300 @@
 import logging
-from celery import shared_task
+import os
+import uuid
+from celery import chain, chord, group, shared_task
+from celery.exceptions import Retry
+from django.utils import timezone
 from .services import procesar_video_completo
-from .models import AnalisisComportamiento
-from events.models import ParticipantEvent
+from .models import AnalisisComportamiento, AnalisisFragmento, ProcesamientoEvento
+from .fragments import analizar_fragmento, unir_fragmentos
+from .admission import AdmisionDiferida, admitir
+from .huellas import (
+    analisis_reutilizable,
+    huella_analisis,
+    huella_union,
+    reutilizacion_habilitada,
+    union_reutilizable,
+)
+from .locks import lock_etapa, lock_fin_evento
+from .reportes import renderizar_reporte
+from events.models import ParticipantEvent, ParticipantLog
+from events.storage import extract_s3_key
 from .video_merger import video_merger_service
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task
-def analyze_behavior_task(video_path, participant_event_id):
+def _two_tier_enabled():
+    return os.getenv("ANALYSIS_TWO_TIER", "false").strip().lower() in ("1", "true", "yes")
+
+
+def incremental_enabled():
+    return os.getenv("ANALYSIS_INCREMENTAL", "false").strip().lower() in ("1", "true", "yes")
+
+
+def rolling_merge_enabled():
+    return os.getenv("MERGE_ROLLING", "false").strip().lower() in ("1", "true", "yes")
+
+
+def _fanout_enabled():
+    return os.getenv("ANALYSIS_FANOUT", "false").strip().lower() in ("1", "true", "yes")
+
+
+def _duplicado(etapa, participant_event_id, task_id):
+    logger.info(
+        f"Skipping duplicate {etapa} for participant_event {participant_event_id}: "
+        f"task {task_id} in progress"
+    )
+    return {"success": False, "skipped": True, "reason": "duplicate", "task_id": task_id}
+
+
+def _owner(task):
+    return task.request.id or f"local-{uuid.uuid4()}"
+
+
+# Espera entre reintentos cuando el análisis no cabe en la memoria del host
+ADMISSION_RETRY_SECONDS = int(os.getenv("ANALYSIS_ADMISSION_RETRY_SECONDS", "60"))
+ADMISSION_MAX_RETRIES = int(os.getenv("ANALYSIS_ADMISSION_MAX_RETRIES", "120"))
+
+
+def _diferir(task, lock, owner, error):
+    # El lock de la etapa sigue tomado: el reintento conserva el mismo id, y
+    # se renueva para que no expire durante la espera
+    logger.info(f"[Task {task.request.id}] Deferred: {error}")
+    lock.renovar(owner)
+    raise task.retry(exc=error, countdown=ADMISSION_RETRY_SECONDS, max_retries=ADMISSION_MAX_RETRIES)
+
+
+def _analizar_admitido(task, lock, owner, video_path, perfil, trabajo):
+    """
+    Ejecuta `trabajo` tras la admision de memoria, con el lock de la etapa
+    renovado mientras corre. El lock se libera en toda salida salvo cuando
+    la admision se difiere y quedan reintentos.
+    """
+    reintentar = False
+    try:
+        with admitir(video_path, perfil):
+            with lock.mantener(owner):
+                return trabajo()
+    except AdmisionDiferida as e:
+        if (task.request.retries or 0) >= ADMISSION_MAX_RETRIES:
+            raise
+        reintentar = True
+        _diferir(task, lock, owner, e)
+    finally:
+        if not reintentar:
+            lock.liberar(owner)
+
+
+@shared_task(bind=True, acks_late=True)
+def analyze_behavior_task(self, video_path, participant_event_id, perfil="completo"):
     """
     Celery task to process the video analysis asynchronously.
+    `perfil` selecciona la pasada ("preliminar" o "completo").
     """
-    if not AnalisisComportamiento.objects.filter(
+    owner = _owner(self)
+    lock = lock_etapa("analysis", participant_event_id)
+    actual = lock.adquirir(owner)
+    if actual != owner:
+        return _duplicado("analysis", participant_event_id, actual)
+    return _analizar_admitido(
+        self,
+        lock,
+        owner,
+        video_path,
+        perfil,
+        lambda: _analizar_si_registrado(video_path, participant_event_id, perfil),
+    )
+
+
+def _analizar_si_registrado(video_path, participant_event_id, perfil):
+    analisis = AnalisisComportamiento.objects.filter(
         participant_event_id=participant_event_id
-    ).exists():
+    ).first()
+    if analisis is None:
         logger.info(
             "Skipping analysis for participant_event %s: analysis missing",
             participant_event_id,
         )
         return {"success": False, "skipped": True, "reason": "analysis_missing"}
-    return procesar_video_completo(video_path, participant_event_id)
+
+    huella = huella_analisis(video_path, perfil) if reutilizacion_habilitada() else None
+    if analisis_reutilizable(analisis, huella):
+        logger.info(
+            "Reusing %s analysis for participant_event %s: fingerprint unchanged",
+            perfil,
+            participant_event_id,
+        )
+        return {
+            "success": True,
+            "skipped": True,
+            "reused": True,
+            "reason": "fingerprint_match",
+            "id": analisis.id,
+            "status": analisis.status,
+            "nivel": analisis.nivel,
+        }
+
+    resultado = procesar_video_completo(video_path, participant_event_id, perfil)
+    if huella and resultado and resultado.get("status") == "completado":
+        AnalisisComportamiento.objects.filter(pk=analisis.pk).update(huella_analisis=huella)
+    return resultado
+
+
+def _completo_reutilizable(video_path, participant_event_id):
+    """True si el analisis completo guardado corresponde al video actual."""
+    if not reutilizacion_habilitada():
+        return False
+    analisis = AnalisisComportamiento.objects.filter(
+        participant_event_id=participant_event_id
+    ).first()
+    return analisis_reutilizable(analisis, huella_analisis(video_path, "completo"))
+
+
+@shared_task(bind=True, acks_late=True)
+def analyze_fragment_task(self, participant_log_id):
+    """
+    Analiza un fragmento de audio/video apenas se registra, durante el evento,
+    tras la admision de memoria (varios fragmentos pueden analizarse a la vez
+    en el mismo host). Los errores se devuelven como resultado: una excepcion
+    haria fallar el chord del participante y el del evento.
+    """
+    log = ParticipantLog.objects.filter(id=participant_log_id).only("url").first()
+    key = extract_s3_key(log.url) if log else None
+    try:
+        if not key:
+            return analizar_fragmento(participant_log_id)
+        with admitir(key, "completo"):
+            return analizar_fragmento(participant_log_id)
+    except AdmisionDiferida as e:
+        diferido = e
+    except Exception as e:
+        logger.error(f"Fragment analysis for log {participant_log_id} failed: {e}", exc_info=True)
+        return {'success': False, 'error': str(e), 'participant_log_id': participant_log_id}
+
+    if (self.request.retries or 0) >= ADMISSION_MAX_RETRIES:
+        return {'success': False, 'error': str(diferido), 'participant_log_id': participant_log_id}
+    logger.info(f"[Task {self.request.id}] Deferred: {diferido}")
+    raise self.retry(exc=diferido, countdown=ADMISSION_RETRY_SECONDS, max_retries=ADMISSION_MAX_RETRIES)
+
+
+@shared_task
+def rolling_merge_task(participant_event_id):
+    """
+    Agrega los fragmentos nuevos al video intermedio del participante
+    durante el evento, para que al finalizar quede poco por unir.
+    """
+    return video_merger_service.append_to_rolling_merge(participant_event_id)
+
+
+@shared_task(acks_late=True)
+def stitch_fragments_task(participant_event_id):
+    """
+    Paso reduce del modo fan-out: une los análisis de cada fragmento.
+    Los fragmentos que fallaron no se re-analizan aquí.
+    """
+    try:
+        result = unir_fragmentos(participant_event_id, analizar_pendientes=False)
+    except Exception as e:
+        logger.error(f"Stitching fragments of participant_event {participant_event_id} failed: {e}", exc_info=True)
+        result = {'success': False, 'error': str(e)}
+    return dict(result, participant_event_id=participant_event_id, analysis_mode='fanout')
+
+
+@shared_task(bind=True)
+def merge_participant_videos_task(self, participant_event_id):
+    """
+    Une los videos del participante fuera del camino crítico del análisis
+    (modo fan-out) y apunta el análisis al video unido para su reproducción.
+    """
+    owner = _owner(self)
+    lock = lock_etapa("merge", participant_event_id)
+    actual = lock.adquirir(owner)
+    if actual != owner:
+        return _duplicado("merge", participant_event_id, actual)
+    with lock.mantener(owner):
+        merge_result = video_merger_service.merge_participant_videos(participant_event_id)
+    video_key = merge_result.get('s3_key') or merge_result.get('video_key') or merge_result.get('key')
+    if merge_result.get('success') and video_key:
+        AnalisisComportamiento.objects.filter(
+            participant_event_id=participant_event_id
+        ).update(
+            video_link=video_key,
+            video_analisis_link=merge_result.get('analysis_key') or "",
+            huella_union="",
+        )
+    else:
+        logger.warning(f"Merge for participant_event {participant_event_id} failed: {merge_result.get('error')}")
+    return merge_result
+
+
+def _dispatch_fragment_fanout(task, participant_event, participant_name):
+    """
+    Reemplaza la tarea por un subtask de análisis por fragmento y un reduce
+    que los une; el resultado del reduce sigue la cadena del participante,
+    así el chord de fin de evento espera a que termine.
+    """
+    participant_event_id = participant_event.id
+    log_ids = list(
+        ParticipantLog.objects.filter(
+            participant_event_id=participant_event_id,
+            name="audio/video",
+            url__isnull=False,
+        ).order_by("timestamp", "id").values_list("id", "url")
+    )
+    if not log_ids:
+        msg = f"No video logs for participant_event {participant_event_id}, skipping analysis"
+        logger.info(f"[Task {task.request.id}] {msg}")
+        return {
+            'success': False,
+            'skipped': True,
+            'error': msg,
+            'participant_event_id': participant_event_id,
+            'participant_name': participant_name
+        }
+
+    # Hasta que termine la unión, el análisis apunta al primer fragmento
+    AnalisisComportamiento.objects.update_or_create(
+        participant_event=participant_event,
+        defaults={
+            "video_link": log_ids[0][1],
+            "video_analisis_link": "",
+            "status": "pendiente",
+            "huella_union": "",
+        },
+    )
+    merge_task = merge_participant_videos_task.delay(participant_event_id)
+    logger.info(
+        f"[Task {task.request.id}] Fan-out analysis of {len(log_ids)} fragments started "
+        f"(merge: {merge_task.id})"
+    )
+    return task.replace(
+        chord(
+            group(analyze_fragment_task.si(log_id) for log_id, _ in log_ids),
+            stitch_fragments_task.si(participant_event_id),
+        )
+    )
 
 
 @shared_task(bind=True)
-def process_participant_completion_task(self, participant_event_id, event_id, event_name):
+def process_participant_completion_task(
+    self, participant_event_id, event_id, event_name, two_tier=None, fanout=None
+):
     """
     Tarea asíncrona para procesar la finalización de un participante específico.
-    Esta tarea se ejecuta en paralelo para cada participante.
+    Esta tarea se ejecuta en paralelo para cada participante y cubre la unión
+    y el registro del análisis (pasos 1-2); el análisis lo ejecuta
+    analyze_merged_video_task como siguiente eslabón de la cadena.
     
     Args:
         participant_event_id: ID del ParticipantEvent
         event_id: ID del evento (para logging)
         event_name: Nombre del evento (para logging)
+        two_tier: Si es True, ejecuta primero una pasada preliminar y luego la
+            completa. None usa la variable de entorno ANALYSIS_TWO_TIER.
+        fanout: Si es True, analiza cada fragmento original en un subtask y
+            une los resultados, sin esperar al video unido. None usa la
+            variable de entorno ANALYSIS_FANOUT.
     """
     try:
         # Verificar que el ParticipantEvent existe
@@ -47,9 +308,43 @@ def process_participant_completion_task(self, participant_event_id, event_id, ev
         participant_name = participant_event.participant.name
         logger.info(f"[Task {self.request.id}] Processing participant {participant_name} (ID: {participant_event_id}) for event {event_name}")
 
-        # Paso 1: Unir videos del participante
-        logger.info(f"[Task {self.request.id}] Step 1/3: Merging videos for participant {participant_name}")
-        merge_result = video_merger_service.merge_participant_videos(participant_event_id)
+        if fanout is None:
+            fanout = _fanout_enabled()
+        if fanout:
+            return _dispatch_fragment_fanout(self, participant_event, participant_name)
+
+        # Paso 1: Unir videos del participante (o reutilizar la union previa
+        # si los fragmentos y los ajustes no cambiaron)
+        huella = huella_union(participant_event_id) if reutilizacion_habilitada() else None
+        analisis_previo = AnalisisComportamiento.objects.filter(
+            participant_event=participant_event
+        ).first()
+        if union_reutilizable(analisis_previo, huella):
+            logger.info(f"[Task {self.request.id}] Step 1/3: Reusing merged video for participant {participant_name}")
+            merge_result = {
+                'success': True,
+                'video_key': analisis_previo.video_link,
+                's3_key': analisis_previo.video_link,
+                'analysis_key': analisis_previo.video_analisis_link,
+                'video_url': None,
+                'merged_count': ParticipantLog.objects.filter(
+                    participant_event_id=participant_event_id,
+                    name="audio/video",
+                    url__isnull=False,
+                ).count(),
+                'merge_skipped': True,
+                'skip_reason': 'fingerprint_match',
+                'reused': True,
+            }
+        else:
+            logger.info(f"[Task {self.request.id}] Step 1/3: Merging videos for participant {participant_name}")
+            owner = _owner(self)
+            lock = lock_etapa("merge", participant_event_id)
+            actual = lock.adquirir(owner)
+            if actual != owner:
+                return _duplicado("merge", participant_event_id, actual)
+            with lock.mantener(owner):
+                merge_result = video_merger_service.merge_participant_videos(participant_event_id)
 
         # Si no hay videos, marcamos como omitido y no avanzamos
         if merge_result.get('skipped'):
@@ -90,17 +385,29 @@ def process_participant_completion_task(self, participant_event_id, event_id, ev
         
         # Paso 2: Registrar análisis con el video unido
         logger.info(f"[Task {self.request.id}] Step 2/3: Registering analysis for participant {participant_name}")
-        analisis, created = AnalisisComportamiento.objects.update_or_create(
-            participant_event=participant_event,
-            defaults={"video_link": video_key, "status": "pendiente"},
-        )
+        # El análisis lee la copia reducida si el merge la generó
+        analysis_key = merge_result.get('analysis_key') or ""
+        analysis_source = analysis_key or video_key
+        if merge_result.get('reused'):
+            # Mismo video: se conserva el estado para poder reutilizar el analisis
+            created = False
+        else:
+            analisis, created = AnalisisComportamiento.objects.update_or_create(
+                participant_event=participant_event,
+                defaults={
+                    "video_link": video_key,
+                    "video_analisis_link": analysis_key,
+                    "status": "pendiente",
+                    "huella_union": huella or "",
+                },
+            )
         logger.info(f"[Task {self.request.id}] Analysis registered (created: {created})")
         
-        # Paso 3: Iniciar análisis de comportamiento
-        logger.info(f"[Task {self.request.id}] Step 3/3: Starting behavior analysis for participant {participant_name}")
-        analysis_task = analyze_behavior_task.delay(video_key, participant_event_id)
-        logger.info(f"[Task {self.request.id}] Behavior analysis task started: {analysis_task.id}")
-        
+        if two_tier is None:
+            two_tier = _two_tier_enabled()
+
+        # El paso 3 corre en la cola de análisis como siguiente eslabón de la
+        # cadena (ver _participant_completion_chain)
         result = {
             'success': True,
             'participant_event_id': participant_event_id,
@@ -108,11 +415,14 @@ def process_participant_completion_task(self, participant_event_id, event_id, ev
             'video_url': video_url,
             'video_key': video_key,
             'merged_count': merged_count,
-            'analysis_task_id': analysis_task.id,
+            'analysis_source': analysis_source,
+            'analysis_pending': True,
+            'two_tier': bool(two_tier),
+            'reused': {'merge': bool(merge_result.get('reused'))},
             'processing_task_id': self.request.id
         }
-        
-        logger.info(f"[Task {self.request.id}] ✓ Participant {participant_name} processing completed successfully")
+
+        logger.info(f"[Task {self.request.id}] ✓ Participant {participant_name} videos ready for analysis")
         return result
         
     except Exception as e:
@@ -124,3 +434,229 @@ def process_participant_completion_task(self, participant_event_id, event_id, ev
             'participant_event_id': participant_event_id,
             'processing_task_id': self.request.id
         }
+
+
+@shared_task(bind=True, acks_late=True)
+def analyze_merged_video_task(self, merge_result):
+    """
+    Paso 3/3, en la cola de análisis: recibe el resultado de
+    process_participant_completion_task y analiza el video unido (o une los
+    análisis por fragmento si ya existen). Los resultados omitidos, fallidos
+    o de fan-out se devuelven sin cambios. Los errores se devuelven como
+    resultado fallido para que el chord del evento llegue a su callback.
+
+    Con dos niveles la tarea solo corre la pasada preliminar y se reemplaza
+    por otra tarea de la cola de análisis para la completa: el worker queda
+    libre y las preliminares de los demás participantes no esperan detrás
+    de pasadas completas.
+    """
+    if not merge_result or not merge_result.get('analysis_pending'):
+        return merge_result
+
+    participant_event_id = merge_result['participant_event_id']
+    owner = _owner(self)
+    lock = lock_etapa("analysis", participant_event_id)
+    actual = lock.adquirir(owner)
+    if actual != owner:
+        return dict(merge_result, **_duplicado("analysis", participant_event_id, actual))
+    perfil = "preliminar" if _toca_preliminar(merge_result) else "completo"
+    try:
+        result = _analizar_admitido(
+            self,
+            lock,
+            owner,
+            merge_result['analysis_source'],
+            perfil,
+            lambda: _analizar_union(self, merge_result, perfil),
+        )
+    except Retry:
+        raise
+    except Exception as e:
+        error_msg = f"Analysis of participant_event {participant_event_id} failed: {e}"
+        logger.error(f"[Task {self.request.id}] {error_msg}", exc_info=True)
+        result = {k: v for k, v in merge_result.items() if k not in ('analysis_pending', 'analysis_source')}
+        return dict(result, success=False, error=error_msg, analysis_task_id=self.request.id)
+
+    if perfil == "preliminar":
+        completa = analyze_merged_video_task.si(
+            dict(merge_result, two_tier=False, preview=result.get('preview'))
+        )
+        priority = (getattr(self.request, 'delivery_info', None) or {}).get('priority')
+        if priority is not None:
+            completa = completa.set(priority=priority)
+        return self.replace(completa)
+    return result
+
+
+def _toca_preliminar(merge_result):
+    """True si corresponde la pasada preliminar antes de la completa."""
+    participant_event_id = merge_result['participant_event_id']
+    return bool(
+        merge_result.get('two_tier')
+        and not AnalisisFragmento.objects.filter(participant_event_id=participant_event_id).exists()
+        # Si la completa se reutiliza, la preliminar sobra y ademas borraria su huella
+        and not _completo_reutilizable(merge_result['analysis_source'], participant_event_id)
+    )
+
+
+def _analizar_union(task, merge_result, perfil="completo"):
+    participant_event_id = merge_result['participant_event_id']
+    analysis_source = merge_result['analysis_source']
+    result = {k: v for k, v in merge_result.items() if k not in ('analysis_pending', 'analysis_source')}
+    result['analysis_task_id'] = task.request.id
+    logger.info(f"[Task {task.request.id}] Step 3/3: Starting behavior analysis for participant {merge_result.get('participant_name')}")
+
+    if AnalisisFragmento.objects.filter(participant_event_id=participant_event_id).exists():
+        # Los fragmentos ya se analizaron durante el evento: solo unirlos
+        stitch_result = unir_fragmentos(participant_event_id)
+        logger.info(f"[Task {task.request.id}] Fragment analyses stitched: {stitch_result}")
+        result.update(
+            success=stitch_result.get('success', False),
+            error=stitch_result.get('error'),
+            analysis_mode='incremental',
+        )
+        return result
+
+    if perfil == "preliminar":
+        # Resultados provisionales en minutos; la pasada completa los
+        # reemplaza al terminar
+        result['preview'] = _analizar_si_registrado(analysis_source, participant_event_id, "preliminar")
+        return result
+    result['analysis'] = _analizar_si_registrado(analysis_source, participant_event_id, "completo")
+    result['success'] = bool(result['analysis'] and result['analysis'].get('success'))
+    result['reused'] = dict(
+        result.get('reused') or {},
+        analysis=bool(result['analysis'] and result['analysis'].get('reused')),
+    )
+    return result
+
+
+def _participant_completion_chain(participant_event_id, event_id, event_name, two_tier=None, fanout=None, priority=None):
+    options = {} if priority is None else {"priority": priority}
+    return chain(
+        process_participant_completion_task.s(
+            participant_event_id, event_id, event_name, two_tier=two_tier, fanout=fanout
+        ).set(**options),
+        analyze_merged_video_task.s().set(**options),
+    )
+
+
+def start_event_completion(event, plan, two_tier=None, fanout=None):
+    """
+    Despacha las cadenas de los participantes en el orden del plan (mayor
+    carga primero, con su prioridad) como un chord cuyo callback marca el
+    procesamiento del evento como terminado.
+
+    Si el evento ya se esta procesando no despacha nada y retorna el id del
+    procesamiento en curso.
+
+    Returns:
+        dict: {'event_task_id': str, 'task_ids': {participant_event_id: task_id}, 'duplicate': bool}
+    """
+    cadenas = []
+    task_ids = {}
+    for carga in plan:
+        cadena = _participant_completion_chain(
+            carga["participant_event_id"],
+            event.id,
+            event.name,
+            two_tier=two_tier,
+            fanout=fanout,
+            priority=carga["prioridad"],
+        )
+        task_ids[carga["participant_event_id"]] = cadena.freeze().id
+        cadenas.append(cadena)
+
+    # Si una cadena falla igual el callback no corre: el errback cierra el
+    # procesamiento y libera el lock del evento
+    completion = chord(
+        group(cadenas),
+        finalize_event_completion_task.s(event.id).on_error(
+            abort_event_completion_task.s(event_id=event.id)
+        ),
+    )
+    event_task_id = completion.freeze().id
+    actual = lock_fin_evento(event.id).adquirir(event_task_id)
+    if actual != event_task_id:
+        logger.info(f"Event {event.id} completion already in progress: {actual}")
+        return {"event_task_id": actual, "task_ids": {}, "duplicate": True}
+
+    ProcesamientoEvento.objects.update_or_create(
+        event=event,
+        defaults={
+            "status": "procesando",
+            "total_participantes": len(plan),
+            "completados": 0,
+            "fallidos": 0,
+            "fecha_fin": None,
+        },
+    )
+    completion.apply_async()
+    ProcesamientoEvento.objects.filter(event=event).update(task_id=event_task_id)
+    return {"event_task_id": event_task_id, "task_ids": task_ids, "duplicate": False}
+
+
+@shared_task(bind=True)
+def finalize_event_completion_task(self, results, event_id):
+    """
+    Callback del chord de fin de evento: registra cuántos participantes
+    terminaron bien y cierra el procesamiento del evento.
+    """
+    results = [r for r in (results or []) if isinstance(r, dict)]
+    completados = sum(1 for r in results if r.get("success"))
+    fallidos = len(results) - completados
+    reutilizados = sum(1 for r in results if (r.get("reused") or {}).get("analysis"))
+    ProcesamientoEvento.objects.filter(event_id=event_id).update(
+        status="con_errores" if fallidos else "completado",
+        completados=completados,
+        fallidos=fallidos,
+        fecha_fin=timezone.now(),
+    )
+    if self.request.id:
+        lock_fin_evento(event_id).liberar(self.request.id)
+    logger.info(
+        f"Event {event_id} completion processed: {completados} ok "
+        f"({reutilizados} reused), {fallidos} failed"
+    )
+    return {
+        "event_id": event_id,
+        "completed": completados,
+        "failed": fallidos,
+        "reused": reutilizados,
+    }
+
+
+@shared_task
+def abort_event_completion_task(request, exc, traceback, event_id):
+    """
+    Errback del chord de fin de evento: si una cadena de participante
+    termina con una excepcion el callback no corre, asi que se marca el
+    procesamiento con errores y se libera el lock del evento.
+    """
+    logger.error(f"Event {event_id} completion failed: {exc}")
+    procesamiento = ProcesamientoEvento.objects.filter(event_id=event_id).first()
+    if procesamiento is None:
+        return {"event_id": event_id, "success": False, "error": str(exc)}
+    ProcesamientoEvento.objects.filter(pk=procesamiento.pk).update(
+        status="con_errores", fecha_fin=timezone.now()
+    )
+    owner = procesamiento.task_id or getattr(request, "id", None)
+    if owner:
+        lock_fin_evento(event_id).liberar(owner)
+    return {"event_id": event_id, "success": False, "error": str(exc)}
+
+
+@shared_task
+def render_report_task(analisis_id):
+    """Pre-renderiza el reporte completo de un analisis recien completado."""
+    try:
+        analisis = AnalisisComportamiento.objects.select_related(
+            "participant_event__participant", "participant_event__event"
+        ).get(id=analisis_id)
+    except AnalisisComportamiento.DoesNotExist:
+        return {"success": False, "error": f"Analysis {analisis_id} not found"}
+
+    result = renderizar_reporte(analisis)
+    if not result["success"]:
+        logger.warning(f"Report for analysis {analisis_id} not rendered: {result['error']}")
+    return result
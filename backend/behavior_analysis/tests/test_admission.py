@@ -0,0 +1,144 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+
+from behavior_analysis import admission, tasks
+from behavior_analysis.admission import MB, AdmisionDiferida, ControlAdmision
+
+
+def _info(duracion, width=1280, height=720):
+    return {
+        "duracion": duracion,
+        "video": {"width": width, "height": height, "r_frame_rate": "30/1"},
+        "audio": {"sample_rate": "48000"},
+    }
+
+
+class ControlAdmisionTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        self.control = ControlAdmision(self.dir, presupuesto=2000 * MB)
+
+    def test_estimate_scales_with_duration_resolution_and_profile(self):
+        corto = self.control.estimar(_info(600))
+        largo = self.control.estimar(_info(3600))
+        hd = self.control.estimar(_info(600, 1920, 1080))
+        preliminar = self.control.estimar(_info(3600), "preliminar")
+
+        self.assertGreater(largo, corto)
+        self.assertGreater(hd, corto)
+        self.assertLess(preliminar, largo)
+        # Una hora de audio para lipsync domina la estimacion (~5 GB)
+        self.assertGreater(largo, 5000 * MB)
+
+    def test_reserve_defers_when_budget_full_but_always_admits_first(self):
+        primero = self.control.reservar(3000 * MB)
+        self.assertIsNotNone(primero)
+        self.assertIsNone(self.control.reservar(100 * MB))
+
+        self.control.liberar(primero)
+        self.assertIsNotNone(self.control.reservar(1500 * MB))
+        self.assertIsNotNone(self.control.reservar(400 * MB))
+        self.assertIsNone(self.control.reservar(200 * MB))
+
+    def test_reservations_of_dead_processes_are_dropped(self):
+        self.control.reservar(1900 * MB)
+        with mock.patch("behavior_analysis.admission._proceso_vivo", return_value=False):
+            self.assertIsNotNone(self.control.reservar(1900 * MB))
+
+    def test_measured_peaks_adjust_correction_factor(self):
+        self.assertEqual(self.control.factor_correccion(), 1.0)
+        self.control.registrar_pico(1000 * MB, 2000 * MB)
+        self.assertAlmostEqual(self.control.factor_correccion(), 1.3)
+
+
+class MedirPicoRssTests(TestCase):
+    def test_peak_excludes_rss_held_before_the_block(self):
+        muestras = iter([1000 * MB])
+        with mock.patch(
+            "behavior_analysis.admission._rss_actual",
+            side_effect=lambda: next(muestras, 1300 * MB),
+        ):
+            with admission.medir_pico_rss(intervalo=0.01) as medicion:
+                pass
+
+        self.assertEqual(medicion["pico"], 300 * MB)
+
+
+class AdmitirTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        env = mock.patch.dict(
+            os.environ,
+            {
+                "ANALYSIS_ADMISSION": "true",
+                "ANALYSIS_ADMISSION_DIR": self.dir,
+                "ANALYSIS_MEMORY_BUDGET_MB": "1000",
+            },
+        )
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_admitir_reserves_records_peak_and_releases(self):
+        with mock.patch(
+            "behavior_analysis.admission.probar_video", return_value=_info(10)
+        ), mock.patch(
+            "behavior_analysis.admission.s3_service.generate_presigned_url",
+            return_value="https://signed",
+        ):
+            with admission.admitir("media/merged.mp4", "preliminar"):
+                control = admission.control_desde_env()
+                self.assertEqual(len(control._leer(control._reservas)), 1)
+
+        self.assertEqual(control._leer(control._reservas), {})
+        self.assertEqual(control._leer(control._historial)["muestras"], 1)
+
+    def test_admitir_defers_when_budget_in_use(self):
+        admission.control_desde_env().reservar(900 * MB)
+        with mock.patch(
+            "behavior_analysis.admission.probar_video", return_value=_info(600)
+        ), mock.patch(
+            "behavior_analysis.admission.s3_service.generate_presigned_url",
+            return_value="https://signed",
+        ):
+            with self.assertRaises(AdmisionDiferida):
+                with admission.admitir("media/merged.mp4"):
+                    self.fail("should not be admitted")
+
+    def test_analyze_behavior_task_retries_when_deferred(self):
+        with mock.patch(
+            "behavior_analysis.tasks.admitir", side_effect=AdmisionDiferida("full")
+        ), mock.patch(
+            "behavior_analysis.tasks.procesar_video_completo"
+        ) as procesar, mock.patch.object(
+            tasks.analyze_behavior_task, "retry", side_effect=RuntimeError("retry")
+        ) as retry:
+            with self.assertRaises(RuntimeError):
+                tasks.analyze_behavior_task("media/merged.mp4", 1)
+
+        procesar.assert_not_called()
+        self.assertEqual(retry.call_args.kwargs["countdown"], tasks.ADMISSION_RETRY_SECONDS)
+
+    def test_analyze_fragment_task_is_admitted_and_retries_when_deferred(self):
+        log = mock.Mock(url="media/fragment.webm")
+        with mock.patch(
+            "behavior_analysis.tasks.ParticipantLog.objects.filter"
+        ) as filter_mock, mock.patch(
+            "behavior_analysis.tasks.admitir", side_effect=AdmisionDiferida("full")
+        ) as admitir_mock, mock.patch(
+            "behavior_analysis.tasks.analizar_fragmento"
+        ) as analizar, mock.patch.object(
+            tasks.analyze_fragment_task, "retry", side_effect=RuntimeError("retry")
+        ) as retry:
+            filter_mock.return_value.only.return_value.first.return_value = log
+            with self.assertRaises(RuntimeError):
+                tasks.analyze_fragment_task(7)
+
+        admitir_mock.assert_called_once_with("media/fragment.webm", "completo")
+        analizar.assert_not_called()
+        self.assertEqual(retry.call_args.kwargs["countdown"], tasks.ADMISSION_RETRY_SECONDS)
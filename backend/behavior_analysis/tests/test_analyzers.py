@@ -217,6 +217,15 @@ class BehaviorAnalyzersTests(TestCase):
 
         self.assertIsNotNone(analyzer.audio_array)
 
+    def test_lipsync_defers_audio_loading(self):
+        with mock.patch(
+            "behavior_analysis.analyzers.lipsync.VideoFileClip"
+        ) as clip_cls:
+            analyzer = AnalizadorLipsync("video.mp4", cargar_audio=False)
+
+        clip_cls.assert_not_called()
+        self.assertIsNone(analyzer.audio_array)
+
     def test_lipsync_obtener_resultados_detects_anomaly(self):
         analyzer = AnalizadorLipsync.__new__(AnalizadorLipsync)
         analyzer.fps = 5
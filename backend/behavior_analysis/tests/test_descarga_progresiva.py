@@ -0,0 +1,60 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from behavior_analysis.descarga_progresiva import DescargaProgresiva
+
+
+@unittest.skipUnless(DescargaProgresiva.disponible(), "requiere os.mkfifo")
+class DescargaProgresivaTests(SimpleTestCase):
+    def setUp(self):
+        temp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
+        temp.close()
+        self.destino = temp.name
+        self.addCleanup(os.remove, self.destino)
+
+    def test_fifo_delivers_prefix_before_download_finishes(self):
+        primera_parte = threading.Event()
+        continuar = threading.Event()
+
+        def download(key, file_obj):
+            file_obj.write(b"abc")
+            primera_parte.set()
+            continuar.wait(5)
+            file_obj.write(b"def")
+            return {"success": True}
+
+        with mock.patch(
+            "behavior_analysis.descarga_progresiva.s3_service.download_fileobj",
+            side_effect=download,
+        ) as download_fileobj:
+            progresiva = DescargaProgresiva("media/merged.mp4", self.destino)
+            fifo = progresiva.iniciar()
+            with open(fifo, "rb") as lector:
+                self.assertTrue(primera_parte.wait(5))
+                self.assertEqual(lector.read(3), b"abc")
+                continuar.set()
+                self.assertEqual(lector.read(), b"def")
+            self.assertEqual(progresiva.futuro.result(5), {"success": True})
+            progresiva.cerrar()
+
+        download_fileobj.assert_called_once()
+        with open(self.destino, "rb") as handle:
+            self.assertEqual(handle.read(), b"abcdef")
+        self.assertFalse(os.path.exists(fifo))
+
+    def test_cerrar_releases_feeder_when_nobody_reads(self):
+        with mock.patch(
+            "behavior_analysis.descarga_progresiva.s3_service.download_fileobj",
+            side_effect=lambda key, file_obj: file_obj.write(b"abc") and {"success": True},
+        ):
+            progresiva = DescargaProgresiva("media/merged.mp4", self.destino)
+            fifo = progresiva.iniciar()
+            progresiva.futuro.result(5)
+            progresiva.cerrar()
+
+        self.assertFalse(os.path.exists(fifo))
@@ -0,0 +1,277 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from behavior_analysis import fragments
+from behavior_analysis.models import (
+    AnalisisComportamiento,
+    AnalisisFragmento,
+    RegistroAusencia,
+    RegistroRostro,
+)
+from events.models import Event, Participant, ParticipantEvent, ParticipantLog
+
+
+def _resultados(duracion, **kwargs):
+    base = {
+        "duracion": duracion,
+        "rostros": [],
+        "gestos": [],
+        "iluminacion": [],
+        "ausencia": [],
+        "lipsync": [],
+        "voz": {"susurros": [], "hablantes": []},
+        "firmas_rostros": {},
+    }
+    base.update(kwargs)
+    return base
+
+
+class CombinarResultadosTests(TestCase):
+    def test_shifts_offsets_and_merges_across_boundary(self):
+        partes = [
+            (0.0, _resultados(300.0, ausencia=[[290.0, 300.0, 10.0]])),
+            (300.0, _resultados(300.0, ausencia=[[0.0, 5.0, 5.0]])),
+        ]
+
+        combinado = fragments.combinar_resultados(partes)
+
+        self.assertEqual(combinado["duracion"], 600.0)
+        self.assertEqual(combinado["ausencia"], [[290.0, 305.0, 15.0]])
+
+    def test_reconciles_faces_by_signature(self):
+        persona_a = [1.0, 0.0, 0.0]
+        persona_b = [0.0, 1.0, 0.0]
+        partes = [
+            (
+                0.0,
+                _resultados(
+                    60.0,
+                    rostros=[{"persona_id": 1, "tiempo_inicio": 0.0, "tiempo_fin": 60.0}],
+                    firmas_rostros={"1": persona_a},
+                ),
+            ),
+            (
+                60.0,
+                _resultados(
+                    60.0,
+                    rostros=[
+                        {"persona_id": 1, "tiempo_inicio": 10.0, "tiempo_fin": 20.0},
+                        {"persona_id": 2, "tiempo_inicio": 0.0, "tiempo_fin": 60.0},
+                    ],
+                    firmas_rostros={"1": persona_b, "2": persona_a},
+                ),
+            ),
+        ]
+
+        rostros = fragments.combinar_resultados(partes)["rostros"]
+
+        self.assertEqual(
+            rostros,
+            [
+                {"persona_id": 1, "tiempo_inicio": 0.0, "tiempo_fin": 120.0},
+                {"persona_id": 2, "tiempo_inicio": 70.0, "tiempo_fin": 80.0},
+            ],
+        )
+
+
+class FragmentAnalysisTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        evaluator = CustomUser.objects.create(
+            email="frag@example.com",
+            first_name="Frag",
+            last_name="User",
+            password="hashed",
+        )
+        event = Event.objects.create(
+            name="Frag Event",
+            description="Frag",
+            start_date=now,
+            close_date=now,
+            end_date=now,
+            duration=15,
+            evaluator=evaluator,
+            status="en_progreso",
+        )
+        participant = Participant.objects.create(
+            first_name="Frag",
+            last_name="Participant",
+            name="Frag Participant",
+            email="fragp@example.com",
+        )
+        self.participant_event = ParticipantEvent.objects.create(
+            event=event, participant=participant
+        )
+        self.log_1 = ParticipantLog.objects.create(
+            name="audio/video",
+            url="media/1.webm",
+            message="Media Capture",
+            participant_event=self.participant_event,
+        )
+        self.log_2 = ParticipantLog.objects.create(
+            name="audio/video",
+            url="media/2.webm",
+            message="Media Capture",
+            participant_event=self.participant_event,
+        )
+        ParticipantLog.objects.filter(id=self.log_2.id).update(
+            timestamp=self.log_1.timestamp + timedelta(minutes=5)
+        )
+        self.log_2.refresh_from_db()
+
+    def test_analizar_fragmento_stores_results_with_offset(self):
+        AnalisisFragmento.objects.create(
+            participant_event=self.participant_event,
+            participant_log=self.log_1,
+            status="completado",
+            duracion=120.0,
+        )
+        with mock.patch(
+            "behavior_analysis.fragments.s3_service.download_file",
+            return_value={"success": True},
+        ) as download_mock, mock.patch(
+            "behavior_analysis.fragments.analizar_video_local",
+            return_value=_resultados(90.0),
+        ):
+            result = fragments.analizar_fragmento(self.log_2.id)
+
+        self.assertTrue(result["success"])
+        self.assertEqual(download_mock.call_args.args[0], "media/2.webm")
+        fragmento = AnalisisFragmento.objects.get(participant_log=self.log_2)
+        self.assertEqual(fragmento.status, "completado")
+        self.assertEqual(fragmento.duracion, 90.0)
+        self.assertEqual(fragmento.offset_segundos, 120.0)
+
+    def test_unir_fragmentos_saves_stitched_registros(self):
+        analisis = AnalisisComportamiento.objects.create(
+            participant_event=self.participant_event, video_link="media/merged.mp4"
+        )
+        AnalisisFragmento.objects.create(
+            participant_event=self.participant_event,
+            participant_log=self.log_1,
+            status="completado",
+            duracion=100.0,
+            resultados=_resultados(
+                100.0,
+                ausencia=[[95.0, 100.0, 5.0]],
+                rostros=[{"persona_id": 1, "tiempo_inicio": 0.0, "tiempo_fin": 100.0}],
+                firmas_rostros={"1": [1.0, 0.0]},
+            ),
+        )
+        AnalisisFragmento.objects.create(
+            participant_event=self.participant_event,
+            participant_log=self.log_2,
+            status="completado",
+            duracion=50.0,
+            resultados=_resultados(
+                50.0,
+                ausencia=[[0.0, 2.0, 2.0]],
+                rostros=[{"persona_id": 1, "tiempo_inicio": 0.0, "tiempo_fin": 50.0}],
+                firmas_rostros={"1": [0.9, 0.1]},
+            ),
+        )
+
+        with mock.patch("behavior_analysis.fragments.analizar_fragmento") as analyze_mock:
+            result = fragments.unir_fragmentos(self.participant_event.id)
+
+        analyze_mock.assert_not_called()
+        self.assertTrue(result["success"])
+        analisis.refresh_from_db()
+        self.assertEqual(analisis.status, "completado")
+        ausencia = RegistroAusencia.objects.get(analisis=analisis)
+        self.assertEqual((ausencia.tiempo_inicio, ausencia.tiempo_fin), (95.0, 102.0))
+        rostro = RegistroRostro.objects.get(analisis=analisis)
+        self.assertEqual((rostro.tiempo_inicio, rostro.tiempo_fin), (0.0, 150.0))
+        self.assertEqual(
+            AnalisisFragmento.objects.get(participant_log=self.log_2).offset_segundos,
+            100.0,
+        )
+
+    def test_unir_fragmentos_without_analysis(self):
+        result = fragments.unir_fragmentos(self.participant_event.id)
+        self.assertFalse(result["success"])
+        self.assertEqual(result["error"], "analysis_missing")
+
+    def test_unir_fragmentos_without_reanalysis_offsets_failed_fragment(self):
+        analisis = AnalisisComportamiento.objects.create(
+            participant_event=self.participant_event, video_link="media/1.webm"
+        )
+        AnalisisFragmento.objects.create(
+            participant_event=self.participant_event,
+            participant_log=self.log_1,
+            status="error",
+        )
+        AnalisisFragmento.objects.create(
+            participant_event=self.participant_event,
+            participant_log=self.log_2,
+            status="completado",
+            duracion=60.0,
+            resultados=_resultados(60.0, ausencia=[[10.0, 20.0, 10.0]]),
+        )
+
+        with mock.patch("behavior_analysis.fragments.analizar_fragmento") as analyze_mock:
+            result = fragments.unir_fragmentos(
+                self.participant_event.id, analizar_pendientes=False
+            )
+
+        analyze_mock.assert_not_called()
+        self.assertEqual(result["failed_fragments"], 1)
+        ausencia = RegistroAusencia.objects.get(analisis=analisis)
+        self.assertEqual(
+            ausencia.tiempo_inicio, fragments.FRAGMENTO_SEGUNDOS_DEFAULT + 10.0
+        )
+
+    def test_analizar_fragmento_marks_error_when_analysis_raises(self):
+        with mock.patch(
+            "behavior_analysis.fragments.s3_service.download_file",
+            return_value={"success": True},
+        ), mock.patch(
+            "behavior_analysis.fragments.analizar_video_local",
+            side_effect=RuntimeError("decoder crashed"),
+        ):
+            result = fragments.analizar_fragmento(self.log_1.id)
+
+        self.assertFalse(result["success"])
+        self.assertEqual(
+            AnalisisFragmento.objects.get(participant_log=self.log_1).status, "error"
+        )
+
+    def test_unir_fragmentos_skips_fragments_in_flight(self):
+        AnalisisComportamiento.objects.create(
+            participant_event=self.participant_event, video_link="media/1.webm"
+        )
+        en_curso = AnalisisFragmento.objects.create(
+            participant_event=self.participant_event,
+            participant_log=self.log_1,
+            status="procesando",
+        )
+        abandonado = AnalisisFragmento.objects.create(
+            participant_event=self.participant_event,
+            participant_log=self.log_2,
+            status="procesando",
+        )
+        AnalisisFragmento.objects.filter(id=abandonado.id).update(
+            fecha_procesamiento=timezone.now() - timedelta(hours=1)
+        )
+
+        def analyze(log_id):
+            AnalisisFragmento.objects.filter(participant_log_id=log_id).update(
+                status="completado", duracion=60.0, resultados=_resultados(60.0)
+            )
+
+        with mock.patch.dict(
+            "os.environ", {"FRAGMENT_ANALYSIS_TIMEOUT": "600"}
+        ), mock.patch(
+            "behavior_analysis.fragments.analizar_fragmento", side_effect=analyze
+        ) as analyze_mock:
+            result = fragments.unir_fragmentos(self.participant_event.id)
+
+        analyze_mock.assert_called_once_with(self.log_2.id)
+        self.assertTrue(result["success"])
+        self.assertEqual(result["in_flight_fragments"], 1)
+        en_curso.refresh_from_db()
+        self.assertEqual(en_curso.status, "procesando")
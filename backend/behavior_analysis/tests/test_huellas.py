@@ -0,0 +1,177 @@
+import io
+from types import SimpleNamespace
+from unittest import mock
+
+from celery.app.task import Task
+from django.test import TestCase
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from behavior_analysis import huellas, tasks
+from behavior_analysis.models import AnalisisComportamiento
+from events.models import Event, Participant, ParticipantEvent, ParticipantLog
+from events.storage import InMemoryStorageBackend
+
+
+class HuellasTests(TestCase):
+    def setUp(self):
+        self.storage = InMemoryStorageBackend()
+        patcher = mock.patch("behavior_analysis.huellas.s3_service", self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        env = mock.patch.dict("os.environ", {"ANALYSIS_REUSE": "true"})
+        env.start()
+        self.addCleanup(env.stop)
+
+        now = timezone.now()
+        evaluator = CustomUser.objects.create(
+            email="huellas@example.com", first_name="H", last_name="U", password="x"
+        )
+        self.event = Event.objects.create(
+            name="Huellas Event",
+            description="Huellas",
+            start_date=now,
+            close_date=now,
+            end_date=now,
+            duration=15,
+            evaluator=evaluator,
+            status="completado",
+        )
+        participant = Participant.objects.create(
+            first_name="H", last_name="P", name="H P", email="hp@example.com"
+        )
+        self.participant_event = ParticipantEvent.objects.create(
+            event=self.event, participant=participant
+        )
+        for key in ("media/a.webm", "media/b.webm"):
+            self._subir(key, b"fragmento")
+            ParticipantLog.objects.create(
+                name="audio/video",
+                message="Video",
+                url=key,
+                participant_event=self.participant_event,
+            )
+
+    def _subir(self, key, data):
+        self.storage._put(key, io.BytesIO(data), "video/webm", {})
+
+    def _procesar(self, merge_result):
+        with mock.patch.object(
+            Task,
+            "request",
+            new_callable=mock.PropertyMock,
+            return_value=SimpleNamespace(id="req-huella"),
+        ), mock.patch(
+            "behavior_analysis.tasks.video_merger_service.merge_participant_videos",
+            return_value=merge_result,
+        ) as merge_mock:
+            result = tasks.process_participant_completion_task.run(
+                self.participant_event.id, self.event.id, self.event.name
+            )
+        return result, merge_mock
+
+    def test_huella_union_cambia_con_fragmentos_y_ajustes(self):
+        huella = huellas.huella_union(self.participant_event.id)
+
+        self.assertEqual(huellas.huella_union(self.participant_event.id), huella)
+        with mock.patch.dict("os.environ", {"FFMPEG_CRF": "18"}):
+            self.assertNotEqual(huellas.huella_union(self.participant_event.id), huella)
+        self._subir("media/b.webm", b"fragmento re-subido")
+        self.assertNotEqual(huellas.huella_union(self.participant_event.id), huella)
+        self.storage._delete("media/a.webm")
+        self.assertIsNone(huellas.huella_union(self.participant_event.id))
+
+    def test_reutiliza_union_si_los_fragmentos_no_cambiaron(self):
+        self._subir("media/merged.mp4", b"unido")
+        merged = {"success": True, "merged_count": 2, "s3_key": "media/merged.mp4"}
+
+        primero, merge_mock = self._procesar(merged)
+        self.assertFalse(primero["reused"]["merge"])
+        merge_mock.assert_called_once()
+        AnalisisComportamiento.objects.filter(
+            participant_event=self.participant_event
+        ).update(status="completado")
+
+        segundo, merge_mock = self._procesar(merged)
+        merge_mock.assert_not_called()
+        self.assertTrue(segundo["reused"]["merge"])
+        self.assertEqual(segundo["analysis_source"], "media/merged.mp4")
+        self.assertEqual(segundo["merged_count"], 2)
+        analisis = AnalisisComportamiento.objects.get(participant_event=self.participant_event)
+        self.assertEqual(analisis.status, "completado")
+
+        self._subir("media/a.webm", b"fragmento nuevo")
+        tercero, merge_mock = self._procesar(merged)
+        merge_mock.assert_called_once()
+        self.assertFalse(tercero["reused"]["merge"])
+
+    def test_reutiliza_analisis_con_misma_huella_y_version(self):
+        self._subir("media/merged.mp4", b"unido")
+        AnalisisComportamiento.objects.create(
+            participant_event=self.participant_event, video_link="media/merged.mp4"
+        )
+
+        def procesar(video_path, participant_event_id, perfil):
+            AnalisisComportamiento.objects.filter(
+                participant_event_id=participant_event_id
+            ).update(status="completado", nivel=perfil)
+            return {"success": True, "status": "completado", "nivel": perfil}
+
+        with mock.patch(
+            "behavior_analysis.tasks.procesar_video_completo", side_effect=procesar
+        ) as procesar_mock:
+            primero = tasks._analizar_si_registrado(
+                "media/merged.mp4", self.participant_event.id, "completo"
+            )
+            segundo = tasks._analizar_si_registrado(
+                "media/merged.mp4", self.participant_event.id, "completo"
+            )
+            self.assertEqual(procesar_mock.call_count, 1)
+            with mock.patch.object(huellas, "VERSION_ANALIZADORES", "2"):
+                tasks._analizar_si_registrado(
+                    "media/merged.mp4", self.participant_event.id, "completo"
+                )
+            self.assertEqual(procesar_mock.call_count, 2)
+
+        self.assertNotIn("reused", primero)
+        self.assertTrue(segundo["success"])
+        self.assertTrue(segundo["reused"])
+
+    def test_dos_niveles_no_repite_preliminar_si_el_completo_se_reutiliza(self):
+        self._subir("media/merged.mp4", b"unido")
+        AnalisisComportamiento.objects.create(
+            participant_event=self.participant_event,
+            video_link="media/merged.mp4",
+            status="completado",
+            nivel="completo",
+            huella_analisis=huellas.huella_analisis("media/merged.mp4", "completo"),
+        )
+        task = SimpleNamespace(request=SimpleNamespace(id="req-dos-niveles"))
+
+        with mock.patch("behavior_analysis.tasks.procesar_video_completo") as procesar_mock:
+            result = tasks._analizar_union(
+                task,
+                {
+                    "participant_event_id": self.participant_event.id,
+                    "analysis_source": "media/merged.mp4",
+                    "analysis_pending": True,
+                    "two_tier": True,
+                },
+            )
+
+        procesar_mock.assert_not_called()
+        self.assertNotIn("preview", result)
+        self.assertTrue(result["success"])
+        self.assertTrue(result["reused"]["analysis"])
+
+    def test_finalize_cuenta_reutilizados(self):
+        result = tasks.finalize_event_completion_task.run(
+            [
+                {"success": True, "reused": {"merge": True, "analysis": True}},
+                {"success": True, "reused": {"merge": False, "analysis": False}},
+            ],
+            self.event.id,
+        )
+
+        self.assertEqual(result["reused"], 1)
+        self.assertEqual(result["failed"], 0)
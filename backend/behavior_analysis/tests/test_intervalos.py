@@ -0,0 +1,54 @@
+from django.test import SimpleTestCase
+
+from behavior_analysis.intervalos import ConjuntoIntervalos
+
+
+class ConjuntoIntervalosTests(SimpleTestCase):
+    def test_unir_por_etiqueta_con_gap(self):
+        conjunto = ConjuntoIntervalos(
+            [0.0, 1.2, 5.0, 0.5, 10.0],
+            [1.0, 2.0, 6.0, 0.9, 11.0],
+            ["a", "a", "a", "b", "a"],
+        )
+
+        filas = conjunto.unir(0.5).a_filas("tipo")
+
+        self.assertEqual(
+            filas,
+            [
+                {"tipo": "a", "tiempo_inicio": 0.0, "tiempo_fin": 2.0},
+                {"tipo": "b", "tiempo_inicio": 0.5, "tiempo_fin": 0.9},
+                {"tipo": "a", "tiempo_inicio": 5.0, "tiempo_fin": 6.0},
+                {"tipo": "a", "tiempo_inicio": 10.0, "tiempo_fin": 11.0},
+            ],
+        )
+
+    def test_unir_estricto_no_funde_en_el_limite(self):
+        conjunto = ConjuntoIntervalos.desde_pares([(0.0, 1.0), (1.5, 2.0)])
+
+        self.assertEqual(len(conjunto.unir(0.5)), 1)
+        self.assertEqual(len(conjunto.unir(0.5, estricto=True)), 2)
+
+    def test_filtrar_redondear_y_deduplicar(self):
+        conjunto = ConjuntoIntervalos(
+            [0.001, 0.004, 3.0, 7.0], [2.0, 2.001, 3.1, 9.0], [1, 1, 1, 2]
+        )
+
+        filas = conjunto.filtrar_duracion(0.5).redondear().a_filas("persona_id", duracion=True)
+
+        self.assertEqual(
+            filas,
+            [
+                {"persona_id": 1, "tiempo_inicio": 0.0, "tiempo_fin": 2.0, "duracion": 2.0},
+                {"persona_id": 2, "tiempo_inicio": 7.0, "tiempo_fin": 9.0, "duracion": 2.0},
+            ],
+        )
+
+    def test_desde_puntos_y_operaciones_de_conjunto(self):
+        voz = ConjuntoIntervalos.desde_puntos([0.0, 0.5, 1.0, 4.0, 4.5], 0.5, 1.0)
+        self.assertEqual(voz.a_tuplas(), [(0.0, 1.5), (4.0, 5.0)])
+
+        otro = ConjuntoIntervalos.desde_pares([(1.0, 4.2)])
+        self.assertEqual(voz.union(otro).a_tuplas(), [(0.0, 5.0)])
+        self.assertEqual(voz.interseccion(otro).a_tuplas(), [(1.0, 1.5), (4.0, 4.2)])
+        self.assertEqual(ConjuntoIntervalos().unir(1.0).a_tuplas(), [])
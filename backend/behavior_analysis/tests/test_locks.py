@@ -0,0 +1,233 @@
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from celery.app.task import Task
+from behavior_analysis import locks, tasks, views
+from behavior_analysis.models import AnalisisComportamiento, ProcesamientoEvento
+from events.models import Event, Participant, ParticipantEvent
+
+
+class FakeRedis:
+    """Cliente minimo con la semantica de SET NX/GET y los scripts del lock."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        self.ttls[key] = ex
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def eval(self, script, numkeys, key, owner, *args):
+        if self.data.get(key) != owner:
+            return 0
+        if "expire" in script:
+            self.ttls[key] = int(args[0])
+        else:
+            del self.data[key]
+        return 1
+
+
+@override_settings(TASK_LOCKS_ENABLED=True)
+class TaskLockTests(TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch("behavior_analysis.locks._redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_second_owner_gets_in_flight_id(self):
+        lock = locks.lock_etapa("analysis", 1)
+
+        self.assertEqual(lock.adquirir("task-a"), "task-a")
+        self.assertEqual(lock.adquirir("task-a"), "task-a")
+        self.assertEqual(lock.adquirir("task-b"), "task-a")
+
+        lock.liberar("task-b")
+        self.assertEqual(self.redis.get(lock.key), "task-a")
+        lock.liberar("task-a")
+        self.assertEqual(lock.adquirir("task-b"), "task-b")
+
+    def test_renovar_only_for_owner_and_mantener_releases(self):
+        lock = locks.TaskLock("merge:2", ttl=30)
+        lock.adquirir("task-a")
+        self.redis.ttls[lock.key] = 0
+
+        self.assertFalse(lock.renovar("task-b"))
+        self.assertTrue(lock.renovar("task-a"))
+        self.assertEqual(self.redis.ttls[lock.key], 30)
+
+        with lock.mantener("task-a"):
+            self.assertEqual(self.redis.get(lock.key), "task-a")
+        self.assertNotIn(lock.key, self.redis.data)
+
+    def test_redis_errors_fail_open(self):
+        broken = mock.Mock()
+        broken.set.side_effect = locks.redis.ConnectionError("down")
+        lock = locks.TaskLock("analysis:3", client=broken)
+
+        self.assertEqual(lock.adquirir("task-a"), "task-a")
+
+    def test_analyze_behavior_task_skips_duplicate(self):
+        locks.lock_etapa("analysis", 5).adquirir("other-task")
+
+        with mock.patch("behavior_analysis.tasks.procesar_video_completo") as procesar:
+            result = tasks.analyze_behavior_task("media/key", 5)
+
+        self.assertTrue(result["skipped"])
+        self.assertEqual(result["reason"], "duplicate")
+        self.assertEqual(result["task_id"], "other-task")
+        procesar.assert_not_called()
+
+
+    def _run_analysis(self, retries, admitir_error):
+        with mock.patch.object(
+            Task,
+            "request",
+            new_callable=mock.PropertyMock,
+            return_value=SimpleNamespace(id="task-x", retries=retries),
+        ), mock.patch(
+            "behavior_analysis.tasks.admitir", side_effect=admitir_error
+        ), mock.patch.object(
+            tasks.analyze_behavior_task, "retry", side_effect=RuntimeError("retry")
+        ) as retry:
+            with self.assertRaises(Exception):
+                tasks.analyze_behavior_task.run("media/key", 6)
+        return retry
+
+    def test_admission_errors_release_stage_lock(self):
+        lock = locks.lock_etapa("analysis", 6)
+
+        self._run_analysis(0, ValueError("ffprobe failed"))
+        self.assertNotIn(lock.key, self.redis.data)
+
+        self._run_analysis(tasks.ADMISSION_MAX_RETRIES, tasks.AdmisionDiferida("full"))
+        self.assertNotIn(lock.key, self.redis.data)
+
+    def test_deferred_admission_keeps_and_renews_stage_lock(self):
+        lock = locks.lock_etapa("analysis", 6)
+
+        retry = self._run_analysis(3, tasks.AdmisionDiferida("full"))
+
+        retry.assert_called_once()
+        self.assertEqual(self.redis.get(lock.key), "task-x")
+        self.assertEqual(self.redis.ttls[lock.key], locks.STAGE_LOCK_TTL)
+
+@override_settings(TASK_LOCKS_ENABLED=True)
+class TaskLockViewTests(TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch("behavior_analysis.locks._redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+        now = timezone.now()
+        evaluator = CustomUser.objects.create(
+            email="locks@example.com", first_name="L", last_name="U", password="x"
+        )
+        self.event = Event.objects.create(
+            name="Lock Event",
+            description="Locks",
+            start_date=now,
+            close_date=now,
+            end_date=now,
+            duration=15,
+            evaluator=evaluator,
+            status="completado",
+        )
+        participant = Participant.objects.create(
+            first_name="L", last_name="P", name="L P", email="lp@example.com"
+        )
+        self.participant_event = ParticipantEvent.objects.create(
+            event=self.event, participant=participant
+        )
+        AnalisisComportamiento.objects.create(
+            participant_event=self.participant_event, video_link="media/merged.mp4"
+        )
+
+    def _post(self, path, payload):
+        return self.factory.post(
+            path, data=json.dumps(payload), content_type="application/json"
+        )
+
+    def test_trigger_analysis_twice_returns_in_flight_task(self):
+        payload = {"participant_event_id": self.participant_event.id}
+        with mock.patch(
+            "behavior_analysis.views.analyze_behavior_task.apply_async",
+            side_effect=lambda args, task_id: mock.Mock(id=task_id),
+        ) as apply_mock:
+            first = json.loads(views.trigger_analysis(self._post("/analysis/analyze/", payload)).content)
+            second = json.loads(views.trigger_analysis(self._post("/analysis/analyze/", payload)).content)
+
+        apply_mock.assert_called_once()
+        self.assertTrue(second["duplicate"])
+        self.assertEqual(second["task_id"], first["task_id"])
+
+    def test_merge_participant_video_conflict_while_merging(self):
+        locks.lock_etapa("merge", self.participant_event.id).adquirir("merge-task")
+
+        with mock.patch(
+            "behavior_analysis.views.video_merger_service.merge_participant_videos"
+        ) as merge_mock:
+            response = views.merge_participant_video(
+                self._post(
+                    "/analysis/merge-video/",
+                    {"participant_event_id": self.participant_event.id},
+                )
+            )
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.content)["task_id"], "merge-task")
+        merge_mock.assert_not_called()
+
+    def test_event_completion_lock_released_by_callback(self):
+        plan = [{"participant_event_id": self.participant_event.id, "prioridad": 0}]
+        with mock.patch("behavior_analysis.tasks.chord") as chord_mock:
+            chord_mock.return_value.freeze.side_effect = [
+                mock.Mock(id="event-task"),
+                mock.Mock(id="event-task-2"),
+            ]
+            first = tasks.start_event_completion(self.event, plan)
+            second = tasks.start_event_completion(self.event, plan)
+
+        self.assertFalse(first["duplicate"])
+        self.assertTrue(second["duplicate"])
+        self.assertEqual(second["event_task_id"], "event-task")
+        self.assertEqual(chord_mock.return_value.apply_async.call_count, 1)
+
+        with mock.patch.object(
+            Task,
+            "request",
+            new_callable=mock.PropertyMock,
+            return_value=SimpleNamespace(id="event-task"),
+        ):
+            tasks.finalize_event_completion_task.run([{"success": True}], self.event.id)
+        self.assertNotIn(f"task-lock:event-completion:{self.event.id}", self.redis.data)
+
+    def test_event_completion_errback_closes_event_when_a_chain_raises(self):
+        plan = [{"participant_event_id": self.participant_event.id, "prioridad": 0}]
+        with mock.patch("behavior_analysis.tasks.chord") as chord_mock:
+            chord_mock.return_value.freeze.return_value = mock.Mock(id="event-task")
+            tasks.start_event_completion(self.event, plan)
+
+        _header, callback = chord_mock.call_args.args
+        (errback,) = callback.options["link_error"]
+        self.assertEqual(errback.task, tasks.abort_event_completion_task.name)
+        # Una cadena lanzo: el chord no llama al callback sino al errback
+        errback(SimpleNamespace(id="event-task"), RuntimeError("chain failed"), None)
+
+        procesamiento = ProcesamientoEvento.objects.get(event=self.event)
+        self.assertEqual(procesamiento.status, "con_errores")
+        self.assertIsNotNone(procesamiento.fecha_fin)
+        self.assertNotIn(f"task-lock:event-completion:{self.event.id}", self.redis.data)
@@ -0,0 +1,115 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from behavior_analysis.models import AnalisisFragmento
+from behavior_analysis.planner import estimar_cargas, planificar_evento
+from events.models import Event, Participant, ParticipantEvent, ParticipantLog
+
+
+class PlannerTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        evaluator = CustomUser.objects.create(
+            email="planner@example.com",
+            first_name="Plan",
+            last_name="User",
+            password="hashed",
+        )
+        self.event = Event.objects.create(
+            name="Planner Event",
+            description="Planner",
+            start_date=now,
+            close_date=now,
+            end_date=now,
+            duration=15,
+            evaluator=evaluator,
+            status="completado",
+        )
+        self.pes = []
+        for idx in range(3):
+            participant = Participant.objects.create(
+                first_name=f"P{idx}",
+                last_name="Planner",
+                name=f"P{idx} Planner",
+                email=f"planner{idx}@example.com",
+            )
+            self.pes.append(
+                ParticipantEvent.objects.create(event=self.event, participant=participant)
+            )
+
+    def _logs(self, pe, count):
+        return [
+            ParticipantLog.objects.create(
+                name="audio/video",
+                url=f"media/{pe.id}-{idx}.webm",
+                message="Media Capture",
+                participant_event=pe,
+            )
+            for idx in range(count)
+        ]
+
+    def test_estimar_cargas_single_query_with_known_durations(self):
+        short, long_ = self.pes[0], self.pes[1]
+        logs = self._logs(short, 2)
+        self._logs(long_, 3)
+        ParticipantLog.objects.create(
+            name="screen", url="media/s.jpg", message="Screen", participant_event=short
+        )
+        AnalisisFragmento.objects.create(
+            participant_event=short, participant_log=logs[0], duracion=120.0
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            cargas = {c["participant_event_id"]: c for c in estimar_cargas(self.event)}
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(cargas[short.id]["fragmentos"], 2)
+        self.assertEqual(cargas[short.id]["segundos_estimados"], 420.0)
+        self.assertEqual(cargas[long_.id]["segundos_estimados"], 900.0)
+        self.assertEqual(cargas[self.pes[2].id]["fragmentos"], 0)
+
+    def test_planificar_evento_longest_first_and_skips_without_media(self):
+        self._logs(self.pes[0], 1)
+        self._logs(self.pes[1], 4)
+
+        plan, omitidos = planificar_evento(self.event)
+
+        self.assertEqual(
+            [c["participant_event_id"] for c in plan], [self.pes[1].id, self.pes[0].id]
+        )
+        self.assertEqual([c["prioridad"] for c in plan], [0, 5])
+        self.assertEqual(
+            omitidos,
+            [
+                {
+                    "participant_event_id": self.pes[2].id,
+                    "participant_name": "P2 Planner",
+                    "reason": "sin_videos",
+                }
+            ],
+        )
+
+    def test_estimar_cargas_weights_unanalyzed_fragments_by_size(self):
+        full, cut = self.pes[0], self.pes[1]
+        analyzed = self._logs(full, 2)
+        ParticipantLog.objects.filter(id__in=[log.id for log in analyzed]).update(
+            size_bytes=3_000_000
+        )
+        AnalisisFragmento.objects.create(
+            participant_event=full, participant_log=analyzed[0], duracion=300.0
+        )
+        # Dos fragmentos cortados (un minuto cada uno) y uno sin tamaño
+        cut_logs = self._logs(cut, 3)
+        ParticipantLog.objects.filter(id__in=[log.id for log in cut_logs[:2]]).update(
+            size_bytes=600_000
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            cargas = {c["participant_event_id"]: c for c in estimar_cargas(self.event)}
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(cargas[full.id]["segundos_estimados"], 600.0)
+        self.assertEqual(cargas[cut.id]["segundos_estimados"], 420.0)
@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from behavior_analysis import reportes
+from behavior_analysis.models import (
+    AnalisisComportamiento,
+    RegistroRostro,
+    RegistrosEmpaquetados,
+)
+from behavior_analysis.registros import todas_las_filas
+from behavior_analysis.resumen import resumen_a_dict
+from behavior_analysis.services import guardar_resultados
+from behavior_analysis.timeline import indice_de_analisis
+from events.models import Event, Participant, ParticipantEvent
+
+
+def _resultados():
+    return {
+        "rostros": [
+            {"persona_id": 1, "tiempo_inicio": 5.0, "tiempo_fin": 6.0},
+            {"persona_id": 1, "tiempo_inicio": 0.0, "tiempo_fin": 1.0},
+            {"persona_id": 2, "tiempo_inicio": 2.0, "tiempo_fin": 3.0},
+        ],
+        "gestos": [
+            {"tipo_gesto": "Looking Left", "tiempo_inicio": 0.0, "tiempo_fin": 1.0, "duracion": 1.0}
+        ],
+        "iluminacion": [{"tiempo_inicio": 4.0, "tiempo_fin": 8.0}],
+        "ausencia": [(0.0, 2.5, 2.5), (10.0, 11.25, 1.25)],
+        "lipsync": [],
+        "voz": {
+            "susurros": [(1.0, 2.0)],
+            "hablantes": [
+                {"etiqueta": "A", "tiempo_inicio": 0.0, "tiempo_fin": 1.0},
+                {"etiqueta": "B", "tiempo_inicio": 1.0, "tiempo_fin": 2.0},
+            ],
+        },
+    }
+
+
+def _sin_ids(filas_por_tipo):
+    return {
+        tipo: [{k: v for k, v in fila.items() if k != "id"} for fila in filas]
+        for tipo, filas in filas_por_tipo.items()
+    }
+
+
+class RegistrosEmpaquetadosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        evaluator = CustomUser.objects.create(
+            email="registros@example.com", first_name="R", last_name="U", password="x"
+        )
+        event = Event.objects.create(
+            name="Registros Event",
+            description="Registros",
+            start_date=now,
+            close_date=now,
+            end_date=now,
+            duration=15,
+            evaluator=evaluator,
+            status="completado",
+        )
+        self.analisis = {}
+        for modo in ("filas", "empaquetado"):
+            participant = Participant.objects.create(
+                first_name=modo, last_name="P", name=modo, email=f"{modo}@example.com"
+            )
+            participant_event = ParticipantEvent.objects.create(
+                event=event, participant=participant
+            )
+            self.analisis[modo] = AnalisisComportamiento.objects.create(
+                participant_event=participant_event, video_link="media/merged.mp4"
+            )
+
+        with mock.patch.dict("os.environ", {"ANALYSIS_PACKED_STORAGE": "false"}):
+            guardar_resultados(self.analisis["filas"], _resultados(), perfil="preliminar")
+        with mock.patch.dict("os.environ", {"ANALYSIS_PACKED_STORAGE": "true"}):
+            guardar_resultados(self.analisis["empaquetado"], _resultados(), perfil="preliminar")
+
+    def _recargar(self, modo):
+        return AnalisisComportamiento.objects.get(pk=self.analisis[modo].pk)
+
+    def test_guarda_un_paquete_por_analizador_sin_filas(self):
+        analisis = self.analisis["empaquetado"]
+
+        self.assertEqual(
+            RegistrosEmpaquetados.objects.filter(analisis=analisis).count(), 6
+        )
+        self.assertFalse(RegistroRostro.objects.filter(analisis=analisis).exists())
+        rostros = RegistrosEmpaquetados.objects.get(analisis=analisis, tipo="rostros")
+        self.assertEqual(rostros.cantidad, 3)
+        self.assertEqual(rostros.columnas["tiempo_inicio"], [0.0, 2.0, 5.0])
+
+    def test_lectores_equivalentes_a_filas(self):
+        filas = self._recargar("filas")
+        empaquetado = self._recargar("empaquetado")
+
+        self.assertEqual(
+            _sin_ids(todas_las_filas(empaquetado)), _sin_ids(todas_las_filas(filas))
+        )
+        self.assertEqual(
+            resumen_a_dict(empaquetado.participant_event.resumen_analisis),
+            resumen_a_dict(filas.participant_event.resumen_analisis),
+        )
+
+        pagina = reportes.pagina_registros(empaquetado, "rostros", t0=0.5, t1=5.0, limite=1)
+        self.assertEqual(pagina["items"][0]["tiempo_inicio"], 0.0)
+        siguiente = reportes.pagina_registros(
+            empaquetado, "rostros", t0=0.5, t1=5.0, cursor=pagina["next_cursor"], limite=1
+        )
+        self.assertEqual(siguiente["items"][0]["tiempo_inicio"], 2.0)
+        self.assertIsNone(siguiente["next_cursor"])
+
+        eventos = indice_de_analisis(empaquetado).eventos(4.5, 5.5)
+        self.assertEqual(
+            sorted((e["tipo"], e["etiqueta"]) for e in eventos),
+            [("iluminacion", ""), ("rostros", "1")],
+        )
+
+    def test_regrabar_reemplaza_paquetes(self):
+        resultados = _resultados()
+        resultados["rostros"] = resultados["rostros"][:1]
+
+        with mock.patch.dict("os.environ", {"ANALYSIS_PACKED_STORAGE": "true"}):
+            guardar_resultados(self.analisis["filas"], resultados)
+
+        analisis = self._recargar("filas")
+        self.assertFalse(RegistroRostro.objects.filter(analisis=analisis).exists())
+        self.assertEqual(
+            RegistrosEmpaquetados.objects.get(analisis=analisis, tipo="rostros").cantidad, 1
+        )
+        self.assertEqual(analisis.participant_event.resumen_analisis.total_rostros_detectados, 1)
@@ -0,0 +1,203 @@
+import gzip
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from authentication.models import CustomUser, UserRole
+from authentication.utils import generate_token
+from behavior_analysis import reportes, views
+from behavior_analysis.models import AnalisisComportamiento, RegistroRostro
+from behavior_analysis.services import guardar_resultados
+from events.models import Event, Participant, ParticipantEvent, ParticipantLog
+from events.storage import InMemoryStorageBackend
+
+
+class ReporteArtefactoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.storage = InMemoryStorageBackend()
+        self.storage.generate_presigned_url = lambda key, expiration=3600: f"signed:{key}"
+        patcher = mock.patch("behavior_analysis.reportes.s3_service", self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        now = timezone.now()
+        self.evaluator = CustomUser.objects.create(
+            email="reportes@example.com", first_name="R", last_name="U", password="x"
+        )
+        UserRole.objects.create(user=self.evaluator, role="admin")
+        self.event = Event.objects.create(
+            name="Report Event",
+            description="Reports",
+            start_date=now,
+            close_date=now,
+            end_date=now,
+            duration=15,
+            evaluator=self.evaluator,
+            status="completado",
+        )
+        self.participant = Participant.objects.create(
+            first_name="R", last_name="P", name="R P", email="rp@example.com"
+        )
+        self.participant_event = ParticipantEvent.objects.create(
+            event=self.event, participant=self.participant
+        )
+        self.analisis = AnalisisComportamiento.objects.create(
+            participant_event=self.participant_event,
+            video_link="media/merged.mp4",
+            status="completado",
+        )
+        RegistroRostro.objects.create(
+            analisis=self.analisis, persona_id=1, tiempo_inicio=0.0, tiempo_fin=1.0
+        )
+        ParticipantLog.objects.create(
+            name="screen",
+            message="Screen",
+            url="media/screen.jpg",
+            participant_event=self.participant_event,
+        )
+
+    def _get(self, **headers):
+        request = RequestFactory().get(
+            f"/analysis/report/{self.event.id}/participants/{self.participant.id}/",
+            HTTP_AUTHORIZATION=f"Bearer {generate_token(self.evaluator)}",
+            **headers,
+        )
+        return views.analysis_report(request, self.event.id, self.participant.id)
+
+    def test_renderizar_reporte_guarda_gzip_con_keys_y_reemplaza_anterior(self):
+        primero = reportes.renderizar_reporte(self.analisis)
+        segundo = reportes.renderizar_reporte(self.analisis)
+
+        self.assertTrue(segundo["success"])
+        self.assertEqual(list(self.storage.objects), [segundo["key"]])
+        self.assertNotEqual(primero["version"], segundo["version"])
+        data = json.loads(gzip.decompress(self.storage.objects[segundo["key"]]["data"]))
+        self.assertEqual(data["analysis"]["video_link"], "media/merged.mp4")
+        self.assertEqual(data["activity_logs"]["screenshots"][0]["url"], "media/screen.jpg")
+        self.analisis.refresh_from_db()
+        self.assertEqual(self.analisis.reporte_version, segundo["version"])
+
+    def test_analysis_report_sirve_artefacto_con_etag_y_304(self):
+        reportes.renderizar_reporte(self.analisis)
+
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        payload = json.loads(response.content)
+        self.assertEqual(payload["analysis"]["video_link"], "signed:media/merged.mp4")
+        self.assertEqual(
+            payload["activity_logs"]["screenshots"][0]["url"], "signed:media/screen.jpg"
+        )
+        self.assertEqual(payload["statistics"]["total_rostros_detectados"], 1)
+
+        with mock.patch("behavior_analysis.reportes._leer_artefacto") as leer:
+            not_modified = self._get(HTTP_IF_NONE_MATCH=etag)
+            cached = self._get()
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(cached.content, response.content)
+        leer.assert_not_called()
+
+    def test_analysis_report_firma_el_video_actual_del_analisis(self):
+        reportes.renderizar_reporte(self.analisis)
+        etag = self._get()["ETag"]
+
+        # La union en segundo plano (fan-out) repunta el video tras renderizar
+        AnalisisComportamiento.objects.filter(pk=self.analisis.pk).update(
+            video_link="media/final.mp4"
+        )
+
+        not_modified = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 200)
+        payload = json.loads(not_modified.content)
+        self.assertEqual(payload["analysis"]["video_link"], "signed:media/final.mp4")
+        self.assertEqual(payload["analysis"]["video_key"], "media/final.mp4")
+
+    def test_analysis_report_sin_artefacto_construye_en_vivo(self):
+        self.analisis.reporte_key = "media/missing.json.gz"
+        self.analisis.reporte_version = "abc"
+        self.analisis.save()
+
+        response = self._get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+        self.assertEqual(
+            json.loads(response.content)["analysis"]["video_link"], "signed:media/merged.mp4"
+        )
+
+    def test_guardar_resultados_invalida_y_encola_renderizado(self):
+        reportes.renderizar_reporte(self.analisis)
+        resultados = {
+            "rostros": [],
+            "gestos": [],
+            "iluminacion": [],
+            "ausencia": [],
+            "lipsync": [],
+            "voz": {"susurros": [], "hablantes": []},
+        }
+
+        with mock.patch.dict("os.environ", {"REPORT_ARTIFACTS": "true"}), mock.patch(
+            "behavior_analysis.tasks.render_report_task.delay"
+        ) as delay, self.captureOnCommitCallbacks(execute=True):
+            guardar_resultados(self.analisis, resultados)
+
+        self.analisis.refresh_from_db()
+        self.assertEqual(self.analisis.reporte_version, "")
+        delay.assert_called_once_with(self.analisis.id)
+
+    def _page(self, tipo, **params):
+        request = RequestFactory().get(
+            f"/analysis/report/{self.event.id}/participants/{self.participant.id}/{tipo}/",
+            params,
+            HTTP_AUTHORIZATION=f"Bearer {generate_token(self.evaluator)}",
+        )
+        response = views.analysis_report_page(
+            request, self.event.id, self.participant.id, tipo
+        )
+        return response.status_code, json.loads(response.content)
+
+    def test_analysis_report_page_keyset_en_ventana(self):
+        for inicio in (2.0, 2.0, 2.0, 5.0, 9.0, 20.0):
+            RegistroRostro.objects.create(
+                analisis=self.analisis, persona_id=2, tiempo_inicio=inicio, tiempo_fin=inicio + 1
+            )
+
+        vistos = []
+        params = {"t0": "1.5", "t1": "10", "limit": "2"}
+        while True:
+            status, payload = self._page("rostros", **params)
+            self.assertEqual(status, 200)
+            vistos.extend((r["tiempo_inicio"], r["id"]) for r in payload["items"])
+            if not payload["next_cursor"]:
+                break
+            params["cursor"] = payload["next_cursor"]
+
+        self.assertEqual([t for t, _ in vistos], [2.0, 2.0, 2.0, 5.0, 9.0])
+        self.assertEqual(vistos, sorted(vistos))
+        self.assertEqual(len(set(vistos)), 5)
+
+    def test_analysis_report_page_screenshots_firmados(self):
+        ParticipantLog.objects.create(
+            name="screen",
+            message="Screen 2",
+            url="media/screen2.jpg",
+            participant_event=self.participant_event,
+        )
+
+        status, primera = self._page("screenshots", limit="1")
+        _, segunda = self._page("screenshots", limit="1", cursor=primera["next_cursor"])
+
+        self.assertEqual(status, 200)
+        self.assertEqual(primera["items"][0]["url"], "signed:media/screen.jpg")
+        self.assertEqual(segunda["items"][0]["url"], "signed:media/screen2.jpg")
+        self.assertIsNone(segunda["next_cursor"])
+
+    def test_analysis_report_page_parametros_invalidos(self):
+        self.assertEqual(self._page("rostros", cursor="nope")[0], 400)
+        self.assertEqual(self._page("rostros", t0="abc")[0], 400)
+        self.assertEqual(self._page("screenshots", t0="ayer")[0], 400)
+        self.assertEqual(self._page("otros")[0], 400)
@@ -0,0 +1,121 @@
+import json
+
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from authentication.models import CustomUser, UserRole
+from authentication.utils import generate_token
+from behavior_analysis.models import AnalisisComportamiento, ResumenAnalisis
+from behavior_analysis.resumen import registrar_log_en_resumen
+from behavior_analysis.services import guardar_resultados
+from events import views as event_views
+from events.models import Event, Participant, ParticipantEvent, ParticipantLog
+
+
+def _resultados():
+    return {
+        "rostros": [
+            {"persona_id": 1, "tiempo_inicio": 0.0, "tiempo_fin": 1.0},
+            {"persona_id": 1, "tiempo_inicio": 5.0, "tiempo_fin": 6.0},
+            {"persona_id": 2, "tiempo_inicio": 2.0, "tiempo_fin": 3.0},
+        ],
+        "gestos": [
+            {"tipo_gesto": "Looking Left", "tiempo_inicio": 0.0, "tiempo_fin": 1.0, "duracion": 1.0}
+        ],
+        "iluminacion": [{"tiempo_inicio": 0.0, "tiempo_fin": 1.0}],
+        "ausencia": [(0.0, 2.5, 2.5), (10.0, 11.25, 1.25)],
+        "lipsync": [],
+        "voz": {
+            "susurros": [(1.0, 2.0)],
+            "hablantes": [
+                {"etiqueta": "A", "tiempo_inicio": 0.0, "tiempo_fin": 1.0},
+                {"etiqueta": "B", "tiempo_inicio": 1.0, "tiempo_fin": 2.0},
+            ],
+        },
+    }
+
+
+class ResumenAnalisisTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.evaluator = CustomUser.objects.create(
+            email="resumen@example.com", first_name="R", last_name="U", password="x"
+        )
+        UserRole.objects.create(user=self.evaluator, role="admin")
+        self.event = Event.objects.create(
+            name="Resumen Event",
+            description="Resumen",
+            start_date=now,
+            close_date=now,
+            end_date=now,
+            duration=15,
+            evaluator=self.evaluator,
+            status="completado",
+        )
+        participant = Participant.objects.create(
+            first_name="R", last_name="P", name="R P", email="rp@example.com"
+        )
+        self.participant_event = ParticipantEvent.objects.create(
+            event=self.event, participant=participant
+        )
+        self.analisis = AnalisisComportamiento.objects.create(
+            participant_event=self.participant_event, video_link="media/merged.mp4"
+        )
+
+    def _log(self, name):
+        return ParticipantLog.objects.create(
+            name=name, message=name, participant_event=self.participant_event
+        )
+
+    def test_guardar_resultados_materializa_resumen(self):
+        self._log("screen")
+        self._log("http")
+        self._log("http")
+
+        guardar_resultados(self.analisis, _resultados())
+
+        resumen = ResumenAnalisis.objects.get(participant_event=self.participant_event)
+        self.assertEqual(resumen.total_rostros_detectados, 2)
+        self.assertEqual(resumen.total_gestos, 1)
+        self.assertEqual(resumen.total_anomalias_voz, 1)
+        self.assertEqual(resumen.total_hablantes, 2)
+        self.assertEqual(resumen.total_ausencias, 2)
+        self.assertEqual(resumen.tiempo_total_ausencia_segundos, 3.75)
+        self.assertEqual(resumen.total_screenshots, 1)
+        self.assertEqual(resumen.total_blocked_requests, 2)
+
+    def test_registrar_log_incrementa_contador(self):
+        guardar_resultados(self.analisis, _resultados())
+
+        registrar_log_en_resumen(self.participant_event.id, "proxy")
+        registrar_log_en_resumen(self.participant_event.id, "keylogger")
+
+        resumen = ResumenAnalisis.objects.get(participant_event=self.participant_event)
+        self.assertEqual(resumen.total_proxy_disconnections, 1)
+
+    def test_evaluation_detail_indicators_single_query(self):
+        guardar_resultados(self.analisis, _resultados())
+        for idx in range(3):
+            participant = Participant.objects.create(
+                first_name=f"X{idx}", last_name="P", name=f"X{idx} P", email=f"x{idx}@example.com"
+            )
+            ParticipantEvent.objects.create(event=self.event, participant=participant)
+
+        request = RequestFactory().get(
+            f"/events/api/evaluations/{self.event.id}",
+            HTTP_AUTHORIZATION=f"Bearer {generate_token(self.evaluator)}",
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = event_views.evaluation_detail(request, self.event.id)
+
+        participants = json.loads(response.content)["event"]["participants"]
+        # Participantes, resumen y analisis en una sola consulta
+        consultas = [q["sql"] for q in queries if '"eventos_participantes"' in q["sql"]]
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(len(participants), 4)
+        self.assertEqual(participants[0]["analysis_status"], "completado")
+        self.assertEqual(participants[0]["risk_indicators"]["total_hablantes"], 2)
+        self.assertIsNone(participants[1]["risk_indicators"])
+        self.assertEqual(participants[1]["analysis_status"], "no_solicitado")
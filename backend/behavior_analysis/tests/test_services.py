@@ -1,3 +1,4 @@
+import os
 import tempfile
 from types import SimpleNamespace
 from unittest import mock
@@ -192,6 +193,7 @@ class BehaviorAnalysisServicesTests(TestCase):
                 result = procesar_video_completo(tmp.name, self.participant_event.id)
 
         self.assertIsNotNone(result)
+        self.assertTrue(result["success"])
         self.assertEqual(result["status"], "completado")
 
     def test_procesar_video_completo_missing_participant_event(self):
@@ -224,6 +226,24 @@ class BehaviorAnalysisServicesTests(TestCase):
         self.assertIsNone(result)
         self.assertEqual(analysis.status, "error")
 
+    def test_procesar_video_completo_full_failure_keeps_preview(self):
+        AnalisisComportamiento.objects.filter(
+            participant_event=self.participant_event
+        ).update(status="completado", nivel="preliminar")
+
+        with mock.patch(
+            "behavior_analysis.services.s3_service.download_file",
+            return_value={"success": False, "error": "fail"},
+        ):
+            result = procesar_video_completo("missing_key", self.participant_event.id)
+
+        analysis = AnalisisComportamiento.objects.get(
+            participant_event=self.participant_event
+        )
+        self.assertIsNone(result)
+        self.assertEqual(analysis.status, "completado")
+        self.assertEqual(analysis.nivel, "preliminar")
+
     def test_procesar_video_completo_video_capture_failure(self):
         class StubCaptureFail:
             def isOpened(self):
@@ -265,3 +285,192 @@ class BehaviorAnalysisServicesTests(TestCase):
         )
         self.assertIsNone(result)
         self.assertEqual(analysis.status, "error")
+
+    def test_procesar_video_completo_preliminar_only_runs_preview_analyzers(self):
+        class StubCapture:
+            def __init__(self):
+                self.position = 0
+                self.reads = 0
+
+            def isOpened(self):
+                return self.position < 60
+
+            def grab(self):
+                self.position += 1
+                return True
+
+            def read(self):
+                self.position += 1
+                self.reads += 1
+                return True, np.zeros((10, 10, 3), dtype=np.uint8)
+
+            def get(self, prop):
+                import cv2
+
+                if prop == cv2.CAP_PROP_FPS:
+                    return 30
+                if prop == cv2.CAP_PROP_POS_MSEC:
+                    return self.position * 1000 / 30
+                return 0
+
+            def getBackendName(self):
+                return "stub"
+
+            def release(self):
+                return None
+
+        capture = StubCapture()
+        rostros = mock.Mock()
+        rostros.obtener_resultados.return_value = [
+            {"persona_id": 1, "tiempo_inicio": 0.0, "tiempo_fin": 1.0}
+        ]
+        ausencia = mock.Mock()
+        ausencia.finalizar.return_value = [(0.0, 1.0, 1.0)]
+        voz = mock.Mock()
+        voz.procesar.return_value = {"susurros": [(0.0, 1.0)], "hablantes": []}
+
+        with tempfile.NamedTemporaryFile(suffix=".mp4") as tmp:
+            tmp.write(b"data")
+            tmp.flush()
+
+            with mock.patch(
+                "behavior_analysis.services.cv2.VideoCapture", return_value=capture
+            ), mock.patch(
+                "behavior_analysis.services.mp.solutions.face_mesh.FaceMesh"
+            ) as face_mesh_cls, mock.patch(
+                "behavior_analysis.services.AnalizadorRostros", return_value=rostros
+            ) as rostros_cls, mock.patch(
+                "behavior_analysis.services.AnalizadorGestos"
+            ) as gestos_cls, mock.patch(
+                "behavior_analysis.services.AnalizadorIluminacion"
+            ) as ilum_cls, mock.patch(
+                "behavior_analysis.services.AnalizadorLipsync"
+            ) as lipsync_cls, mock.patch(
+                "behavior_analysis.services.AnalizadorVoz", return_value=voz
+            ) as voz_cls, mock.patch(
+                "behavior_analysis.services.AnalizadorAusencia", return_value=ausencia
+            ):
+                result = procesar_video_completo(
+                    tmp.name, self.participant_event.id, "preliminar"
+                )
+
+        self.assertEqual(result["nivel"], "preliminar")
+        gestos_cls.assert_not_called()
+        ilum_cls.assert_not_called()
+        lipsync_cls.assert_not_called()
+        face_mesh_cls.assert_not_called()
+        rostros_cls.assert_called_once_with(frame_stride=1)
+        self.assertEqual(voz_cls.call_args.kwargs["segment_duration"], 1.0)
+        # 30 fps muestreado a 2 fps => 1 de cada 15 frames decodificado
+        self.assertEqual(capture.reads, 4)
+        analysis = AnalisisComportamiento.objects.get(
+            participant_event=self.participant_event
+        )
+        self.assertEqual(analysis.status, "completado")
+        self.assertEqual(analysis.nivel, "preliminar")
+        self.assertEqual(analysis.registros_ausencia.count(), 1)
+
+    def test_procesar_video_completo_preliminar_skips_when_full_done(self):
+        AnalisisComportamiento.objects.filter(
+            participant_event=self.participant_event
+        ).update(status="completado", nivel="completo")
+
+        result = procesar_video_completo(
+            "local", self.participant_event.id, "preliminar"
+        )
+
+        self.assertTrue(result["skipped"])
+        self.assertEqual(result["reason"], "full_analysis_available")
+
+    def test_procesar_video_completo_unknown_profile(self):
+        result = procesar_video_completo("local", self.participant_event.id, "otro")
+        self.assertIsNone(result)
+
+    def test_procesar_video_completo_progressive_decodes_during_single_download(self):
+        class StubCapture:
+            def __init__(self):
+                self.position = 0
+
+            def isOpened(self):
+                return self.position < 3
+
+            def read(self):
+                self.position += 1
+                return True, np.zeros((10, 10, 3), dtype=np.uint8)
+
+            def get(self, prop):
+                import cv2
+
+                if prop == cv2.CAP_PROP_FPS:
+                    return 30
+                if prop == cv2.CAP_PROP_POS_MSEC:
+                    return self.position * 1000 / 30
+                return 0
+
+            def getBackendName(self):
+                return "stub"
+
+            def release(self):
+                return None
+
+        eventos = []
+
+        def download_side_effect(key, file_obj):
+            file_obj.write(b"data")
+            eventos.append("descarga")
+            return {"success": True}
+
+        voz = mock.Mock()
+        voz.procesar.side_effect = lambda: eventos.append("voz") or {
+            "susurros": [],
+            "hablantes": [],
+        }
+        lipsync = mock.Mock()
+        lipsync.obtener_resultados.return_value = {"anomalias": []}
+        rostros = mock.Mock(obtener_resultados=mock.Mock(return_value=[]))
+        gestos = mock.Mock(obtener_resultados=mock.Mock(return_value=[]))
+        ilum = mock.Mock(obtener_resultados=mock.Mock(return_value=[]))
+        ausencia = mock.Mock(finalizar=mock.Mock(return_value=[]))
+
+        with mock.patch.dict(
+            "os.environ", {"ANALYSIS_PROGRESSIVE": "true"}
+        ), mock.patch(
+            "behavior_analysis.services.s3_service.generate_presigned_url"
+        ) as presign, mock.patch(
+            "behavior_analysis.services.s3_service.download_file"
+        ) as download_file, mock.patch(
+            "behavior_analysis.services.s3_service.download_fileobj",
+            side_effect=download_side_effect,
+        ), mock.patch(
+            "behavior_analysis.services.cv2.VideoCapture", return_value=StubCapture()
+        ) as capture_cls, mock.patch(
+            "behavior_analysis.services.mp.solutions.face_mesh.FaceMesh"
+        ) as face_mesh_cls, mock.patch(
+            "behavior_analysis.services.AnalizadorRostros", return_value=rostros
+        ), mock.patch(
+            "behavior_analysis.services.AnalizadorGestos", return_value=gestos
+        ), mock.patch(
+            "behavior_analysis.services.AnalizadorIluminacion", return_value=ilum
+        ), mock.patch(
+            "behavior_analysis.services.AnalizadorLipsync", return_value=lipsync
+        ) as lipsync_cls, mock.patch(
+            "behavior_analysis.services.AnalizadorVoz", return_value=voz
+        ), mock.patch(
+            "behavior_analysis.services.AnalizadorAusencia", return_value=ausencia
+        ):
+            face_mesh_cls.return_value.process.return_value = SimpleNamespace(
+                multi_face_landmarks=None
+            )
+            result = procesar_video_completo(
+                "media/merged.mp4", self.participant_event.id
+            )
+
+        self.assertEqual(result["status"], "completado")
+        fuente = capture_cls.call_args_list[0].args[0]
+        self.assertTrue(fuente.endswith("video.mp4"))
+        self.assertFalse(os.path.exists(fuente))
+        presign.assert_not_called()
+        download_file.assert_not_called()
+        self.assertEqual(lipsync_cls.call_args.kwargs, {"cargar_audio": False})
+        lipsync.cargar_audio.assert_called_once()
+        self.assertEqual(eventos, ["descarga", "voz"])
@@ -7,7 +7,12 @@ from django.utils import timezone
 from celery.app.task import Task
 from authentication.models import CustomUser
 from behavior_analysis import tasks
-from events.models import Event, Participant, ParticipantEvent
+from behavior_analysis.models import (
+    AnalisisComportamiento,
+    AnalisisFragmento,
+    ProcesamientoEvento,
+)
+from events.models import Event, Participant, ParticipantEvent, ParticipantLog
 
 
 class BehaviorAnalysisTasksTests(TestCase):
@@ -74,15 +79,16 @@ class BehaviorAnalysisTasksTests(TestCase):
             "behavior_analysis.tasks.AnalisisComportamiento.objects.update_or_create",
             return_value=(mock.Mock(id=1), True),
         ), mock.patch(
-            "behavior_analysis.tasks.analyze_behavior_task.delay",
-            return_value=mock.Mock(id="analysis-1"),
-        ):
+            "behavior_analysis.tasks.analyze_behavior_task.delay"
+        ) as delay_mock:
             result = tasks.process_participant_completion_task.run(
                 self.participant_event.id, self.event.id, self.event.name
             )
 
         self.assertTrue(result["success"])
-        self.assertEqual(result["analysis_task_id"], "analysis-1")
+        self.assertTrue(result["analysis_pending"])
+        self.assertEqual(result["analysis_source"], "media/merged.mp4")
+        delay_mock.assert_not_called()
 
     def test_analyze_behavior_task_skips_when_missing_analysis(self):
         result = tasks.analyze_behavior_task("media/key", 9999)
@@ -153,3 +159,268 @@ class BehaviorAnalysisTasksTests(TestCase):
 
         self.assertFalse(result["success"])
         self.assertIn("Unexpected error", result["error"])
+
+    def _merge_result(self, **extra):
+        return dict(
+            {
+                "success": True,
+                "participant_event_id": self.participant_event.id,
+                "participant_name": "Task Participant",
+                "video_key": "media/merged.mp4",
+                "analysis_source": "media/merged.mp4",
+                "analysis_pending": True,
+                "two_tier": False,
+            },
+            **extra,
+        )
+
+    def test_analyze_merged_video_task_two_tier_queues_full_pass_separately(self):
+        AnalisisComportamiento.objects.create(
+            participant_event=self.participant_event, video_link="media/merged.mp4"
+        )
+        with mock.patch.object(
+            Task,
+            "request",
+            new_callable=mock.PropertyMock,
+            return_value=SimpleNamespace(id="analysis-1"),
+        ), mock.patch(
+            "behavior_analysis.tasks.procesar_video_completo",
+            return_value={"success": True},
+        ) as procesar_mock, mock.patch.object(
+            tasks.analyze_merged_video_task, "replace", return_value="replaced"
+        ) as replace_mock:
+            preview = tasks.analyze_merged_video_task.run(
+                self._merge_result(two_tier=True)
+            )
+            # La pasada preliminar libera el worker; la completa es otra tarea
+            self.assertEqual(preview, "replaced")
+            self.assertEqual(
+                [c.args[-1] for c in procesar_mock.call_args_list], ["preliminar"]
+            )
+            (completa,) = replace_mock.call_args.args
+            self.assertEqual(completa.task, tasks.analyze_merged_video_task.name)
+            result = tasks.analyze_merged_video_task.run(*completa.args)
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["analysis_task_id"], "analysis-1")
+        self.assertEqual(result["preview"], {"success": True})
+        self.assertEqual(
+            [c.args[-1] for c in procesar_mock.call_args_list],
+            ["preliminar", "completo"],
+        )
+        self.assertEqual(replace_mock.call_count, 1)
+        self.assertNotIn("analysis_pending", result)
+
+    def test_analyze_merged_video_task_returns_failure_when_analysis_raises(self):
+        AnalisisComportamiento.objects.create(
+            participant_event=self.participant_event, video_link="media/merged.mp4"
+        )
+        with mock.patch.object(
+            Task,
+            "request",
+            new_callable=mock.PropertyMock,
+            return_value=SimpleNamespace(id="analysis-err", retries=0),
+        ), mock.patch(
+            "behavior_analysis.tasks.procesar_video_completo",
+            side_effect=RuntimeError("boom"),
+        ):
+            result = tasks.analyze_merged_video_task.run(self._merge_result())
+
+        self.assertFalse(result["success"])
+        self.assertIn("boom", result["error"])
+        self.assertEqual(result["participant_event_id"], self.participant_event.id)
+        self.assertNotIn("analysis_pending", result)
+
+    def test_fragment_and_stitch_tasks_return_failures(self):
+        with mock.patch(
+            "behavior_analysis.tasks.analizar_fragmento", side_effect=RuntimeError("boom")
+        ):
+            fragment = tasks.analyze_fragment_task.run(7)
+        with mock.patch(
+            "behavior_analysis.tasks.unir_fragmentos", side_effect=RuntimeError("boom")
+        ):
+            stitched = tasks.stitch_fragments_task.run(self.participant_event.id)
+
+        self.assertFalse(fragment["success"])
+        self.assertFalse(stitched["success"])
+        self.assertEqual(stitched["participant_event_id"], self.participant_event.id)
+
+    def test_analyze_merged_video_task_passes_through_skips(self):
+        skipped = {"success": False, "skipped": True, "error": "no_video"}
+        with mock.patch(
+            "behavior_analysis.tasks.procesar_video_completo"
+        ) as procesar_mock:
+            result = tasks.analyze_merged_video_task.run(skipped)
+
+        self.assertEqual(result, skipped)
+        procesar_mock.assert_not_called()
+
+    def test_start_event_completion_dispatches_plan_as_chord(self):
+        plan = [
+            {"participant_event_id": self.participant_event.id, "prioridad": 0},
+        ]
+        with mock.patch("behavior_analysis.tasks.chord") as chord_mock:
+            chord_mock.return_value.freeze.return_value = mock.Mock(id="event-1")
+            dispatch = tasks.start_event_completion(self.event, plan, two_tier=True)
+
+        task_ids = dispatch["task_ids"]
+        self.assertFalse(dispatch["duplicate"])
+        header, callback = chord_mock.call_args.args
+        (cadena,) = header.tasks
+        merge_sig, analysis_sig = cadena.tasks
+        self.assertEqual(merge_sig.task, tasks.process_participant_completion_task.name)
+        self.assertEqual(merge_sig.kwargs["two_tier"], True)
+        self.assertEqual(merge_sig.options["priority"], 0)
+        self.assertEqual(analysis_sig.task, tasks.analyze_merged_video_task.name)
+        self.assertEqual(task_ids[self.participant_event.id], analysis_sig.id)
+        self.assertEqual(callback.args, (self.event.id,))
+        procesamiento = ProcesamientoEvento.objects.get(event=self.event)
+        self.assertEqual(procesamiento.status, "procesando")
+        self.assertEqual(procesamiento.total_participantes, 1)
+        self.assertEqual(procesamiento.task_id, dispatch["event_task_id"])
+
+    def test_finalize_event_completion_task_marks_event(self):
+        ProcesamientoEvento.objects.create(event=self.event, total_participantes=2)
+
+        result = tasks.finalize_event_completion_task.run(
+            [{"success": True}, {"success": False, "error": "boom"}], self.event.id
+        )
+
+        self.assertEqual(result["failed"], 1)
+        procesamiento = ProcesamientoEvento.objects.get(event=self.event)
+        self.assertEqual(procesamiento.status, "con_errores")
+        self.assertEqual(procesamiento.completados, 1)
+        self.assertIsNotNone(procesamiento.fecha_fin)
+
+    def test_analyze_merged_video_task_stitches_fragments(self):
+        log = ParticipantLog.objects.create(
+            name="audio/video",
+            url="media/1.webm",
+            message="Media Capture",
+            participant_event=self.participant_event,
+        )
+        AnalisisFragmento.objects.create(
+            participant_event=self.participant_event, participant_log=log
+        )
+        with mock.patch.object(
+            Task,
+            "request",
+            new_callable=mock.PropertyMock,
+            return_value=SimpleNamespace(id="req-inc"),
+        ), mock.patch(
+            "behavior_analysis.tasks.unir_fragmentos",
+            return_value={"success": True, "id": 1},
+        ) as stitch_mock, mock.patch(
+            "behavior_analysis.tasks.procesar_video_completo"
+        ) as procesar_mock:
+            result = tasks.analyze_merged_video_task.run(self._merge_result())
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["analysis_mode"], "incremental")
+        stitch_mock.assert_called_once_with(self.participant_event.id)
+        procesar_mock.assert_not_called()
+
+    def test_process_participant_completion_task_fanout_skips_merge(self):
+        logs = [
+            ParticipantLog.objects.create(
+                name="audio/video",
+                url=f"media/{idx}.webm",
+                message="Media Capture",
+                participant_event=self.participant_event,
+            )
+            for idx in range(3)
+        ]
+        stitched = {
+            "success": True,
+            "participant_event_id": self.participant_event.id,
+            "analysis_mode": "fanout",
+        }
+        with mock.patch.object(
+            Task,
+            "request",
+            new_callable=mock.PropertyMock,
+            return_value=SimpleNamespace(id="req-fan"),
+        ), mock.patch(
+            "behavior_analysis.tasks.video_merger_service.merge_participant_videos"
+        ) as merge_mock, mock.patch(
+            "behavior_analysis.tasks.chord"
+        ) as chord_mock, mock.patch.object(
+            tasks.process_participant_completion_task, "replace", return_value=stitched
+        ) as replace_mock, mock.patch(
+            "behavior_analysis.tasks.merge_participant_videos_task.delay",
+            return_value=mock.Mock(id="merge-1"),
+        ) as merge_task_mock:
+            result = tasks.process_participant_completion_task.run(
+                self.participant_event.id,
+                self.event.id,
+                self.event.name,
+                fanout=True,
+            )
+
+        merge_mock.assert_not_called()
+        merge_task_mock.assert_called_once_with(self.participant_event.id)
+        # La cadena continua con el resultado del reduce, no con el despacho
+        self.assertIs(result, stitched)
+        replace_mock.assert_called_once_with(chord_mock.return_value)
+        chord_mock.return_value.apply_async.assert_not_called()
+        header, callback = chord_mock.call_args.args
+        self.assertEqual([sig.args[0] for sig in header.tasks], [log.id for log in logs])
+        self.assertEqual(callback.args, (self.participant_event.id,))
+        analisis = AnalisisComportamiento.objects.get(
+            participant_event=self.participant_event
+        )
+        self.assertEqual(analisis.video_link, "media/0.webm")
+
+    def test_stitch_fragments_task_result_feeds_event_chord(self):
+        with mock.patch(
+            "behavior_analysis.tasks.unir_fragmentos",
+            return_value={"success": False, "error": "No fragment could be analyzed"},
+        ):
+            result = tasks.stitch_fragments_task.run(self.participant_event.id)
+
+        self.assertEqual(result["participant_event_id"], self.participant_event.id)
+        self.assertEqual(result["analysis_mode"], "fanout")
+        final = tasks.finalize_event_completion_task.run([result], self.event.id)
+        self.assertEqual(final["failed"], 1)
+
+    def test_process_participant_completion_task_analyzes_proxy(self):
+        with mock.patch.object(
+            Task,
+            "request",
+            new_callable=mock.PropertyMock,
+            return_value=SimpleNamespace(id="req-proxy"),
+        ), mock.patch(
+            "behavior_analysis.tasks.video_merger_service.merge_participant_videos",
+            return_value={
+                "success": True,
+                "merged_count": 2,
+                "s3_key": "media/merged.mp4",
+                "analysis_key": "media/proxy.mp4",
+            },
+        ):
+            result = tasks.process_participant_completion_task.run(
+                self.participant_event.id, self.event.id, self.event.name
+            )
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["analysis_source"], "media/proxy.mp4")
+        analisis = AnalisisComportamiento.objects.get(
+            participant_event=self.participant_event
+        )
+        self.assertEqual(analisis.video_link, "media/merged.mp4")
+        self.assertEqual(analisis.video_analisis_link, "media/proxy.mp4")
+
+    def test_merge_participant_videos_task_updates_video_link(self):
+        AnalisisComportamiento.objects.create(
+            participant_event=self.participant_event, video_link="media/0.webm"
+        )
+        with mock.patch(
+            "behavior_analysis.tasks.video_merger_service.merge_participant_videos",
+            return_value={"success": True, "s3_key": "media/merged.mp4"},
+        ):
+            tasks.merge_participant_videos_task(self.participant_event.id)
+
+        analisis = AnalisisComportamiento.objects.get(
+            participant_event=self.participant_event
+        )
+        self.assertEqual(analisis.video_link, "media/merged.mp4")
@@ -0,0 +1,142 @@
+import json
+import random
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.utils import timezone
+
+from authentication.models import CustomUser, UserRole
+from authentication.utils import generate_token
+from behavior_analysis import views
+from behavior_analysis.models import (
+    AnalisisComportamiento,
+    AnalisisFragmento,
+    RegistroAusencia,
+    RegistroGesto,
+    RegistroVoz,
+)
+from behavior_analysis.timeline import IndiceIntervalos, coocurrencia, screenshots_cercanos
+from events.models import Event, Participant, ParticipantEvent, ParticipantLog
+
+
+class IndiceIntervalosTests(SimpleTestCase):
+    def test_solapados_igual_a_recorrido_completo(self):
+        rng = random.Random(7)
+        inicios = [rng.uniform(0, 1000) for _ in range(500)]
+        fines = [i + rng.choice([0.0, rng.uniform(0, 5), rng.uniform(0, 200)]) for i in inicios]
+        indice = IndiceIntervalos(inicios, fines, [0] * 500, [""] * 500, range(500))
+
+        for _ in range(100):
+            t0 = rng.uniform(-10, 1010)
+            t1 = t0 + rng.uniform(0, 50)
+            esperados = {
+                idx for idx, (i, f) in enumerate(zip(inicios, fines)) if i < t1 and f >= t0
+            }
+            obtenidos = {int(indice.ids[p]) for p in indice.solapados(t0, t1)}
+            self.assertEqual(obtenidos, esperados)
+
+    def test_coocurrencia_barrido(self):
+        a = (np.array([0.0, 2.0, 10.0]), np.array([3.0, 5.0, 12.0]))
+        b = (np.array([4.0, 11.0]), np.array([6.0, 20.0]))
+
+        self.assertEqual(coocurrencia(a, b), [(4.0, 5.0), (11.0, 12.0)])
+        self.assertEqual(coocurrencia(a, (np.array([]), np.array([]))), [])
+
+
+class TimelineEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.evaluator = CustomUser.objects.create(
+            email="timeline@example.com", first_name="T", last_name="U", password="x"
+        )
+        UserRole.objects.create(user=self.evaluator, role="admin")
+        self.event = Event.objects.create(
+            name="Timeline Event",
+            description="Timeline",
+            start_date=now,
+            close_date=now,
+            end_date=now,
+            duration=15,
+            evaluator=self.evaluator,
+            status="completado",
+        )
+        self.participant = Participant.objects.create(
+            first_name="T", last_name="P", name="T P", email="tp@example.com"
+        )
+        self.participant_event = ParticipantEvent.objects.create(
+            event=self.event, participant=self.participant
+        )
+        self.analisis = AnalisisComportamiento.objects.create(
+            participant_event=self.participant_event,
+            video_link="media/merged.mp4",
+            status="completado",
+        )
+        RegistroGesto.objects.create(
+            analisis=self.analisis, tipo_gesto="Mirando Izquierda",
+            tiempo_inicio=10.0, tiempo_fin=14.0, duracion=4.0,
+        )
+        RegistroVoz.objects.create(
+            analisis=self.analisis, tipo_log="susurro", tiempo_inicio=12.0, tiempo_fin=20.0
+        )
+        RegistroVoz.objects.create(
+            analisis=self.analisis, tipo_log="hablante", etiqueta_hablante="Voz 1",
+            tiempo_inicio=0.0, tiempo_fin=30.0,
+        )
+        RegistroAusencia.objects.create(
+            analisis=self.analisis, tiempo_inicio=50.0, tiempo_fin=60.0, duracion=10.0
+        )
+
+    def _log(self, name, timestamp, url):
+        log = ParticipantLog.objects.create(
+            name=name, message=name, url=url, participant_event=self.participant_event
+        )
+        ParticipantLog.objects.filter(id=log.id).update(timestamp=timestamp)
+        return log
+
+    def _get(self, vista, **params):
+        request = RequestFactory().get(
+            "/analysis/report/", params,
+            HTTP_AUTHORIZATION=f"Bearer {generate_token(self.evaluator)}",
+        )
+        response = vista(request, self.event.id, self.participant.id)
+        return response.status_code, json.loads(response.content)
+
+    def test_screenshots_cercanos_en_tiempo_de_video(self):
+        fin_primero = timezone.now() - timedelta(hours=1)
+        primero = self._log("audio/video", fin_primero, "media/1.webm")
+        AnalisisFragmento.objects.create(
+            participant_event=self.participant_event, participant_log=primero, duracion=100.0
+        )
+        self._log("audio/video", fin_primero + timedelta(minutes=10), "media/2.webm")
+        self._log("screen", fin_primero - timedelta(seconds=50), "media/a.jpg")
+        # Segundo fragmento: empieza 300 s antes de su log, video 100 + 30
+        self._log("screen", fin_primero + timedelta(seconds=330), "media/b.jpg")
+
+        cercanos = screenshots_cercanos(self.participant_event, 48.0, 49.0, margen=5.0)
+        self.assertEqual([(s["url"], s["tiempo_video"]) for s in cercanos], [("media/a.jpg", 50.0)])
+        cercanos = screenshots_cercanos(self.participant_event, 130.0, 131.0, margen=0.0)
+        self.assertEqual([s["url"] for s in cercanos], ["media/b.jpg"])
+
+    def test_timeline_devuelve_eventos_solapados(self):
+        with mock.patch("behavior_analysis.views._get_presigned_url", return_value="signed"):
+            status, payload = self._get(views.analysis_timeline, t0="13", t1="15")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            sorted((e["tipo"], e["etiqueta"]) for e in payload["eventos"]),
+            [("gestos", "Mirando Izquierda"), ("voz", "hablante"), ("voz", "susurro")],
+        )
+        self.assertEqual(payload["screenshots"], [])
+        self.assertEqual(self._get(views.analysis_timeline)[0], 400)
+
+    def test_cooccurrence_entre_series(self):
+        status, payload = self._get(views.analysis_cooccurrence, a="gestos", b="voz:susurro")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["tramos"], [{"tiempo_inicio": 12.0, "tiempo_fin": 14.0}])
+        self.assertEqual(payload["segundos"], 2.0)
+        self.assertEqual(self._get(views.analysis_cooccurrence, a="x", b="gestos")[0], 400)
@@ -1,6 +1,8 @@
 import os
+import shutil
 import subprocess
 import tempfile
+import time
 from types import SimpleNamespace
 from unittest import mock
 
@@ -8,6 +10,7 @@ from django.test import TestCase
 from django.utils import timezone
 
 from authentication.models import CustomUser
+from behavior_analysis.models import AnalisisComportamiento, UnionProgresiva
 from behavior_analysis.video_merger import VideoMergerService
 from events.models import Event, Participant, ParticipantEvent, ParticipantLog
 
@@ -40,6 +43,12 @@ class VideoMergerServiceTests(TestCase):
         self.participant_event = ParticipantEvent.objects.create(
             event=event, participant=participant
         )
+        rolling_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(rolling_dir.cleanup)
+        self.rolling_dir = rolling_dir.name
+        env = mock.patch.dict("os.environ", {"MERGE_ROLLING_DIR": self.rolling_dir})
+        env.start()
+        self.addCleanup(env.stop)
 
     def test_merge_participant_videos_no_logs(self):
         service = VideoMergerService()
@@ -176,7 +185,7 @@ class VideoMergerServiceTests(TestCase):
                 handle.write(b"data")
 
             with mock.patch(
-                "behavior_analysis.video_merger.s3_service.upload_media_fragment",
+                "behavior_analysis.video_merger.s3_service.upload_large_media",
                 return_value={"success": False, "error": "fail"},
             ):
                 result = service._upload_merged_video_to_s3(
@@ -194,7 +203,7 @@ class VideoMergerServiceTests(TestCase):
                 handle.write(b"data")
 
             with mock.patch(
-                "behavior_analysis.video_merger.s3_service.upload_media_fragment",
+                "behavior_analysis.video_merger.s3_service.upload_large_media",
                 return_value={"success": True, "key": "merged.mp4", "presigned_url": "signed"},
             ):
                 result = service._upload_merged_video_to_s3(
@@ -557,3 +566,504 @@ class VideoMergerServiceTests(TestCase):
                 result = service.merge_participant_videos(self.participant_event.id)
 
         self.assertTrue(result["success"])
+
+    def _probe(self, codec="vp8", width=1280):
+        return {
+            "duracion": 300.0,
+            "video": {
+                "codec_name": codec,
+                "width": width,
+                "height": 720,
+                "pix_fmt": "yuv420p",
+                "time_base": "1/1000",
+            },
+            "audio": {"codec_name": "opus", "sample_rate": "48000", "channels": 1},
+        }
+
+    def test_merge_videos_with_ffmpeg_stream_copy_compatible(self):
+        service = VideoMergerService()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            service.temp_dir = temp_dir
+            files = []
+            for name in ("a.webm", "b.webm", "c.webm"):
+                path = os.path.join(temp_dir, name)
+                with open(path, "wb") as handle:
+                    handle.write(b"data")
+                files.append({"file": path})
+
+            commands = []
+            timeouts = []
+
+            def run_side_effect(cmd, capture_output=True, text=True, timeout=10):
+                commands.append(cmd)
+                timeouts.append(timeout)
+                if "concat" in cmd:
+                    with open(cmd[cmd.index("-i") + 1]) as listing:
+                        self.assertEqual(listing.read().count("file '"), 3)
+                with open(cmd[-1], "wb") as out:
+                    out.write(b"merged")
+                return SimpleNamespace(returncode=0, stderr="", stdout="")
+
+            env = {k: v for k, v in os.environ.items() if k != "ANALYSIS_PROXY"}
+            with mock.patch.dict("os.environ", env, clear=True), mock.patch.object(
+                service, "_check_ffmpeg_available", return_value=True
+            ), mock.patch(
+                "behavior_analysis.video_merger.probar_video",
+                return_value=self._probe(),
+            ), mock.patch(
+                "behavior_analysis.video_merger.subprocess.run",
+                side_effect=run_side_effect,
+            ):
+                output = service._merge_videos_with_ffmpeg(files)
+
+        self.assertTrue(output.endswith(".webm"))
+        self.assertEqual(len(commands), 1)
+        main_output_args = commands[0][commands[0].index("-c"):]
+        self.assertIn("copy", main_output_args)
+        # Sin ANALYSIS_PROXY la union por copia no codifica nada
+        self.assertNotIn("libx264", commands[0])
+        self.assertEqual(timeouts, [1800])
+
+    def test_merge_videos_with_ffmpeg_stream_copy_normalizes_mismatch(self):
+        service = VideoMergerService()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            service.temp_dir = temp_dir
+            files = []
+            for name in ("a.webm", "b.webm", "c.webm"):
+                path = os.path.join(temp_dir, name)
+                with open(path, "wb") as handle:
+                    handle.write(b"data")
+                files.append({"file": path})
+            probes = {
+                files[0]["file"]: self._probe(),
+                files[1]["file"]: self._probe(width=640),
+                files[2]["file"]: self._probe(),
+            }
+
+            commands = []
+
+            def run_side_effect(cmd, capture_output=True, text=True, timeout=10):
+                commands.append(cmd)
+                with open(cmd[-1], "wb") as out:
+                    out.write(b"out")
+                return SimpleNamespace(returncode=0, stderr="", stdout="")
+
+            with mock.patch.object(
+                service, "_check_ffmpeg_available", return_value=True
+            ), mock.patch(
+                "behavior_analysis.video_merger.probar_video",
+                side_effect=lambda path: probes[path],
+            ), mock.patch(
+                "behavior_analysis.video_merger.subprocess.run",
+                side_effect=run_side_effect,
+            ):
+                output = service._merge_videos_with_ffmpeg(files)
+
+        self.assertTrue(output)
+        normalize_cmd, concat_cmd = commands
+        self.assertIn(files[1]["file"], normalize_cmd)
+        self.assertIn("libvpx", normalize_cmd)
+        self.assertIn("scale=1280:720", normalize_cmd)
+        self.assertIn("copy", concat_cmd)
+
+    def test_merge_videos_with_ffmpeg_stream_copy_falls_back(self):
+        service = VideoMergerService()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            service.temp_dir = temp_dir
+            files = []
+            for name in ("a.webm", "b.webm"):
+                path = os.path.join(temp_dir, name)
+                with open(path, "wb") as handle:
+                    handle.write(b"data")
+                files.append({"file": path})
+
+            commands = []
+
+            def run_side_effect(cmd, capture_output=True, text=True, timeout=10):
+                commands.append(cmd)
+                if "concat" in cmd:
+                    return SimpleNamespace(returncode=1, stderr="boom", stdout="")
+                with open(cmd[-1], "wb") as out:
+                    out.write(b"merged")
+                return SimpleNamespace(returncode=0, stderr="", stdout="")
+
+            with mock.patch.object(
+                service, "_check_ffmpeg_available", return_value=True
+            ), mock.patch(
+                "behavior_analysis.video_merger.probar_video",
+                return_value=self._probe(),
+            ), mock.patch(
+                "behavior_analysis.video_merger.subprocess.run",
+                side_effect=run_side_effect,
+            ):
+                output = service._merge_videos_with_ffmpeg(files)
+
+        self.assertTrue(output.endswith(".mp4"))
+        self.assertIn("libx264", commands[-1])
+
+    def test_fetch_videos_parallel_preserves_order(self):
+        now = timezone.now()
+        logs = [
+            ParticipantLog.objects.create(
+                name="audio/video",
+                message="Media",
+                url=f"media/{idx}.webm",
+                participant_event=self.participant_event,
+                timestamp=now,
+            )
+            for idx in range(5)
+        ]
+        service = VideoMergerService()
+
+        def download_side_effect(url):
+            # El primero termina al final: el orden no depende de la finalizacion
+            if url == "media/0.webm":
+                time.sleep(0.05)
+            return None if url == "media/3.webm" else f"/tmp/{os.path.basename(url)}"
+
+        with mock.patch.dict(
+            "os.environ", {"MERGE_DOWNLOAD_WORKERS": "3", "FFMPEG_STREAM_COPY": "true"}
+        ), mock.patch.object(
+            service, "_download_video_from_s3", side_effect=download_side_effect
+        ), mock.patch(
+            "behavior_analysis.video_merger.probar_video", return_value={"video": None}
+        ) as probe_mock:
+            files = service._fetch_videos(logs)
+
+        self.assertEqual(
+            [f["file"] for f in files],
+            ["/tmp/0.webm", "/tmp/1.webm", "/tmp/2.webm", "/tmp/4.webm"],
+        )
+        self.assertEqual(probe_mock.call_count, 4)
+        self.assertEqual(files[0]["probe"], {"video": None})
+
+    def test_fetch_videos_stream_inputs_uses_presigned_urls(self):
+        log = ParticipantLog.objects.create(
+            name="audio/video",
+            message="Media",
+            url="media/0.webm",
+            participant_event=self.participant_event,
+        )
+        service = VideoMergerService()
+        with mock.patch.dict(
+            "os.environ", {"MERGE_STREAM_INPUTS": "true"}
+        ), mock.patch(
+            "behavior_analysis.video_merger.s3_service.generate_presigned_url",
+            return_value="https://signed/0.webm",
+        ), mock.patch.object(service, "_download_video_from_s3") as download_mock:
+            files = service._fetch_videos([log])
+
+        download_mock.assert_not_called()
+        self.assertEqual(files[0]["file"], "https://signed/0.webm")
+
+    def test_merge_videos_with_ffmpeg_emits_analysis_proxy(self):
+        service = VideoMergerService()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            service.temp_dir = temp_dir
+            file1 = os.path.join(temp_dir, "a.webm")
+            file2 = os.path.join(temp_dir, "b.webm")
+            commands = []
+
+            def run_side_effect(cmd, capture_output=True, text=True, timeout=10):
+                commands.append(cmd)
+                with open(cmd[-1], "wb") as out:
+                    out.write(b"merged")
+                return SimpleNamespace(returncode=0, stderr="", stdout="")
+
+            with mock.patch.dict(
+                "os.environ", {"FFMPEG_STREAM_COPY": "false", "ANALYSIS_PROXY": "true"}
+            ), mock.patch.object(
+                service, "_check_ffmpeg_available", return_value=True
+            ), mock.patch(
+                "behavior_analysis.video_merger.subprocess.run",
+                side_effect=run_side_effect,
+            ):
+                output = service._merge_videos_with_ffmpeg(
+                    [{"file": file1}, {"file": file2}]
+                )
+
+        self.assertEqual(len(commands), 1)
+        cmd = commands[0]
+        self.assertIn(service._analysis_proxy_path(output), cmd)
+        filter_complex = cmd[cmd.index("-filter_complex") + 1]
+        self.assertIn("split=2[outv][pv]", filter_complex)
+        self.assertIn("asplit=2[outa][proxya]", filter_complex)
+        self.assertIn("16000", cmd)
+
+    def test_merge_participant_videos_uploads_analysis_proxy(self):
+        for key in ("media/key.webm", "media/key2.webm"):
+            ParticipantLog.objects.create(
+                name="audio/video",
+                message="Media",
+                url=key,
+                participant_event=self.participant_event,
+            )
+        service = VideoMergerService()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            merged_path = os.path.join(temp_dir, "merged.mp4")
+            for path in (merged_path, service._analysis_proxy_path(merged_path)):
+                with open(path, "wb") as handle:
+                    handle.write(b"merged")
+
+            def upload_side_effect(path, participant_event_id, media_type=None):
+                key = "proxy.mp4" if media_type == "analysis_proxy" else "merged.mp4"
+                return {"success": True, "s3_key": key, "presigned_url": "signed"}
+
+            with mock.patch.object(
+                service, "_fetch_videos", return_value=[{"file": "a"}, {"file": "b"}]
+            ), mock.patch.object(
+                service, "_merge_videos_with_ffmpeg", return_value=merged_path
+            ), mock.patch.object(
+                service, "_upload_merged_video_to_s3", side_effect=upload_side_effect
+            ):
+                result = service.merge_participant_videos(self.participant_event.id)
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["s3_key"], "merged.mp4")
+        self.assertEqual(result["analysis_key"], "proxy.mp4")
+
+    def _media_logs(self, count):
+        now = timezone.now()
+        return [
+            ParticipantLog.objects.create(
+                name="audio/video",
+                message="Media",
+                url=f"media/{idx}.webm",
+                participant_event=self.participant_event,
+                timestamp=now,
+            )
+            for idx in range(count)
+        ]
+
+    def _merged_output(self, content):
+        """Simula la concatenacion por copia escribiendo `content` en un archivo."""
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir, ignore_errors=True)
+
+        def append(video_files):
+            path = os.path.join(output_dir, "merged.webm")
+            with open(path, "wb") as handle:
+                handle.write(content)
+            return path
+
+        return append
+
+    def test_append_to_rolling_merge_creates_and_advances_checkpoint(self):
+        logs = self._media_logs(2)
+        service = VideoMergerService()
+
+        with mock.patch.object(
+            service,
+            "_fetch_videos",
+            side_effect=lambda pending: [{"file": log.url} for log in pending],
+        ), mock.patch.object(
+            service, "_append_by_copy", side_effect=self._merged_output(b"first")
+        ), mock.patch.object(
+            service,
+            "_upload_merged_video_to_s3",
+            return_value={"success": True, "s3_key": "rolling-1.webm"},
+        ):
+            result = service.append_to_rolling_merge(self.participant_event.id)
+
+        self.assertTrue(result["success"])
+        rolling = UnionProgresiva.objects.get(participant_event=self.participant_event)
+        self.assertEqual(rolling.video_key, "rolling-1.webm")
+        self.assertEqual(rolling.ultimo_log_id, logs[1].id)
+        self.assertEqual(rolling.fragmentos, 2)
+
+        new_log = ParticipantLog.objects.create(
+            name="audio/video",
+            message="Media",
+            url="media/2.webm",
+            participant_event=self.participant_event,
+            timestamp=logs[1].timestamp,
+        )
+        checkpoints = []
+
+        def append(video_files):
+            with open(video_files[0]["file"], "rb") as handle:
+                checkpoints.append(handle.read())
+            return merged(video_files)
+
+        merged = self._merged_output(b"second")
+        with mock.patch.object(
+            service,
+            "_fetch_videos",
+            side_effect=lambda pending: [{"file": log.url} for log in pending],
+        ), mock.patch.object(
+            service, "_download_video_from_s3"
+        ) as download_mock, mock.patch.object(
+            service, "_append_by_copy", side_effect=append
+        ) as append_mock, mock.patch.object(
+            service,
+            "_upload_merged_video_to_s3",
+            return_value={"success": True, "s3_key": "rolling-2.webm"},
+        ), mock.patch(
+            "behavior_analysis.video_merger.s3_service.delete_media_fragment"
+        ) as delete_mock:
+            result = service.append_to_rolling_merge(self.participant_event.id)
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["appended_count"], 1)
+        self.assertEqual(append_mock.call_args.args[0][1]["file"], new_log.url)
+        # El checkpoint sale de la copia local del paso anterior, sin descargarlo
+        download_mock.assert_not_called()
+        self.assertEqual(checkpoints, [b"first"])
+        self.assertEqual(
+            os.listdir(os.path.join(self.rolling_dir, str(self.participant_event.id))),
+            [os.path.basename(
+                service._local_checkpoint_path(self.participant_event.id, "rolling-2.webm")
+            )],
+        )
+        delete_mock.assert_called_once_with("rolling-1.webm")
+        rolling.refresh_from_db()
+        self.assertEqual(rolling.ultimo_log_id, new_log.id)
+
+    def test_append_to_rolling_merge_waits_for_second_fragment(self):
+        self._media_logs(1)
+        service = VideoMergerService()
+        with mock.patch.object(service, "_append_by_copy") as append_mock:
+            result = service.append_to_rolling_merge(self.participant_event.id)
+
+        self.assertTrue(result["skipped"])
+        append_mock.assert_not_called()
+
+    def test_append_to_rolling_merge_skips_when_reencode_required(self):
+        self._media_logs(2)
+        service = VideoMergerService()
+        with mock.patch.object(
+            service,
+            "_fetch_videos",
+            side_effect=lambda pending: [{"file": log.url} for log in pending],
+        ), mock.patch.object(
+            service, "_append_by_copy", return_value=None
+        ), mock.patch.object(
+            service, "_upload_merged_video_to_s3"
+        ) as upload_mock:
+            result = service.append_to_rolling_merge(self.participant_event.id)
+
+        self.assertEqual(result["skip_reason"], "reencode_required")
+        upload_mock.assert_not_called()
+        self.assertEqual(
+            UnionProgresiva.objects.get(participant_event=self.participant_event).video_key,
+            "",
+        )
+
+    def test_append_to_rolling_merge_requires_stream_copy(self):
+        self._media_logs(2)
+        service = VideoMergerService()
+        with mock.patch.dict(
+            "os.environ", {"FFMPEG_STREAM_COPY": "false"}
+        ), mock.patch.object(service, "_fetch_videos") as fetch_mock:
+            result = service.append_to_rolling_merge(self.participant_event.id)
+
+        self.assertEqual(result["skip_reason"], "stream_copy_disabled")
+        fetch_mock.assert_not_called()
+
+    def test_append_by_copy_never_normalizes_the_checkpoint(self):
+        service = VideoMergerService()
+        h264 = {"video": {"codec_name": "h264", "width": 640, "height": 480}}
+        vp8 = {"video": {"codec_name": "vp8", "width": 640, "height": 480}}
+        with mock.patch.object(service, "_concat_copy") as concat_mock:
+            skipped = service._append_by_copy(
+                [{"file": "checkpoint.mp4", "probe": h264}, {"file": "b.webm", "probe": vp8}]
+            )
+            service._append_by_copy(
+                [{"file": "checkpoint.mp4", "probe": h264}, {"file": "b.mp4", "probe": h264}]
+            )
+
+        self.assertIsNone(skipped)
+        concat_mock.assert_called_once_with(
+            ["checkpoint.mp4", "b.mp4"], ".mp4", analysis_proxy=False
+        )
+
+    def test_append_to_rolling_merge_keeps_checkpoint_referenced_by_analysis(self):
+        logs = self._media_logs(2)
+        UnionProgresiva.objects.create(
+            participant_event=self.participant_event,
+            video_key="rolling-1.webm",
+            ultimo_log=logs[1],
+            fragmentos=2,
+        )
+        AnalisisComportamiento.objects.create(
+            participant_event=self.participant_event, video_link="rolling-1.webm"
+        )
+        ParticipantLog.objects.create(
+            name="audio/video",
+            message="Media",
+            url="media/2.webm",
+            participant_event=self.participant_event,
+            timestamp=logs[1].timestamp,
+        )
+        service = VideoMergerService()
+        with mock.patch.object(
+            service,
+            "_fetch_videos",
+            side_effect=lambda pending: [{"file": log.url} for log in pending],
+        ), mock.patch.object(
+            service, "_download_video_from_s3", return_value="checkpoint.webm"
+        ), mock.patch.object(
+            service, "_append_by_copy", return_value="merged.webm"
+        ), mock.patch.object(
+            service,
+            "_upload_merged_video_to_s3",
+            return_value={"success": True, "s3_key": "rolling-2.webm"},
+        ), mock.patch(
+            "behavior_analysis.video_merger.s3_service.delete_media_fragment"
+        ) as delete_mock:
+            result = service.append_to_rolling_merge(self.participant_event.id)
+
+        self.assertTrue(result["success"])
+        delete_mock.assert_not_called()
+
+    def test_merge_participant_videos_uses_rolling_checkpoint(self):
+        logs = self._media_logs(4)
+        UnionProgresiva.objects.create(
+            participant_event=self.participant_event,
+            video_key="rolling.webm",
+            ultimo_log=logs[2],
+            fragmentos=3,
+        )
+        service = VideoMergerService()
+
+        with mock.patch.object(
+            service,
+            "_fetch_videos",
+            side_effect=lambda pending: [{"file": log.url} for log in pending],
+        ) as fetch_mock, mock.patch.object(
+            service, "_download_video_from_s3", return_value="checkpoint.webm"
+        ), mock.patch.object(
+            service, "_merge_videos_with_ffmpeg", return_value="final.webm"
+        ) as merge_mock, mock.patch.object(
+            service,
+            "_upload_merged_video_to_s3",
+            return_value={"success": True, "s3_key": "final.webm"},
+        ), mock.patch(
+            "behavior_analysis.video_merger.s3_service.delete_media_fragment"
+        ):
+            result = service.merge_participant_videos(self.participant_event.id)
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["merged_count"], 4)
+        self.assertEqual(fetch_mock.call_args.args[0], [logs[3]])
+        self.assertEqual(
+            [f["file"] for f in merge_mock.call_args.args[0]],
+            ["checkpoint.webm", logs[3].url],
+        )
+
+    def test_merge_participant_videos_rolling_checkpoint_current(self):
+        logs = self._media_logs(2)
+        UnionProgresiva.objects.create(
+            participant_event=self.participant_event,
+            video_key="rolling.webm",
+            ultimo_log=logs[1],
+            fragmentos=2,
+        )
+        service = VideoMergerService()
+        with mock.patch.object(service, "_merge_videos_with_ffmpeg") as merge_mock:
+            result = service.merge_participant_videos(self.participant_event.id)
+
+        merge_mock.assert_not_called()
+        self.assertEqual(result["s3_key"], "rolling.webm")
+        self.assertEqual(result["skip_reason"], "rolling_merge_current")
@@ -57,14 +57,6 @@ class BehaviorAnalysisViewsTests(TestCase):
         )
         self.token = generate_token(self.user)
 
-    def test_extract_s3_key(self):
-        url = (
-            "https://bucket.s3.us-east-1.amazonaws.com/media/file.webm?sig=123"
-        )
-        self.assertEqual(views._extract_s3_key(url), "media/file.webm")
-        self.assertEqual(views._extract_s3_key("media/file.webm"), "media/file.webm")
-        self.assertIsNone(views._extract_s3_key(None))
-
     def test_process_event_completion_skips_participants_without_videos(self):
         request = self.factory.post(
             "/analysis/process-event-completion/",
@@ -94,16 +86,21 @@ class BehaviorAnalysisViewsTests(TestCase):
         )
 
         with mock.patch(
-            "behavior_analysis.tasks.process_participant_completion_task.delay",
-            return_value=mock.Mock(id="task-1"),
-        ) as delay_mock:
+            "behavior_analysis.tasks.start_event_completion",
+            return_value={
+                "event_task_id": "event-1",
+                "task_ids": {self.participant_event.id: "task-1"},
+                "duplicate": False,
+            },
+        ) as start_mock:
             response = views.process_event_completion(request)
 
         self.assertEqual(response.status_code, 202)
         payload = json.loads(response.content.decode("utf-8"))
         self.assertEqual(payload["total_participants"], 1)
         self.assertEqual(payload["task_ids"], ["task-1"])
-        delay_mock.assert_called_once()
+        self.assertEqual(payload["event_task_id"], "event-1")
+        start_mock.assert_called_once()
 
     def test_register_analysis_success(self):
         request = self.factory.post(
@@ -143,7 +140,7 @@ class BehaviorAnalysisViewsTests(TestCase):
         )
 
         with mock.patch(
-            "behavior_analysis.views.analyze_behavior_task.delay",
+            "behavior_analysis.views.analyze_behavior_task.apply_async",
             return_value=mock.Mock(id="task-2"),
         ):
             response = views.trigger_analysis(request)
@@ -257,3 +254,6 @@ class BehaviorAnalysisViewsTests(TestCase):
             )
 
         self.assertEqual(response.status_code, 200)
+        payload = json.loads(response.content.decode("utf-8"))
+        self.assertEqual(payload["analysis"]["nivel"], "completo")
+        self.assertFalse(payload["analysis"]["es_preliminar"])
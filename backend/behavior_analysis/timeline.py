@@ -0,0 +1,172 @@
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+
+from events.models import ParticipantLog
+from .fragments import FRAGMENTO_SEGUNDOS_DEFAULT
+from .intervalos import ConjuntoIntervalos
+from .models import AnalisisFragmento
+from .registros import todas_las_filas
+from .resumen import obtener_resumen
+
+logger = logging.getLogger(__name__)
+
+# Tipo de registro -> columna de etiqueta
+FUENTES = {
+    "rostros": "persona_id",
+    "gestos": "tipo_gesto",
+    "iluminacion": None,
+    "voz": "tipo_log",
+    "lipsync": "tipo_anomalia",
+    "ausencias": None,
+}
+TIPOS = list(FUENTES)
+
+# El indice no cambia hasta que se vuelven a guardar resultados
+INDICE_CACHE_SEGUNDOS = 3600
+
+
+class IndiceIntervalos:
+    """
+    Indice de intervalos cerrados [inicio, fin] ordenados por inicio, con el
+    maximo acumulado de los fines. Como ese maximo es monotono, los
+    candidatos a solaparse con [t0, t1) son un rango contiguo que se ubica
+    con dos busquedas binarias; luego se filtra ese rango con una mascara.
+    """
+
+    def __init__(self, inicios, fines, tipos, etiquetas, ids):
+        orden = np.lexsort((np.asarray(ids), np.asarray(inicios, dtype=float)))
+        self.inicios = np.asarray(inicios, dtype=float)[orden]
+        self.fines = np.asarray(fines, dtype=float)[orden]
+        self.tipos = np.asarray(tipos, dtype=np.int8)[orden]
+        self.etiquetas = np.asarray(etiquetas, dtype=object)[orden]
+        self.ids = np.asarray(ids, dtype=np.int64)[orden]
+        self.max_fin = np.maximum.accumulate(self.fines) if len(self.fines) else self.fines
+
+    def __len__(self):
+        return len(self.inicios)
+
+    def solapados(self, t0, t1):
+        """Posiciones de los intervalos que se solapan con [t0, t1)."""
+        hasta = np.searchsorted(self.inicios, t1, side="left")
+        desde = np.searchsorted(self.max_fin[:hasta], t0, side="left")
+        posiciones = np.arange(desde, hasta)
+        return posiciones[self.fines[desde:hasta] >= t0]
+
+    def intervalos(self, tipo, etiqueta=None):
+        """(inicios, fines) de un tipo, opcionalmente de una sola etiqueta."""
+        mascara = self.tipos == TIPOS.index(tipo)
+        if etiqueta is not None:
+            mascara &= self.etiquetas == etiqueta
+        return self.inicios[mascara], self.fines[mascara]
+
+    def eventos(self, t0, t1):
+        return [
+            {
+                "tipo": TIPOS[self.tipos[i]],
+                "id": int(self.ids[i]),
+                "etiqueta": self.etiquetas[i],
+                "tiempo_inicio": float(self.inicios[i]),
+                "tiempo_fin": float(self.fines[i]),
+            }
+            for i in self.solapados(t0, t1)
+        ]
+
+
+def coocurrencia(a, b):
+    """
+    Tramos en que dos conjuntos de intervalos (inicios, fines) estan activos
+    a la vez, con un barrido sobre ambos.
+    """
+    return ConjuntoIntervalos(*a).interseccion(ConjuntoIntervalos(*b)).a_tuplas()
+
+
+def _construir_indice(analysis):
+    inicios, fines, tipos, etiquetas, ids = [], [], [], [], []
+    registros = todas_las_filas(analysis)
+    for posicion, (tipo, columna) in enumerate(FUENTES.items()):
+        for fila in registros[tipo]:
+            ids.append(fila["id"])
+            inicios.append(fila["tiempo_inicio"])
+            fines.append(fila["tiempo_fin"])
+            tipos.append(posicion)
+            etiquetas.append(str(fila[columna]) if columna else "")
+    return IndiceIntervalos(inicios, fines, tipos, etiquetas, ids)
+
+
+def indice_de_analisis(analysis):
+    """
+    Indice de todos los registros del analisis. Se construye una vez por
+    ejecucion (la marca del resumen cambia al guardar resultados) y se cachea.
+    """
+    marca = obtener_resumen(analysis).fecha_actualizacion.timestamp()
+    cache_key = f"indice_intervalos:{analysis.id}:{marca}"
+    indice = cache.get(cache_key)
+    if indice is None:
+        indice = _construir_indice(analysis)
+        cache.set(cache_key, indice, INDICE_CACHE_SEGUNDOS)
+    return indice
+
+
+def _tramos_de_video(participant_event):
+    """
+    [(inicio_reloj, offset_video, duracion)] de cada fragmento de audio/video.
+    El log se registra al subir el fragmento, asi que el fragmento empezo
+    `duracion` segundos antes de su timestamp.
+    """
+    logs = list(
+        ParticipantLog.objects.filter(
+            participant_event=participant_event, name="audio/video", url__isnull=False
+        )
+        .order_by("timestamp", "id")
+        .values_list("id", "timestamp")
+    )
+    duraciones = dict(
+        AnalisisFragmento.objects.filter(
+            participant_event=participant_event, duracion__isnull=False
+        ).values_list("participant_log_id", "duracion")
+    )
+    tramos = []
+    offset = 0.0
+    for log_id, timestamp in logs:
+        duracion = duraciones.get(log_id) or FRAGMENTO_SEGUNDOS_DEFAULT
+        tramos.append((timestamp - timedelta(seconds=duracion), offset, duracion))
+        offset += duracion
+    return tramos
+
+
+def screenshots_cercanos(participant_event, t0, t1, margen=10.0):
+    """
+    Screenshots tomados mientras se grababa [t0 - margen, t1 + margen) del
+    video, con su tiempo en el video (`tiempo_video`).
+    """
+    tramos = _tramos_de_video(participant_event)
+    if not tramos:
+        return []
+
+    desde, hasta = t0 - margen, t1 + margen
+    rangos = []
+    for inicio_reloj, offset, duracion in tramos:
+        a, b = max(desde, offset), min(hasta, offset + duracion)
+        if a < b:
+            rangos.append((inicio_reloj, offset, a, b))
+    if not rangos:
+        return []
+
+    screenshots = ParticipantLog.objects.filter(
+        participant_event=participant_event,
+        name="screen",
+        timestamp__gte=rangos[0][0] + timedelta(seconds=rangos[0][2] - rangos[0][1]),
+        timestamp__lt=rangos[-1][0] + timedelta(seconds=rangos[-1][3] - rangos[-1][1]),
+    ).order_by("timestamp", "id")
+
+    cercanos = []
+    for log in screenshots.values("id", "timestamp", "url", "message"):
+        for inicio_reloj, offset, a, b in rangos:
+            tiempo = offset + (log["timestamp"] - inicio_reloj).total_seconds()
+            if a <= tiempo < b:
+                cercanos.append(dict(log, tiempo_video=round(tiempo, 3)))
+                break
+    return cercanos
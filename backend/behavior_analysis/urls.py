@@ -16,4 +16,19 @@ urlpatterns = [
         views.analysis_report,
         name="analysis_report",
     ),
+    path(
+        "report/<int:event_id>/participants/<int:participant_id>/timeline/",
+        views.analysis_timeline,
+        name="analysis_timeline",
+    ),
+    path(
+        "report/<int:event_id>/participants/<int:participant_id>/cooccurrence/",
+        views.analysis_cooccurrence,
+        name="analysis_cooccurrence",
+    ),
+    path(
+        "report/<int:event_id>/participants/<int:participant_id>/<str:tipo>/",
+        views.analysis_report_page,
+        name="analysis_report_page",
+    ),
 ]
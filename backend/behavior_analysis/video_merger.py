@@ -1,14 +1,45 @@
+import hashlib
 import os
+import shutil
 import tempfile
 import subprocess
 import logging
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from django.db.models import Q
 from events.s3_service import s3_service
+from events.storage import extract_s3_key
 from events.models import ParticipantLog
+from .models import AnalisisComportamiento, UnionProgresiva
+from .probe import probar_video
 
 logger = logging.getLogger(__name__)
 
+# Encoders para normalizar un fragmento al codec de referencia
+VIDEO_ENCODERS = {
+    "h264": ["libx264", "-preset", "veryfast", "-crf", "23"],
+    "vp8": ["libvpx", "-deadline", "realtime", "-cpu-used", "8", "-b:v", "1M"],
+    "vp9": ["libvpx-vp9", "-deadline", "realtime", "-cpu-used", "8", "-b:v", "1M"],
+}
+AUDIO_ENCODERS = {
+    "opus": "libopus",
+    "vorbis": "libvorbis",
+    "aac": "aac",
+}
+
+# Contenedor del video unido por copia segun el codec de video
+COPY_CONTAINERS = {"h264": ".mp4", "vp8": ".webm", "vp9": ".webm", "av1": ".webm"}
+
+# media_type de S3 segun la extension del video unido
+MERGED_MEDIA_TYPES = {
+    ".mp4": "merged_video",
+    ".webm": "merged_video_webm",
+    ".mkv": "merged_video_mkv",
+}
+
 
 class VideoMergerService:
     """Servicio para unir videos de un participante en orden cronologico"""
@@ -28,11 +59,7 @@ class VideoMergerService:
             logger.info(f"Using temp dir for merge: {self.temp_dir}")
 
             # Obtener todos los logs de video del participante ordenados por tiempo
-            video_logs = ParticipantLog.objects.filter(
-                participant_event_id=participant_event_id,
-                name="audio/video",
-                url__isnull=False,
-            ).order_by("timestamp")
+            video_logs = self._video_logs(participant_event_id)
 
             if not video_logs.exists():
                 return {
@@ -49,7 +76,7 @@ class VideoMergerService:
 
             if video_log_count == 1:
                 single_log = video_logs.first()
-                video_key = self._extract_s3_key(single_log.url)
+                video_key = extract_s3_key(single_log.url)
                 if not video_key:
                     return {
                         "success": False,
@@ -66,12 +93,44 @@ class VideoMergerService:
                     "skip_reason": "single_video",
                 }
 
-            # Descargar videos de S3 a archivos temporales
-            video_files = []
-            for log in video_logs:
-                temp_file = self._download_video_from_s3(log.url)
-                if temp_file:
-                    video_files.append({"file": temp_file, "timestamp": log.timestamp})
+            # Si hubo union progresiva durante el evento, partir del checkpoint
+            # y agregar solo los fragmentos posteriores
+            all_logs = list(video_logs)
+            pending_logs = all_logs
+            rolling = UnionProgresiva.objects.filter(
+                participant_event_id=participant_event_id
+            ).exclude(video_key="").first()
+            if rolling:
+                pending_logs = self._logs_after(all_logs, rolling.ultimo_log_id)
+                if pending_logs is None:
+                    rolling = None
+                    pending_logs = all_logs
+                elif not pending_logs:
+                    logger.info("Rolling merge already contains every fragment")
+                    return {
+                        "success": True,
+                        "video_url": self._build_video_url(rolling.video_key, None),
+                        "video_key": rolling.video_key,
+                        "s3_key": rolling.video_key,
+                        "merged_count": video_log_count,
+                        "merge_skipped": True,
+                        "skip_reason": "rolling_merge_current",
+                    }
+
+            # Descargar videos de S3 (en paralelo, conservando el orden cronologico)
+            video_files = self._fetch_videos(pending_logs)
+
+            if rolling:
+                checkpoint = self._fetch_checkpoint(participant_event_id, rolling.video_key)
+                if checkpoint and len(video_files) == len(pending_logs):
+                    video_files.insert(0, {"file": checkpoint, "timestamp": None})
+                else:
+                    logger.warning("Rolling merge checkpoint unusable, merging every fragment")
+                    self._remove_files(
+                        [video_info["file"] for video_info in video_files] + [checkpoint]
+                    )
+                    rolling = None
+                    video_files = self._fetch_videos(all_logs)
 
             if not video_files:
                 return {
@@ -84,7 +143,7 @@ class VideoMergerService:
             if not merged_video_path:
                 return {"success": False, "error": "Failed to merge videos"}
 
-            # Merge re-encodes to MP4 with fresh timestamps; skip extra sanitize pass
+            # Merge output (re-encode or stream copy) already has regenerated timestamps; skip extra sanitize pass
             sanitized_video_path = None
             upload_source = merged_video_path
 
@@ -93,22 +152,44 @@ class VideoMergerService:
                 upload_source, participant_event_id
             )
 
+            # Subir la copia para analisis, si ffmpeg la genero
+            analysis_key = None
+            proxy_path = self._analysis_proxy_path(merged_video_path)
+            if upload_result["success"] and os.path.exists(proxy_path) and os.path.getsize(proxy_path) > 0:
+                proxy_result = self._upload_merged_video_to_s3(
+                    proxy_path, participant_event_id, media_type="analysis_proxy"
+                )
+                if proxy_result["success"]:
+                    analysis_key = proxy_result.get("s3_key")
+                else:
+                    logger.warning(
+                        f"Could not upload analysis proxy: {proxy_result.get('error')}"
+                    )
+
             # Limpiar archivos temporales
-            cleanup_list = video_files + [{"file": merged_video_path}]
+            cleanup_list = video_files + [{"file": merged_video_path}, {"file": proxy_path}]
             if sanitized_video_path:
                 cleanup_list.append({"file": sanitized_video_path})
             self._cleanup_temp_files(cleanup_list)
 
             if upload_result["success"]:
+                merged_key = upload_result.get("s3_key") or upload_result.get("key")
+                if rolling:
+                    # El video final pasa a ser el checkpoint
+                    self._advance_rolling_merge(
+                        rolling, merged_key, pending_logs[-1], video_log_count, final=True
+                    )
+                shutil.rmtree(
+                    self._local_checkpoint_dir(participant_event_id), ignore_errors=True
+                )
                 return {
                     "success": True,
                     "video_url": upload_result.get("presigned_url")
                     or upload_result.get("video_url"),
-                    "video_key": upload_result.get("s3_key")
-                    or upload_result.get("key"),
-                    "s3_key": upload_result.get("s3_key")
-                    or upload_result.get("key"),
-                    "merged_count": len(video_files),
+                    "video_key": merged_key,
+                    "s3_key": merged_key,
+                    "analysis_key": analysis_key,
+                    "merged_count": video_log_count if rolling else len(video_files),
                 }
 
             return {
@@ -129,16 +210,245 @@ class VideoMergerService:
                 except Exception as e:
                     logger.debug(f"Temp dir not empty or already removed: {e}")
 
+    def append_to_rolling_merge(self, participant_event_id: int) -> Dict[str, Any]:
+        """
+        Agrega los fragmentos nuevos del participante al video intermedio
+        (checkpoint en S3) durante el evento. Solo avanza por copia: si hay
+        que re-codificar, el paso se omite y la union final hace el trabajo.
+        """
+        if not self._stream_copy_enabled():
+            return {"success": True, "skipped": True, "skip_reason": "stream_copy_disabled"}
+        try:
+            self.temp_dir = tempfile.mkdtemp()
+            rolling, _ = UnionProgresiva.objects.get_or_create(
+                participant_event_id=participant_event_id
+            )
+            all_logs = list(self._video_logs(participant_event_id))
+            pending_logs = self._logs_after(all_logs, rolling.ultimo_log_id)
+            if pending_logs is None:
+                # El ultimo fragmento del checkpoint ya no existe: reiniciar
+                pending_logs = all_logs
+                rolling.video_key = ""
+            if not pending_logs or (not rolling.video_key and len(pending_logs) < 2):
+                return {"success": True, "skipped": True, "skip_reason": "nothing_to_append"}
+
+            video_files = self._fetch_videos(pending_logs)
+            if len(video_files) != len(pending_logs):
+                return {"success": False, "error": "Could not download every new fragment"}
+            if rolling.video_key:
+                checkpoint = self._fetch_checkpoint(participant_event_id, rolling.video_key)
+                if not checkpoint:
+                    self._remove_files([video_info["file"] for video_info in video_files])
+                    return {"success": False, "error": "Could not download rolling checkpoint"}
+                video_files.insert(0, {"file": checkpoint, "timestamp": None})
+
+            merged_video_path = self._append_by_copy(video_files)
+            self._remove_files([video_info["file"] for video_info in video_files])
+            if not merged_video_path:
+                return {"success": True, "skipped": True, "skip_reason": "reencode_required"}
+
+            upload_result = self._upload_merged_video_to_s3(
+                merged_video_path, participant_event_id
+            )
+            if not upload_result["success"]:
+                self._remove_files([merged_video_path])
+                return {"success": False, "error": upload_result.get("error")}
+
+            merged_key = upload_result.get("s3_key")
+            last_log = pending_logs[-1]
+            if not self._advance_rolling_merge(
+                rolling, merged_key, last_log, all_logs.index(last_log) + 1
+            ):
+                self._remove_files([merged_video_path])
+                return {"success": False, "error": "Rolling merge advanced concurrently"}
+            # El siguiente paso parte de esta copia local en vez de descargarla
+            self._keep_local_checkpoint(participant_event_id, merged_key, merged_video_path)
+            return {
+                "success": True,
+                "video_key": merged_key,
+                "appended_count": len(pending_logs),
+            }
+        except Exception as e:
+            logger.error(
+                f"Error in rolling merge for participant_event {participant_event_id}: {str(e)}"
+            )
+            return {"success": False, "error": str(e)}
+        finally:
+            if self.temp_dir and os.path.isdir(self.temp_dir):
+                try:
+                    os.rmdir(self.temp_dir)
+                except Exception as e:
+                    logger.debug(f"Temp dir not empty or already removed: {e}")
+
+    def _advance_rolling_merge(
+        self,
+        rolling: UnionProgresiva,
+        video_key: str,
+        last_log: ParticipantLog,
+        count: int,
+        final: bool = False,
+    ) -> bool:
+        """
+        Apunta el checkpoint al nuevo video solo si nadie lo avanzo mientras
+        tanto; elimina de S3 el video que queda sin referencia. Con `final` el
+        nuevo video es el resultado de la union y nunca se elimina.
+        """
+        previous_key = UnionProgresiva.objects.filter(pk=rolling.pk).values_list(
+            "video_key", flat=True
+        ).first()
+        updated = UnionProgresiva.objects.filter(
+            pk=rolling.pk, ultimo_log_id=rolling.ultimo_log_id
+        ).update(video_key=video_key, ultimo_log=last_log, fragmentos=count)
+        if updated and previous_key and previous_key != video_key:
+            self._delete_if_unreferenced(previous_key)
+        elif not updated and video_key and not final:
+            self._delete_if_unreferenced(video_key)
+        return bool(updated)
+
+    def _append_by_copy(self, video_files: List[Dict]) -> Optional[str]:
+        """
+        Concatena por copia solo si todas las entradas comparten parametros.
+        Normalizar el checkpoint re-codificaria todo el prefijo en cada paso,
+        asi que en ese caso retorna None.
+        """
+        infos = [
+            video_info["probe"] if "probe" in video_info else probar_video(video_info["file"])
+            for video_info in video_files
+        ]
+        signatures = {self._stream_signature(info) for info in infos}
+        if len(signatures) != 1 or None in signatures:
+            logger.info("Rolling merge step skipped: fragments need re-encoding")
+            return None
+        extension = COPY_CONTAINERS.get(infos[0]["video"].get("codec_name"), ".mkv")
+        return self._concat_copy(
+            [video_info["file"] for video_info in video_files],
+            extension,
+            analysis_proxy=False,
+        )
+
+    def _local_checkpoint_dir(self, participant_event_id: int) -> str:
+        root = os.getenv("MERGE_ROLLING_DIR", "").strip() or os.path.join(
+            tempfile.gettempdir(), "rolling-merge"
+        )
+        return os.path.join(root, str(participant_event_id))
+
+    def _local_checkpoint_path(self, participant_event_id: int, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(
+            self._local_checkpoint_dir(participant_event_id),
+            f"{digest}{os.path.splitext(key)[1]}",
+        )
+
+    def _fetch_checkpoint(self, participant_event_id: int, key: str) -> Optional[str]:
+        """
+        Checkpoint en el temp dir de la llamada: la copia que este worker
+        dejo en el paso anterior si la tiene, o la descarga de S3.
+        """
+        local_path = self._local_checkpoint_path(participant_event_id, key)
+        temp_file = os.path.join(
+            self.temp_dir, f"checkpoint_{uuid.uuid4().hex[:8]}{os.path.splitext(key)[1]}"
+        )
+        if os.path.exists(local_path):
+            try:
+                try:
+                    os.link(local_path, temp_file)
+                except OSError:
+                    shutil.copyfile(local_path, temp_file)
+                logger.info(f"Using local rolling checkpoint for {key}")
+                return temp_file
+            except OSError as e:
+                logger.info(f"Local rolling checkpoint unavailable: {e}")
+        return self._download_video_from_s3(key)
+
+    def _keep_local_checkpoint(self, participant_event_id: int, key: str, path: str) -> None:
+        """Conserva el checkpoint recien subido en el worker, reemplazando al anterior."""
+        directory = self._local_checkpoint_dir(participant_event_id)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            shutil.move(path, self._local_checkpoint_path(participant_event_id, key))
+        except OSError as e:
+            logger.warning(f"Could not keep local rolling checkpoint: {e}")
+            self._remove_files([path])
+
+    def _delete_if_unreferenced(self, key: str) -> None:
+        """
+        Elimina un checkpoint salvo que un analisis lo use como video unido
+        (la union final reutiliza el checkpoint cuando ya esta al dia).
+        """
+        if AnalisisComportamiento.objects.filter(
+            Q(video_link=key) | Q(video_analisis_link=key)
+        ).exists():
+            logger.info(f"Keeping rolling checkpoint {key}: referenced by an analysis")
+            return
+        s3_service.delete_media_fragment(key)
+
+    def _video_logs(self, participant_event_id: int):
+        return ParticipantLog.objects.filter(
+            participant_event_id=participant_event_id,
+            name="audio/video",
+            url__isnull=False,
+        ).order_by("timestamp", "id")
+
+    def _logs_after(self, logs: List[ParticipantLog], last_log_id: Optional[int]):
+        """Logs posteriores a `last_log_id` (None si ese log ya no esta)."""
+        if last_log_id is None:
+            return logs
+        ids = [log.id for log in logs]
+        if last_log_id not in ids:
+            return None
+        return logs[ids.index(last_log_id) + 1:]
+
+    def _fetch_videos(self, video_logs: List[ParticipantLog]) -> List[Dict]:
+        """
+        Obtiene las entradas para ffmpeg en orden cronologico: URLs prefirmadas
+        si MERGE_STREAM_INPUTS esta activo, o descargas concurrentes con un
+        pool acotado. Cada fragmento se analiza con ffprobe apenas termina su
+        descarga, mientras continuan las demas.
+        """
+        if self._stream_inputs_enabled():
+            remote_files = []
+            for log in video_logs:
+                key = extract_s3_key(log.url)
+                url = s3_service.generate_presigned_url(key, expiration=14400) if key else None
+                if url:
+                    remote_files.append({"file": url, "timestamp": log.timestamp})
+            if len(remote_files) == len(video_logs):
+                return remote_files
+            logger.warning("Could not presign every fragment, downloading instead")
+
+        probe = self._stream_copy_enabled()
+        workers = max(1, int(os.getenv("MERGE_DOWNLOAD_WORKERS", "4")))
+
+        def fetch(log):
+            temp_file = self._download_video_from_s3(log.url)
+            if not temp_file:
+                return None
+            video_info = {"file": temp_file, "timestamp": log.timestamp}
+            if probe:
+                video_info["probe"] = probar_video(temp_file)
+            return video_info
+
+        results = [None] * len(video_logs)
+        with ThreadPoolExecutor(max_workers=min(workers, len(video_logs))) as executor:
+            futures = {
+                executor.submit(fetch, log): idx for idx, log in enumerate(video_logs)
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        return [video_info for video_info in results if video_info]
+
     def _download_video_from_s3(self, s3_url: str) -> str:
         """Descarga un video de S3 a un archivo temporal con timeout"""
         try:
             # Extraer la key del S3 desde la URL
-            key = self._extract_s3_key(s3_url)
+            key = extract_s3_key(s3_url)
 
             # Crear archivo temporal
             temp_file = os.path.join(
                 self.temp_dir,
-                f"video_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.webm",
+                f"video_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}.webm",
             )
 
             # Descargar desde S3 con timeout
@@ -164,13 +474,6 @@ class VideoMergerService:
             logger.error(f"Error downloading video from S3: {str(e)}")
             return None
 
-    def _extract_s3_key(self, s3_url: str) -> str:
-        if not s3_url:
-            return None
-        if "amazonaws.com" in s3_url:
-            return s3_url.split(".amazonaws.com/")[-1].split("?")[0]
-        return s3_url
-
     def _build_video_url(self, key: str, original_ref: str) -> str:
         if original_ref and isinstance(original_ref, str) and original_ref.startswith("http"):
             return original_ref
@@ -191,8 +494,13 @@ class VideoMergerService:
         except (FileNotFoundError, subprocess.TimeoutExpired):
             return False
 
-    def _merge_videos_with_ffmpeg(self, video_files: List[Dict]) -> str:
-        """Une videos usando FFmpeg con re-encode para normalizar timestamps"""
+    def _merge_videos_with_ffmpeg(
+        self, video_files: List[Dict], analysis_proxy: bool = True
+    ) -> str:
+        """
+        Une videos usando FFmpeg con re-encode para normalizar timestamps.
+        Con `analysis_proxy` (y ANALYSIS_PROXY) genera tambien la copia para analisis.
+        """
         try:
             if not self._check_ffmpeg_available():
                 logger.error(
@@ -209,6 +517,11 @@ class VideoMergerService:
                 logger.info(
                     "One input video, normalizing timestamps and encoding to MP4"
                 )
+            elif self._stream_copy_enabled():
+                copied = self._merge_videos_stream_copy(video_files, analysis_proxy)
+                if copied:
+                    return copied
+                logger.info("Stream copy concat not possible, falling back to re-encode")
 
             ffmpeg_preset = os.getenv("FFMPEG_PRESET", "veryfast")
             ffmpeg_crf = os.getenv("FFMPEG_CRF", "28")
@@ -225,18 +538,30 @@ class VideoMergerService:
                 filter_parts.append(f"[{idx}:a]asetpts=PTS-STARTPTS[a{idx}]")
                 concat_inputs.append(f"[v{idx}][a{idx}]")
 
-            filter_complex = (
-                ";".join(filter_parts)
-                + ";"
-                + "".join(concat_inputs)
-                + f"concat=n={len(video_files)}:v=1:a=1[outv][outa]"
-            )
-
             output_file = os.path.join(
                 self.temp_dir,
                 f"merged_video_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4",
             )
 
+            proxy = analysis_proxy and self._analysis_proxy_enabled()
+            if proxy:
+                # Un solo decode/concat alimenta las dos salidas
+                filter_complex = (
+                    ";".join(filter_parts)
+                    + ";"
+                    + "".join(concat_inputs)
+                    + f"concat=n={len(video_files)}:v=1:a=1[catv][cata]"
+                    + f";[catv]split=2[outv][pv];[pv]{self._analysis_proxy_video_filter()}[proxyv]"
+                    + ";[cata]asplit=2[outa][proxya]"
+                )
+            else:
+                filter_complex = (
+                    ";".join(filter_parts)
+                    + ";"
+                    + "".join(concat_inputs)
+                    + f"concat=n={len(video_files)}:v=1:a=1[outv][outa]"
+                )
+
             cmd = [
                 "ffmpeg",
                 "-err_detect",
@@ -245,9 +570,12 @@ class VideoMergerService:
                 "+genpts",
             ]
             cmd += input_args
+            cmd += ["-filter_complex", filter_complex]
+            if proxy:
+                cmd += ["-map", "[proxyv]", "-map", "[proxya]"]
+                cmd += self._analysis_proxy_output_args()
+                cmd.append(self._analysis_proxy_path(output_file))
             cmd += [
-                "-filter_complex",
-                filter_complex,
                 "-map",
                 "[outv]",
                 "-map",
@@ -319,6 +647,235 @@ class VideoMergerService:
             logger.error(f"Error merging videos with FFmpeg: {str(e)}")
             return None
 
+    def _stream_inputs_enabled(self) -> bool:
+        return os.getenv("MERGE_STREAM_INPUTS", "false").strip().lower() in ("1", "true", "yes")
+
+    def _stream_copy_enabled(self) -> bool:
+        return os.getenv("FFMPEG_STREAM_COPY", "true").strip().lower() in ("1", "true", "yes")
+
+    def _stream_signature(self, info: Optional[Dict[str, Any]]):
+        """Parametros que deben coincidir para concatenar por copia"""
+        if not info or not info.get("video"):
+            return None
+        video = info["video"]
+        audio = info.get("audio") or {}
+        return (
+            video.get("codec_name"),
+            video.get("width"),
+            video.get("height"),
+            video.get("pix_fmt"),
+            video.get("time_base"),
+            audio.get("codec_name"),
+            audio.get("sample_rate"),
+            audio.get("channels"),
+        )
+
+    def _merge_videos_stream_copy(
+        self, video_files: List[Dict], analysis_proxy: bool = True
+    ) -> Optional[str]:
+        """
+        Une los fragmentos con el concat demuxer y -c copy. Los fragmentos cuyos
+        parametros no coinciden con la referencia (los mas frecuentes) se
+        re-codifican solo ellos a esos parametros antes de concatenar.
+        """
+        normalized_files = []
+        try:
+            infos = [
+                video_info["probe"] if "probe" in video_info else probar_video(video_info["file"])
+                for video_info in video_files
+            ]
+            signatures = [self._stream_signature(info) for info in infos]
+            valid = [sig for sig in signatures if sig is not None]
+            if not valid:
+                return None
+
+            reference = Counter(valid).most_common(1)[0][0]
+            reference_info = infos[signatures.index(reference)]
+            mismatched = sum(1 for sig in signatures if sig != reference)
+            logger.info(
+                f"Stream copy concat: {len(video_files) - mismatched}/{len(video_files)} "
+                f"fragments match reference {reference}"
+            )
+
+            inputs = []
+            for video_info, signature in zip(video_files, signatures):
+                if signature == reference:
+                    inputs.append(video_info["file"])
+                    continue
+                normalized = self._normalize_to_reference(
+                    video_info["file"], reference_info
+                )
+                if not normalized:
+                    return None
+                normalized_files.append(normalized)
+                inputs.append(normalized)
+
+            video_codec = reference_info["video"].get("codec_name")
+            extension = COPY_CONTAINERS.get(video_codec, ".mkv")
+            return self._concat_copy(inputs, extension, analysis_proxy)
+        except Exception as e:
+            logger.warning(f"Stream copy concat failed: {str(e)}")
+            return None
+        finally:
+            self._remove_files(normalized_files)
+
+    def _normalize_to_reference(
+        self, input_path: str, reference_info: Dict[str, Any]
+    ) -> Optional[str]:
+        """Re-codifica un fragmento a los parametros de la referencia"""
+        video = reference_info["video"]
+        audio = reference_info.get("audio")
+        video_encoder = VIDEO_ENCODERS.get(video.get("codec_name"))
+        audio_encoder = AUDIO_ENCODERS.get(audio.get("codec_name")) if audio else None
+        if not video_encoder or (audio and not audio_encoder):
+            return None
+
+        extension = COPY_CONTAINERS.get(video.get("codec_name"), ".mkv")
+        output_file = os.path.join(
+            self.temp_dir,
+            f"normalized_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{extension}",
+        )
+        cmd = [
+            "ffmpeg",
+            "-err_detect",
+            "ignore_err",
+            "-i",
+            input_path,
+            "-map",
+            "0:v:0",
+            "-vf",
+            f"scale={video.get('width')}:{video.get('height')}",
+            "-pix_fmt",
+            video.get("pix_fmt") or "yuv420p",
+            "-c:v",
+        ] + video_encoder
+        if audio:
+            cmd += [
+                "-map",
+                "0:a:0?",
+                "-c:a",
+                audio_encoder,
+                "-ar",
+                str(audio.get("sample_rate")),
+                "-ac",
+                str(audio.get("channels")),
+            ]
+        ffmpeg_threads = os.getenv("FFMPEG_THREADS", "").strip()
+        if ffmpeg_threads:
+            cmd += ["-threads", ffmpeg_threads]
+        cmd += ["-y", "-loglevel", "error", output_file]
+
+        logger.info(f"Normalizing incompatible fragment {input_path}")
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=3600)
+        if result.returncode == 0 and os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+            return output_file
+        logger.error(f"Failed to normalize fragment {input_path}: {result.stderr}")
+        return None
+
+    def _concat_copy(
+        self, inputs: List[str], extension: str, analysis_proxy: bool = True
+    ) -> Optional[str]:
+        """Concat demuxer sin re-encode, regenerando timestamps"""
+        list_file = os.path.join(
+            self.temp_dir, f"concat_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.txt"
+        )
+        with open(list_file, "w", encoding="utf-8") as handle:
+            for path in inputs:
+                escaped = path.replace("'", "'\\''")
+                handle.write(f"file '{escaped}'\n")
+
+        output_file = os.path.join(
+            self.temp_dir,
+            f"merged_video_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}",
+        )
+        cmd = ["ffmpeg"]
+        if any(path.startswith("http") for path in inputs):
+            cmd += ["-protocol_whitelist", "file,http,https,tcp,tls,crypto"]
+        cmd += [
+            "-fflags",
+            "+genpts",
+            "-f",
+            "concat",
+            "-safe",
+            "0",
+            "-i",
+            list_file,
+        ]
+        proxy = analysis_proxy and self._analysis_proxy_enabled()
+        if proxy:
+            # La copia reducida se codifica en la misma lectura del concat
+            cmd += [
+                "-map",
+                "0:v:0",
+                "-map",
+                "0:a:0?",
+                "-vf",
+                self._analysis_proxy_video_filter(),
+            ]
+            cmd += self._analysis_proxy_output_args()
+            cmd.append(self._analysis_proxy_path(output_file))
+        cmd += [
+            "-c",
+            "copy",
+            "-avoid_negative_ts",
+            "make_zero",
+        ]
+        if extension == ".mp4":
+            cmd += ["-movflags", "+faststart"]
+        cmd += ["-y", "-loglevel", "error", output_file]
+
+        try:
+            logger.info(f"Starting FFmpeg stream copy concat with {len(inputs)} files")
+            result = subprocess.run(
+                cmd, capture_output=True, text=True, timeout=14400 if proxy else 1800
+            )
+        finally:
+            self._remove_files([list_file])
+
+        if result.returncode == 0 and os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+            logger.info(
+                f"Successfully concatenated {len(inputs)} videos by copy: {output_file} ({os.path.getsize(output_file)} bytes)"
+            )
+            return output_file
+
+        logger.error(f"FFmpeg stream copy failed with return code {result.returncode}: {result.stderr}")
+        self._remove_files([output_file, self._analysis_proxy_path(output_file)])
+        return None
+
+    def _analysis_proxy_enabled(self) -> bool:
+        return os.getenv("ANALYSIS_PROXY", "false").strip().lower() in ("1", "true", "yes")
+
+    def _analysis_proxy_path(self, output_file: str) -> str:
+        return f"{os.path.splitext(output_file)[0]}_analysis.mp4"
+
+    def _analysis_proxy_video_filter(self) -> str:
+        height = os.getenv("ANALYSIS_PROXY_HEIGHT", "360").strip()
+        fps = os.getenv("ANALYSIS_PROXY_FPS", "15").strip()
+        return f"scale=-2:{height},fps={fps}"
+
+    def _analysis_proxy_output_args(self) -> List[str]:
+        """Codecs de la copia para analisis: H.264 liviano y audio mono 16 kHz"""
+        return [
+            "-c:v",
+            "libx264",
+            "-preset",
+            "veryfast",
+            "-crf",
+            "30",
+            "-pix_fmt",
+            "yuv420p",
+            "-c:a",
+            "aac",
+            "-b:a",
+            "48k",
+            "-ac",
+            "1",
+            "-ar",
+            "16000",
+            "-movflags",
+            "+faststart",
+        ]
+
     def _sanitize_video(self, input_path: str) -> str:
         """
         Re-codifica el video unido para descartar paquetes/frames corruptos
@@ -393,34 +950,47 @@ class VideoMergerService:
             return None
 
     def _upload_merged_video_to_s3(
-        self, video_path: str, participant_event_id: int
+        self, video_path: str, participant_event_id: int, media_type: str = None
     ) -> Dict[str, Any]:
-        """Sube el video unido a S3"""
+        """Sube el video unido (o su copia para analisis) a S3 en partes paralelas"""
         try:
-            with open(video_path, "rb") as video_file:
-                upload_result = s3_service.upload_media_fragment(
-                    video_file,
-                    participant_event_id,
-                    media_type="merged_video",
-                    timestamp=datetime.now(),
-                )
+            media_type = media_type or MERGED_MEDIA_TYPES.get(
+                os.path.splitext(video_path)[1].lower(), "merged_video"
+            )
+            progress = {"logged": -1}
 
-                if upload_result["success"]:
-                    return {
-                        "success": True,
-                        "video_url": upload_result.get("presigned_url"),
-                        "presigned_url": upload_result.get("presigned_url"),
-                        "s3_key": upload_result["key"],
-                        "key": upload_result["key"],
-                    }
+            def log_progress(sent, total):
+                percent = int(sent * 100 / total) if total else 100
+                if percent // 25 > progress["logged"]:
+                    progress["logged"] = percent // 25
+                    logger.info(
+                        f"Uploading {media_type} for participant_event {participant_event_id}: {percent}%"
+                    )
+
+            upload_result = s3_service.upload_large_media(
+                video_path,
+                participant_event_id,
+                media_type=media_type,
+                timestamp=datetime.now(),
+                progress_callback=log_progress,
+            )
 
+            if upload_result["success"]:
                 return {
-                    "success": False,
-                    "error": upload_result.get(
-                        "error", "Failed to upload or generate URL"
-                    ),
+                    "success": True,
+                    "video_url": upload_result.get("presigned_url"),
+                    "presigned_url": upload_result.get("presigned_url"),
+                    "s3_key": upload_result["key"],
+                    "key": upload_result["key"],
                 }
 
+            return {
+                "success": False,
+                "error": upload_result.get(
+                    "error", "Failed to upload or generate URL"
+                ),
+            }
+
         except Exception as e:
             logger.error(f"Error uploading merged video to S3: {str(e)}")
             return {"success": False, "error": str(e)}
@@ -440,6 +1010,15 @@ class VideoMergerService:
         except Exception as e:
             logger.warning(f"Could not remove temp directory {self.temp_dir}: {str(e)}")
 
+    def _remove_files(self, paths: List[str]):
+        """Elimina archivos intermedios sin tocar el directorio temporal"""
+        for path in paths:
+            try:
+                if path and os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove temp file {path}: {str(e)}")
+
 
 # Instancia global del servicio
 video_merger_service = VideoMergerService()
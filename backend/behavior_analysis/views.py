@@ -1,28 +1,36 @@
 import json
 import logging
-from django.http import JsonResponse
+import uuid
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST, require_GET
 from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
 from .models import AnalisisComportamiento
-from events.models import ParticipantEvent, Event, ParticipantLog
+from events.models import ParticipantEvent, Event
+from .locks import lock_etapa
+from .registros import REGISTROS
+from .reportes import (
+    PAGINA_DEFAULT,
+    PAGINA_MAXIMA,
+    construir_reporte,
+    etag_reporte,
+    firmar_reporte,
+    pagina_registros,
+    pagina_screenshots,
+    reporte_servido,
+    ventana_firma,
+)
 from .tasks import analyze_behavior_task
+from .timeline import TIPOS, coocurrencia, indice_de_analisis, screenshots_cercanos
 from .video_merger import video_merger_service
 from events.s3_service import s3_service
+from events.storage import extract_s3_key
 from authentication.utils import jwt_required
 
 logger = logging.getLogger(__name__)
 
 
-def _extract_s3_key(video_reference):
-    """Normaliza una referencia de video retornando la key de S3 si viene como URL."""
-    if not video_reference:
-        return None
-    if "amazonaws.com" in video_reference:
-        return video_reference.split(".amazonaws.com/")[-1].split("?")[0]
-    return video_reference
-
-
 def _get_presigned_url(key):
     if not key or not s3_service.is_configured():
         return None
@@ -47,7 +55,7 @@ def register_analysis(request):
                 {"error": "Missing video_link or participant_event_id"}, status=400
             )
 
-        video_key = _extract_s3_key(video_link)
+        video_key = extract_s3_key(video_link)
         if not video_key:
             return JsonResponse({"error": "Invalid video reference"}, status=400)
 
@@ -56,7 +64,12 @@ def register_analysis(request):
         # Create or update the analysis record
         analisis, created = AnalisisComportamiento.objects.update_or_create(
             participant_event=participant_event,
-            defaults={"video_link": video_key, "status": "pendiente"},
+            defaults={
+                "video_link": video_key,
+                "video_analisis_link": "",
+                "status": "pendiente",
+                "huella_union": "",
+            },
         )
 
         return JsonResponse(
@@ -100,8 +113,25 @@ def trigger_analysis(request):
                 status=404,
             )
 
+        # El lock se toma con el id de la tarea antes de encolarla para que
+        # una solicitud duplicada reciba la tarea en curso
+        task_id = str(uuid.uuid4())
+        in_flight = lock_etapa("analysis", participant_event_id).adquirir(task_id)
+        if in_flight != task_id:
+            return JsonResponse(
+                {
+                    "message": "Analysis already in progress",
+                    "task_id": in_flight,
+                    "duplicate": True,
+                },
+                status=202,
+            )
+
         # Trigger the Celery task asynchronously
-        task = analyze_behavior_task.delay(analisis.video_link, participant_event_id)
+        task = analyze_behavior_task.apply_async(
+            (analisis.video_analisis_link or analisis.video_link, participant_event_id),
+            task_id=task_id,
+        )
 
         return JsonResponse(
             {"message": "Analysis started", "task_id": task.id}, status=202
@@ -137,8 +167,18 @@ def merge_participant_video(request):
             f"Starting video merge for participant_event {participant_event_id}"
         )
 
+        owner = f"request-{uuid.uuid4()}"
+        lock = lock_etapa("merge", participant_event_id)
+        in_flight = lock.adquirir(owner)
+        if in_flight != owner:
+            return JsonResponse(
+                {"error": "Merge already in progress", "task_id": in_flight},
+                status=409,
+            )
+
         # Usar el servicio de merger para unir videos
-        result = video_merger_service.merge_participant_videos(participant_event_id)
+        with lock.mantener(owner):
+            result = video_merger_service.merge_participant_videos(participant_event_id)
 
         if result["success"]:
             video_key = (
@@ -199,6 +239,7 @@ def analysis_status(request, event_id, participant_id):
         "analysis": {
             "id": getattr(analysis, "id", None),
             "status": getattr(analysis, "status", "no_solicitado"),
+            "nivel": getattr(analysis, "nivel", None),
             "video_link": video_url,
             "video_key": video_key,
             "fecha_procesamiento": getattr(analysis, "fecha_procesamiento", None),
@@ -212,10 +253,14 @@ def analysis_status(request, event_id, participant_id):
 @jwt_required()
 @require_GET
 def analysis_report(request, event_id, participant_id):
-    """Endpoint completo para obtener el reporte de analisis con todos los registros"""
+    """
+    Endpoint completo para obtener el reporte de analisis con todos los registros.
+    Los analisis completados se sirven desde el artefacto pre-renderizado
+    (con ETag y GET condicional); el resto se construye en el momento.
+    """
     try:
         participant_event = ParticipantEvent.objects.select_related(
-            "participant", "event"
+            "participant", "event", "analisis_comportamiento"
         ).get(event_id=event_id, participant_id=participant_id)
     except ParticipantEvent.DoesNotExist:
         return JsonResponse({"error": "ParticipantEvent not found"}, status=404)
@@ -231,144 +276,191 @@ def analysis_report(request, event_id, participant_id):
             status=404,
         )
 
-    video_key = analysis.video_link
-    video_url = _get_presigned_url(video_key) or video_key
+    if analysis.status == "completado" and analysis.reporte_version:
+        ventana = ventana_firma()
+        etag = etag_reporte(analysis, ventana)
+        if request.headers.get("If-None-Match") == etag:
+            response = HttpResponseNotModified()
+            response["ETag"] = etag
+            return response
+
+        cuerpo = reporte_servido(analysis, ventana)
+        if cuerpo is not None:
+            response = HttpResponse(cuerpo, content_type="application/json")
+            response["ETag"] = etag
+            response["Cache-Control"] = "private, no-cache"
+            return response
+        logger.warning(
+            f"Report artifact for analysis {analysis.id} unavailable, building it live"
+        )
 
-    # Recopilar todos los registros relacionados
-    registros_rostros = list(
-        analysis.registros_rostros.values(
-            "id", "persona_id", "tiempo_inicio", "tiempo_fin"
-        ).order_by("tiempo_inicio")
-    )
+    data = firmar_reporte(construir_reporte(participant_event, analysis))
+    return JsonResponse(data, status=200, encoder=DjangoJSONEncoder)
 
-    registros_gestos = list(
-        analysis.registros_gestos.values(
-            "id", "tipo_gesto", "tiempo_inicio", "tiempo_fin", "duracion"
-        ).order_by("tiempo_inicio")
-    )
 
-    registros_iluminacion = list(
-        analysis.registros_iluminacion.values("id", "tiempo_inicio", "tiempo_fin").order_by("tiempo_inicio")
-    )
+def _parametro_float(request, nombre):
+    valor = request.GET.get(nombre)
+    return float(valor) if valor not in (None, "") else None
 
-    registros_voz = list(
-        analysis.registros_voz.values(
-            "id", "tipo_log", "etiqueta_hablante", "tiempo_inicio", "tiempo_fin"
-        ).order_by("tiempo_inicio")
-    )
 
-    anomalias_lipsync = list(
-        analysis.anomalias_lipsync.values(
-            "id", "tipo_anomalia", "tiempo_inicio", "tiempo_fin"
-        ).order_by("tiempo_inicio")
-    )
+def _parametro_fecha(request, nombre):
+    valor = request.GET.get(nombre)
+    if valor in (None, ""):
+        return None
+    fecha = parse_datetime(valor)
+    if fecha is None:
+        raise ValueError(f"Invalid datetime for {nombre}: {valor}")
+    return fecha
 
-    registros_ausencia = list(
-        analysis.registros_ausencia.values(
-            "id", "tiempo_inicio", "tiempo_fin", "duracion"
-        ).order_by("tiempo_inicio")
-    )
-    # Obtener logs de actividad del participante (excluyendo keylogger)
-    screenshots_queryset = (
-        ParticipantLog.objects.filter(
-            participant_event=participant_event, name="screen"
+
+def _analisis_de(event_id, participant_id):
+    """(participant_event, analysis, respuesta_error) para los endpoints del reporte."""
+    try:
+        participant_event = ParticipantEvent.objects.select_related(
+            "analisis_comportamiento"
+        ).get(event_id=event_id, participant_id=participant_id)
+    except ParticipantEvent.DoesNotExist:
+        return None, None, JsonResponse({"error": "ParticipantEvent not found"}, status=404)
+
+    analysis = getattr(participant_event, "analisis_comportamiento", None)
+    if not analysis:
+        return participant_event, None, JsonResponse(
+            {
+                "error": "No analysis found for this participant",
+                "status": "no_solicitado",
+            },
+            status=404,
         )
-        .values("id", "timestamp", "url", "message")
-        .order_by("timestamp")
-    )
+    return participant_event, analysis, None
 
-    screenshots_logs = []
-    for log in screenshots_queryset:
-        screenshot_data = {
-            "id": log["id"],
-            "timestamp": log["timestamp"],
-            "url": _get_presigned_url(log["url"]) if log["url"] else None,
-            "message": log["message"],
-        }
-        screenshots_logs.append(screenshot_data)
-
-    # Contar videos
-    total_videos = ParticipantLog.objects.filter(
-        participant_event=participant_event, name="audio/video"
-    ).count()
-
-    # Contar desconexiones del proxy
-    total_proxy_disconnections = ParticipantLog.objects.filter(
-        participant_event=participant_event, name="proxy"
-    ).count()
-
-    # Solo peticiones bloqueadas (las unicas que se guardan en logs HTTP)
-    blocked_requests = list(
-        ParticipantLog.objects.filter(participant_event=participant_event, name="http")
-        .values("id", "message", "timestamp", "url")
-        .order_by("-timestamp")
-    )
 
-    # Informacion de monitoreo
-    monitoring_info = {
-        "total_duration_seconds": participant_event.monitoring_total_duration or 0,
-        "sessions_count": participant_event.monitoring_sessions_count or 0,
-        "last_change": participant_event.monitoring_last_change,
-    }
+def _serie(spec):
+    """'tipo' o 'tipo:etiqueta' -> (tipo, etiqueta)."""
+    tipo, _, etiqueta = (spec or "").partition(":")
+    if tipo not in TIPOS:
+        raise ValueError(f"Unknown registro type: {tipo}")
+    return tipo, etiqueta or None
 
-    # Calcular estadisticas
-    total_rostros_detectados = len(set(r["persona_id"] for r in registros_rostros))
-    total_gestos = len(registros_gestos)
-    total_anomalias_iluminacion = len(registros_iluminacion)
-    total_anomalias_voz = len([v for v in registros_voz if v["tipo_log"] == "susurro"])
-    total_hablantes = len([v for v in registros_voz if v["tipo_log"] == "hablante"])
-    total_anomalias_lipsync = len(anomalias_lipsync)
-    total_ausencias = len(registros_ausencia)
-    tiempo_total_ausencia = sum(r["duracion"] for r in registros_ausencia)
 
-    data = {
-        "event": {
-            "id": participant_event.event.id,
-            "name": participant_event.event.name,
-            "duration": participant_event.event.duration,
-        },
-        "participant": {
-            "id": participant_event.participant.id,
-            "name": participant_event.participant.name,
-            "email": participant_event.participant.email,
-        },
-        "analysis": {
-            "id": analysis.id,
-            "status": analysis.status,
-            "video_link": video_url,
-            "video_key": video_key,
-            "fecha_procesamiento": analysis.fecha_procesamiento,
-        },
-        "statistics": {
-            "total_rostros_detectados": total_rostros_detectados,
-            "total_gestos": total_gestos,
-            "total_anomalias_iluminacion": total_anomalias_iluminacion,
-            "total_anomalias_voz": total_anomalias_voz,
-            "total_hablantes": total_hablantes,
-            "total_anomalias_lipsync": total_anomalias_lipsync,
-            "total_ausencias": total_ausencias,
-            "tiempo_total_ausencia_segundos": round(tiempo_total_ausencia, 2),
-            "total_screenshots": len(screenshots_logs),
-            "total_videos": total_videos,
-            "total_blocked_requests": len(blocked_requests),
-            "total_proxy_disconnections": total_proxy_disconnections,
-        },
-        "registros": {
-            "rostros": registros_rostros,
-            "gestos": registros_gestos,
-            "iluminacion": registros_iluminacion,
-            "voz": registros_voz,
-            "lipsync": anomalias_lipsync,
-            "ausencias": registros_ausencia,
+@csrf_exempt
+@jwt_required()
+@require_GET
+def analysis_timeline(request, event_id, participant_id):
+    """
+    Todo lo que ocurrio en [t0, t1) segundos del video: registros de todos
+    los analizadores que se solapan con la ventana y screenshots tomados a
+    menos de `margen` segundos de ella.
+    """
+    participant_event, analysis, error = _analisis_de(event_id, participant_id)
+    if error:
+        return error
+
+    try:
+        t0 = _parametro_float(request, "t0")
+        if t0 is None:
+            raise ValueError("Missing t0")
+        t1 = _parametro_float(request, "t1")
+        # Sin t1 se consulta el instante t0
+        t1 = t1 if t1 is not None else t0 + 1e-9
+        margen = _parametro_float(request, "margen")
+        margen = 10.0 if margen is None else margen
+        if t1 < t0 or margen < 0:
+            raise ValueError("Invalid time range")
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    screenshots = screenshots_cercanos(participant_event, t0, t1, margen)
+    for screenshot in screenshots:
+        screenshot["url"] = _get_presigned_url(screenshot["url"])
+
+    return JsonResponse(
+        {
+            "t0": t0,
+            "t1": t1,
+            "eventos": indice_de_analisis(analysis).eventos(t0, t1),
+            "screenshots": screenshots,
         },
-        "activity_logs": {
-            "screenshots": screenshots_logs,
-            "blocked_requests": blocked_requests[:100],  # Limitar a ultimas 100
+        status=200,
+        encoder=DjangoJSONEncoder,
+    )
+
+
+@csrf_exempt
+@jwt_required()
+@require_GET
+def analysis_cooccurrence(request, event_id, participant_id):
+    """
+    Tramos del video en que dos series de anomalias estan activas a la vez,
+    p.ej. ?a=gestos&b=voz:susurro.
+    """
+    _, analysis, error = _analisis_de(event_id, participant_id)
+    if error:
+        return error
+
+    try:
+        a = _serie(request.GET.get("a"))
+        b = _serie(request.GET.get("b"))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    indice = indice_de_analisis(analysis)
+    tramos = coocurrencia(indice.intervalos(*a), indice.intervalos(*b))
+    return JsonResponse(
+        {
+            "a": request.GET.get("a"),
+            "b": request.GET.get("b"),
+            "tramos": [{"tiempo_inicio": i, "tiempo_fin": f} for i, f in tramos],
+            "total": len(tramos),
+            "segundos": round(sum(f - i for i, f in tramos), 2),
         },
-        "monitoring": monitoring_info,
-    }
+        status=200,
+    )
 
-    return JsonResponse(data, status=200, encoder=DjangoJSONEncoder)
+
+@csrf_exempt
+@jwt_required()
+@require_GET
+def analysis_report_page(request, event_id, participant_id, tipo):
+    """
+    Pagina de un tipo de registro del reporte (o de screenshots) para la
+    carga progresiva del timeline. Parametros: t0/t1 (segundos del video;
+    para screenshots, fechas ISO-8601), cursor y limit.
+    """
+    if tipo != "screenshots" and tipo not in REGISTROS:
+        return JsonResponse({"error": f"Unknown registro type: {tipo}"}, status=400)
+
+    participant_event, analysis, error = _analisis_de(event_id, participant_id)
+    if error:
+        return error
+
+    try:
+        limite = min(int(request.GET.get("limit", PAGINA_DEFAULT)), PAGINA_MAXIMA)
+        if limite < 1:
+            raise ValueError("limit must be positive")
+        cursor = request.GET.get("cursor") or None
+        if tipo == "screenshots":
+            pagina = pagina_screenshots(
+                participant_event,
+                desde=_parametro_fecha(request, "t0"),
+                hasta=_parametro_fecha(request, "t1"),
+                cursor=cursor,
+                limite=limite,
+            )
+        else:
+            pagina = pagina_registros(
+                analysis,
+                tipo,
+                t0=_parametro_float(request, "t0"),
+                t1=_parametro_float(request, "t1"),
+                cursor=cursor,
+                limite=limite,
+            )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse(
+        {"tipo": tipo, "limit": limite, **pagina}, status=200, encoder=DjangoJSONEncoder
+    )
 
 
 @csrf_exempt
@@ -381,6 +473,10 @@ def process_event_completion(request):
     try:
         data = json.loads(request.body)
         event_id = data.get("event_id")
+        # Opcional: pasada preliminar + completa (None = segun ANALYSIS_TWO_TIER)
+        two_tier = data.get("two_tier")
+        # Opcional: analisis por fragmento sin esperar la union (None = ANALYSIS_FANOUT)
+        fanout = data.get("fanout")
 
         if not event_id:
             return JsonResponse({"error": "Missing event_id"}, status=400)
@@ -393,58 +489,55 @@ def process_event_completion(request):
 
         logger.info(f"Processing completion for event {event_id}: {event.name}")
 
-        # Obtener todos los ParticipantEvents del evento
-        participant_events = ParticipantEvent.objects.filter(event=event)
+        # Importar aqui para evitar circular imports
+        from .planner import planificar_evento
+        from .tasks import start_event_completion
 
-        if not participant_events.exists():
+        # Carga estimada de todos los participantes en una consulta; los que
+        # nunca enviaron video/audio no se encolan
+        plan, skipped_participants = planificar_evento(event)
+
+        if not plan and not skipped_participants:
             return JsonResponse(
                 {"error": "No participants found for this event"}, status=404
             )
 
-        # Iniciar tareas asincronas para cada participante
         task_ids = []
         participant_data = []
-        skipped_participants = []
-
-        for participant_event in participant_events:
-            # Importar la tarea aqui para evitar circular imports
-            from .tasks import process_participant_completion_task
-
-            # Si el participante nunca envio video/audio no lo encolamos
-            has_video_logs = ParticipantLog.objects.filter(
-                participant_event=participant_event,
-                name="audio/video",
-                url__isnull=False,
-            ).exists()
-            if not has_video_logs:
-                skipped_participants.append(
+        event_task_id = None
+        if plan:
+            # Mayor carga primero (LPT) y un callback que cierra el evento
+            dispatch = start_event_completion(
+                event, plan, two_tier=two_tier, fanout=fanout
+            )
+            event_task_id = dispatch["event_task_id"]
+            if dispatch["duplicate"]:
+                return JsonResponse(
                     {
-                        "participant_event_id": participant_event.id,
-                        "participant_name": participant_event.participant.name,
-                        "reason": "sin_videos",
-                    }
+                        "message": "Event completion already in progress",
+                        "event_id": event_id,
+                        "event_name": event.name,
+                        "event_task_id": event_task_id,
+                        "duplicate": True,
+                    },
+                    status=202,
                 )
-                logger.info(
-                    f"Skipping participant {participant_event.participant.name} (ID: {participant_event.id}) - no video logs"
+            participant_task_ids = dispatch["task_ids"]
+            for carga in plan:
+                task_id = participant_task_ids[carga["participant_event_id"]]
+                task_ids.append(task_id)
+                participant_data.append(
+                    {
+                        "participant_event_id": carga["participant_event_id"],
+                        "participant_name": carga["participant_name"],
+                        "task_id": task_id,
+                        "fragments": carga["fragmentos"],
+                        "estimated_seconds": carga["segundos_estimados"],
+                        "priority": carga["prioridad"],
+                    }
                 )
-                continue
-
-            # Iniciar tarea asincrona para este participante
-            task = process_participant_completion_task.delay(
-                participant_event.id, event_id, event.name
-            )
-
-            task_ids.append(task.id)
-            participant_data.append(
-                {
-                    "participant_event_id": participant_event.id,
-                    "participant_name": participant_event.participant.name,
-                    "task_id": task.id,
-                }
-            )
-
             logger.info(
-                f"Started async processing for participant {participant_event.participant.name} (ID: {participant_event.id}) - Task: {task.id}"
+                f"Started async processing for {len(plan)} participants of event {event_id} - Task: {event_task_id}"
             )
 
         return JsonResponse(
@@ -456,6 +549,7 @@ def process_event_completion(request):
                 "skipped_participants": skipped_participants,
                 "processing_mode": "async",
                 "task_ids": task_ids,
+                "event_task_id": event_task_id,
                 "participants": participant_data,
                 "note": "Processing will continue in background. Check Celery logs for progress.",
             },
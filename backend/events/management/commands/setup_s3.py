@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from events.s3_service import s3_service
+from events.s3_service import S3Service, s3_service
 from events.models import ParticipantLog
 from django.conf import settings
 import os
@@ -84,6 +84,15 @@ class Command(BaseCommand):
             self.stdout.write("   Por favor, configúralas en tu archivo .env")
             return False
 
+        # head_bucket solo existe en el backend S3
+        if not isinstance(s3_service, S3Service):
+            self.stdout.write(
+                self.style.WARNING(
+                    f"  ⚠️  STORAGE_BACKEND={s3_service.backend_name}: no hay bucket de S3 que verificar"
+                )
+            )
+            return s3_service.is_configured()
+
         # Verificar conexión con S3
         if s3_service.is_configured():
             self.stdout.write("  ✅ Servicio S3 configurado correctamente")
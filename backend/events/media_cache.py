@@ -0,0 +1,124 @@
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin flock, el os.replace atomico sigue siendo seguro
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class MediaCache:
+    """
+    Cache en disco, local al worker, de objetos de S3 direccionados por
+    (key, ETag). Las escrituras son atomicas (archivo parcial + os.replace) y
+    un flock por entrada evita que varios procesos descarguen lo mismo a la
+    vez. Al superar `max_bytes` se eliminan las entradas usadas hace mas
+    tiempo (LRU por mtime, que se actualiza en cada acierto).
+    """
+
+    LOCK_SUFFIX = ".lock"
+    PARTIAL_MARKER = ".partial-"
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+
+    def fetch(self, key, etag, dest_path, download):
+        """
+        Deja en `dest_path` el objeto (key, etag). En caso de fallo llama a
+        `download(path)` para poblar la cache. Retorna True si fue un acierto.
+        """
+        entry = self._entry_path(key, etag)
+        with self._lock(entry + self.LOCK_SUFFIX):
+            hit = os.path.exists(entry)
+            if hit:
+                os.utime(entry, None)
+            else:
+                partial = f"{entry}{self.PARTIAL_MARKER}{uuid.uuid4().hex}"
+                try:
+                    download(partial)
+                    os.replace(partial, entry)
+                finally:
+                    if os.path.exists(partial):
+                        os.remove(partial)
+            self._materialize(entry, dest_path)
+
+        if not hit:
+            self.evict()
+        return hit
+
+    def evict(self):
+        """Elimina las entradas menos usadas hasta quedar bajo `max_bytes`."""
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith(self.LOCK_SUFFIX) or self.PARTIAL_MARKER in name:
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            lock_path = path + self.LOCK_SUFFIX
+            with self._lock(lock_path, blocking=False) as acquired:
+                if not acquired:
+                    continue  # en uso por otro proceso
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+                if os.path.exists(lock_path):
+                    os.remove(lock_path)
+
+    def _entry_path(self, key, etag):
+        digest = hashlib.sha256(f"{key}\0{etag}".encode("utf-8")).hexdigest()
+        _, ext = os.path.splitext(key)
+        return os.path.join(self.root, f"{digest}{ext}")
+
+    def _materialize(self, entry, dest_path):
+        # Hard link cuando es posible (mismo filesystem); si no, copia
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        try:
+            os.link(entry, dest_path)
+        except OSError:
+            shutil.copyfile(entry, dest_path)
+
+    @contextmanager
+    def _lock(self, lock_path, blocking=True):
+        if fcntl is None:
+            yield True
+            return
+        with open(lock_path, "a") as handle:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(handle, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def media_cache_from_env():
+    """MediaCache segun MEDIA_CACHE_DIR / MEDIA_CACHE_MAX_BYTES, o None si esta desactivada."""
+    root = os.getenv("MEDIA_CACHE_DIR", "").strip()
+    if not root:
+        return None
+    max_bytes = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(10 * 1024**3)))
+    return MediaCache(root, max_bytes)
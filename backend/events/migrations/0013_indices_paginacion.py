@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_eventconsent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='participantlog',
+            index=models.Index(fields=['participant_event', 'name', 'timestamp', 'id'], name='logs_partic_partici_078b66_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_alter_customuser_first_name_and_more'),
+        ('events', '0013_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['start_date', 'id'], name='eventos_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', 'start_date', 'id'], name='eventos_status_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['evaluator', 'start_date', 'id'], name='eventos_evaluador_inicio_idx'),
+        ),
+    ]
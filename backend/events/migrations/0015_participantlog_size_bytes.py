@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0014_indices_listado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participantlog',
+            name='size_bytes',
+            field=models.BigIntegerField(blank=True, help_text='Tamaño del archivo subido (media), si se conoce', null=True),
+        ),
+    ]
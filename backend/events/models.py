@@ -24,6 +24,17 @@ class Event(models.Model):
 
     class Meta:
         db_table = "eventos"
+        # Listados filtrados por estado o evaluador y paginados por (start_date, id)
+        indexes = [
+            models.Index(fields=["start_date", "id"], name="eventos_inicio_idx"),
+            models.Index(
+                fields=["status", "start_date", "id"], name="eventos_status_inicio_idx"
+            ),
+            models.Index(
+                fields=["evaluator", "start_date", "id"],
+                name="eventos_evaluador_inicio_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -150,9 +161,12 @@ class ParticipantLog(models.Model):
         ParticipantEvent, on_delete=models.CASCADE, null=True
     )
     timestamp = models.DateTimeField(auto_now_add=True, editable=False, help_text="Hora UTC en que se registró el log")
+    size_bytes = models.BigIntegerField(null=True, blank=True, help_text="Tamaño del archivo subido (media), si se conoce")
 
     class Meta:
         db_table = "logs_participantes"
+        # Paginacion por cursor (timestamp, id) de los logs de un participante
+        indexes = [models.Index(fields=["participant_event", "name", "timestamp", "id"])]
 
     def __str__(self):
         return self.name
@@ -1,31 +1,60 @@
 import boto3
-import uuid
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from django.conf import settings
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
 import logging
+from .media_cache import media_cache_from_env
+from .storage import InMemoryStorageBackend, LocalStorageBackend, StorageBackend
 
 logger = logging.getLogger(__name__)
 
+MB = 1024 * 1024
 
-class S3Service:
+
+class S3Service(StorageBackend):
     """
     Servicio para manejar operaciones de Amazon S3 para almacenamiento de archivos multimedia.
     Maneja fragmentos de audio/video de 5 minutos con organización por participante y evento.
     """
 
+    backend_name = "s3"
+
     def __init__(self):
         """Inicializa el cliente S3 y verifica las configuraciones."""
         self.bucket_name = getattr(settings, "AWS_STORAGE_BUCKET_NAME", None)
         self.region = getattr(settings, "AWS_S3_REGION_NAME", "us-east-1")
 
+        # Pool de conexiones dimensionado para descargas concurrentes desde un
+        # mismo cliente (los clientes de boto3 son thread-safe)
+        max_pool_connections = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "20"))
+
+        # Parametros de transferencia para uploads/descargas multipart
+        self.multipart_threshold = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "64")) * MB
+        self.multipart_chunksize = max(
+            5 * MB, int(os.getenv("S3_MULTIPART_CHUNKSIZE_MB", "64")) * MB
+        )
+        self.max_concurrency = int(os.getenv("S3_MAX_CONCURRENCY", "10"))
+        # Memoria para partes en vuelo: cada parte se lee completa antes de subirla
+        self.multipart_memory = int(os.getenv("S3_MULTIPART_MEMORY_MB", "256")) * MB
+        self.part_retries = max(1, int(os.getenv("S3_PART_RETRIES", "3")))
+        self.transfer_config = TransferConfig(
+            multipart_threshold=self.multipart_threshold,
+            multipart_chunksize=self.multipart_chunksize,
+            max_concurrency=self.max_concurrency,
+        )
+
         try:
             self.s3_client = boto3.client(
                 "s3",
                 aws_access_key_id=getattr(settings, "AWS_ACCESS_KEY_ID", None),
                 aws_secret_access_key=getattr(settings, "AWS_SECRET_ACCESS_KEY", None),
                 region_name=self.region,
+                config=Config(max_pool_connections=max_pool_connections),
             )
             self._is_configured = True
         except (NoCredentialsError, Exception) as e:
@@ -125,34 +154,6 @@ class S3Service:
         except ClientError as e:
             logger.warning(f"Could not configure bucket policies: {e}")
 
-    def generate_media_key(
-        self, participant_event_id, media_type="video", timestamp=None
-    ):
-        """
-        Genera una clave única para el archivo multimedia en S3.
-
-        Args:
-            participant_event_id (int): ID del ParticipantEvent
-            media_type (str): Tipo de media ('video', 'audio', 'screen')
-            timestamp (datetime): Timestamp del fragmento, usa actual si no se especifica
-
-        Returns:
-            str: Clave del archivo en formato: media/participant_events/{id}/{year}/{month}/{day}/{type}_{timestamp}_{uuid}.{ext}
-            Donde ext = webm para video/audio, mp4 para merged_video, jpg para screen
-        """
-        if timestamp is None:
-            timestamp = datetime.now()
-
-        date_path = timestamp.strftime("%Y/%m/%d")
-        timestamp_str = timestamp.strftime("%Y%m%d_%H%M%S")
-        unique_id = str(uuid.uuid4())[:8]
-
-        # Usar extensión correcta según el tipo de media
-        extension = self._get_file_extension(media_type)
-        filename = f"{media_type}_{timestamp_str}_{unique_id}.{extension}"
-
-        return f"media/participant_events/{participant_event_id}/{date_path}/{filename}"
-
     def upload_media_fragment(
         self, file_obj, participant_event_id, media_type="video", timestamp=None
     ):
@@ -176,12 +177,7 @@ class S3Service:
             key = self.generate_media_key(participant_event_id, media_type, timestamp)
 
             # Preparar metadata
-            metadata = {
-                "participant_event_id": str(participant_event_id),
-                "media_type": media_type,
-                "upload_timestamp": datetime.now().isoformat(),
-                "fragment_timestamp": (timestamp or datetime.now()).isoformat(),
-            }
+            metadata = self._build_metadata(participant_event_id, media_type, timestamp)
 
             # Subir archivo sin ACL (compatible con Object Ownership: Bucket owner enforced)
             self.s3_client.upload_fileobj(
@@ -193,6 +189,7 @@ class S3Service:
                     "Metadata": metadata,
                     "ServerSideEncryption": "AES256",
                 },
+                Config=self.transfer_config,
             )
 
             # Generar URL prefirmada de conveniencia (bucket permanece privado)
@@ -212,6 +209,123 @@ class S3Service:
             logger.error(f"Error uploading media fragment: {e}")
             return {"success": False, "error": f"Upload failed: {str(e)}"}
 
+    def upload_large_media(
+        self,
+        file_path,
+        participant_event_id,
+        media_type="merged_video",
+        timestamp=None,
+        progress_callback=None,
+    ):
+        """
+        Sube un archivo grande (p.ej. el video unido) con multipart explicito:
+        las partes se suben en paralelo y solo se reintentan las que fallan.
+
+        Args:
+            file_path (str): Ruta local del archivo
+            participant_event_id (int): ID del ParticipantEvent
+            media_type (str): Tipo de media (define key y content type)
+            timestamp (datetime): Timestamp para la key
+            progress_callback (callable): Recibe (bytes_subidos, bytes_totales)
+
+        Returns:
+            dict: {'success': bool, 'key': str, 'url': str, 'presigned_url': str, 'error': str}
+        """
+        if not self.is_configured():
+            return {"success": False, "error": "S3 not configured properly"}
+
+        key = self.generate_media_key(participant_event_id, media_type, timestamp)
+        metadata = self._build_metadata(participant_event_id, media_type, timestamp)
+        extra_args = {
+            "ContentType": self._get_content_type(media_type),
+            "Metadata": metadata,
+            "ServerSideEncryption": "AES256",
+        }
+        total_size = os.path.getsize(file_path)
+
+        try:
+            if total_size < self.multipart_threshold:
+                with open(file_path, "rb") as file_obj:
+                    self.s3_client.upload_fileobj(
+                        file_obj, self.bucket_name, key, ExtraArgs=extra_args
+                    )
+                if progress_callback:
+                    progress_callback(total_size, total_size)
+            else:
+                self._multipart_upload(
+                    file_path, key, extra_args, total_size, progress_callback
+                )
+        except Exception as e:
+            logger.error(f"Error uploading large media {key}: {e}")
+            return {"success": False, "error": f"Upload failed: {str(e)}"}
+
+        logger.info(f"Successfully uploaded large media: {key} ({total_size} bytes)")
+        return {
+            "success": True,
+            "key": key,
+            "url": key,
+            "presigned_url": self.generate_presigned_url(key),
+            "metadata": metadata,
+        }
+
+    def _multipart_upload(self, file_path, key, extra_args, total_size, progress_callback):
+        upload_id = self.s3_client.create_multipart_upload(
+            Bucket=self.bucket_name, Key=key, **extra_args
+        )["UploadId"]
+        chunk = self.multipart_chunksize
+        offsets = list(range(0, total_size, chunk))
+        workers = max(1, min(self.max_concurrency, self.multipart_memory // chunk))
+        uploaded = 0
+
+        def upload_part(part_number, offset):
+            with open(file_path, "rb") as handle:
+                handle.seek(offset)
+                body = handle.read(chunk)
+            for attempt in range(1, self.part_retries + 1):
+                try:
+                    response = self.s3_client.upload_part(
+                        Bucket=self.bucket_name,
+                        Key=key,
+                        UploadId=upload_id,
+                        PartNumber=part_number,
+                        Body=body,
+                    )
+                    return part_number, response["ETag"], len(body)
+                except Exception as e:
+                    if attempt == self.part_retries:
+                        raise
+                    logger.warning(
+                        f"Retrying part {part_number} of {key} ({attempt}/{self.part_retries}): {e}"
+                    )
+                    time.sleep(2 ** (attempt - 1))
+
+        try:
+            parts = []
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(upload_part, number, offset)
+                    for number, offset in enumerate(offsets, start=1)
+                ]
+                for future in as_completed(futures):
+                    part_number, etag, size = future.result()
+                    parts.append({"PartNumber": part_number, "ETag": etag})
+                    uploaded += size
+                    if progress_callback:
+                        progress_callback(uploaded, total_size)
+
+            parts.sort(key=lambda part: part["PartNumber"])
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except Exception:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=key, UploadId=upload_id
+            )
+            raise
+
     def generate_presigned_upload(
         self, participant_event_id, media_type="video", timestamp=None, expiration=3600
     ):
@@ -231,16 +345,9 @@ class S3Service:
             return {"success": False, "error": "S3 not configured properly"}
 
         try:
-            now = datetime.now()
             key = self.generate_media_key(participant_event_id, media_type, timestamp)
             content_type = self._get_content_type(media_type)
-
-            metadata = {
-                "participant_event_id": str(participant_event_id),
-                "media_type": media_type,
-                "upload_timestamp": now.isoformat(),
-                "fragment_timestamp": (timestamp or now).isoformat(),
-            }
+            metadata = self._build_metadata(participant_event_id, media_type, timestamp)
 
             upload_url = self.s3_client.generate_presigned_url(
                 "put_object",
@@ -405,6 +512,7 @@ class S3Service:
                 "key": key,
                 "size": response["ContentLength"],
                 "last_modified": response["LastModified"],
+                "etag": response.get("ETag", "").strip('"'),
                 "content_type": response.get("ContentType"),
                 "metadata": response.get("Metadata", {}),
                 "s3_key": key,
@@ -418,26 +526,6 @@ class S3Service:
             logger.error(f"Error getting media fragment info for {key}: {e}")
             return None
 
-    def _get_content_type(self, media_type):
-        """Determina el content type basado en el tipo de media."""
-        content_types = {
-            "video": "video/webm",
-            "audio": "audio/webm",
-            "screen": "image/jpeg",  # Screenshots como imágenes JPEG
-            "merged_video": "video/mp4",
-        }
-        return content_types.get(media_type, "application/octet-stream")
-
-    def _get_file_extension(self, media_type):
-        """Determina la extensión de archivo basada en el tipo de media."""
-        extensions = {
-            "video": "webm",
-            "audio": "webm",
-            "screen": "jpg",  # Screenshots como JPEG para menor costo
-            "merged_video": "mp4",
-        }
-        return extensions.get(media_type, "bin")
-
     def cleanup_old_fragments(self, days_old=30):
         """
         Limpia fragmentos de media antiguos (opcional, para mantenimiento).
@@ -488,14 +576,39 @@ class S3Service:
             local_file_path (str): Ruta local donde guardar el archivo
 
         Returns:
-            dict: {'success': bool, 'error': str}
+            dict: {'success': bool, 'cached': bool, 'error': str}
         """
         if not self.is_configured():
             return {"success": False, "error": "S3 not configured properly"}
 
         try:
+            # Con MEDIA_CACHE_DIR los objetos se sirven desde la cache local
+            # del worker si la key y el ETag coinciden
+            cache = media_cache_from_env()
+            if cache is not None:
+                head = self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
+                etag = head.get("ETag", "").strip('"')
+                hit = cache.fetch(
+                    s3_key,
+                    etag,
+                    local_file_path,
+                    lambda path: self.s3_client.download_file(
+                        Bucket=self.bucket_name,
+                        Key=s3_key,
+                        Filename=path,
+                        Config=self.transfer_config,
+                    ),
+                )
+                logger.info(
+                    f"{'Cache hit' if hit else 'Downloaded and cached'} {s3_key} to {local_file_path}"
+                )
+                return {"success": True, "cached": hit}
+
             self.s3_client.download_file(
-                Bucket=self.bucket_name, Key=s3_key, Filename=local_file_path
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                Filename=local_file_path,
+                Config=self.transfer_config,
             )
 
             logger.info(f"Successfully downloaded {s3_key} to {local_file_path}")
@@ -510,6 +623,52 @@ class S3Service:
             logger.error(error_msg)
             return {"success": False, "error": error_msg}
 
+    def download_fileobj(self, s3_key, file_obj):
+        """
+        Descarga un archivo desde S3 a un objeto con write(). Si el objeto no
+        admite seek las partes se escriben en orden, asi un lector puede
+        consumir el prefijo mientras la descarga sigue.
 
-# Instancia global del servicio
-s3_service = S3Service()
+        Returns:
+            dict: {'success': bool, 'error': str}
+        """
+        if not self.is_configured():
+            return {"success": False, "error": "S3 not configured properly"}
+
+        try:
+            self.s3_client.download_fileobj(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                Fileobj=file_obj,
+                Config=self.transfer_config,
+            )
+            logger.info(f"Successfully streamed {s3_key}")
+            return {"success": True}
+
+        except ClientError as e:
+            error_msg = f"Error downloading file from S3: {str(e)}"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        except Exception as e:
+            error_msg = f"Unexpected error downloading file: {str(e)}"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+
+
+def get_storage_backend():
+    """
+    Backend de almacenamiento segun STORAGE_BACKEND: "s3" (por defecto),
+    "local" (disco, LOCAL_STORAGE_ROOT) o "memory" (tests/benchmarks).
+    """
+    backend = os.getenv("STORAGE_BACKEND", "s3").strip().lower()
+    if backend == "local":
+        root = os.getenv("LOCAL_STORAGE_ROOT") or str(settings.BASE_DIR)
+        return LocalStorageBackend(root, os.getenv("LOCAL_STORAGE_BASE_URL", ""))
+    if backend == "memory":
+        return InMemoryStorageBackend()
+    return S3Service()
+
+
+# Instancia global del backend configurado; conserva el nombre historico
+# porque todos los llamadores la importan como s3_service
+s3_service = get_storage_backend()
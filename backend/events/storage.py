@@ -0,0 +1,481 @@
+import abc
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+MEDIA_PREFIX = "media/participant_events/"
+
+
+def extract_s3_key(ref):
+    """Key del objeto a partir de una key o de una URL (prefirmada) de S3."""
+    if not ref:
+        return None
+    if "amazonaws.com" in ref:
+        return ref.split(".amazonaws.com/")[-1].split("?")[0]
+    return ref
+
+
+class StorageBackend(abc.ABC):
+    """
+    Interfaz comun de almacenamiento de media. Todos los llamadores (vistas,
+    merger, analisis, limpieza) usan estos metodos; las implementaciones
+    concretas son S3 (events.s3_service.S3Service), disco local y memoria.
+    """
+
+    backend_name = "base"
+    bucket_name = None
+    region = None
+
+    CONTENT_TYPES = {
+        "video": "video/webm",
+        "audio": "audio/webm",
+        "screen": "image/jpeg",  # Screenshots como imágenes JPEG
+        "merged_video": "video/mp4",
+        "merged_video_webm": "video/webm",
+        "merged_video_mkv": "video/x-matroska",
+        "analysis_proxy": "video/mp4",
+        "analysis_report": "application/gzip",
+    }
+    EXTENSIONS = {
+        "video": "webm",
+        "audio": "webm",
+        "screen": "jpg",  # Screenshots como JPEG para menor costo
+        "merged_video": "mp4",
+        "merged_video_webm": "webm",
+        "merged_video_mkv": "mkv",
+        "analysis_proxy": "mp4",
+        "analysis_report": "json.gz",
+    }
+
+    def generate_media_key(
+        self, participant_event_id, media_type="video", timestamp=None
+    ):
+        """
+        Genera una clave única para el archivo multimedia.
+
+        Args:
+            participant_event_id (int): ID del ParticipantEvent
+            media_type (str): Tipo de media ('video', 'audio', 'screen')
+            timestamp (datetime): Timestamp del fragmento, usa actual si no se especifica
+
+        Returns:
+            str: Clave del archivo en formato: media/participant_events/{id}/{year}/{month}/{day}/{type}_{timestamp}_{uuid}.{ext}
+            Donde ext = webm para video/audio, mp4/webm/mkv para merged_video*, jpg para screen
+        """
+        if timestamp is None:
+            timestamp = datetime.now()
+
+        date_path = timestamp.strftime("%Y/%m/%d")
+        timestamp_str = timestamp.strftime("%Y%m%d_%H%M%S")
+        unique_id = str(uuid.uuid4())[:8]
+
+        # Usar extensión correcta según el tipo de media
+        extension = self._get_file_extension(media_type)
+        filename = f"{media_type}_{timestamp_str}_{unique_id}.{extension}"
+
+        return f"{MEDIA_PREFIX}{participant_event_id}/{date_path}/{filename}"
+
+    def _build_metadata(self, participant_event_id, media_type, timestamp):
+        now = datetime.now()
+        return {
+            "participant_event_id": str(participant_event_id),
+            "media_type": media_type,
+            "upload_timestamp": now.isoformat(),
+            "fragment_timestamp": (timestamp or now).isoformat(),
+        }
+
+    def _get_content_type(self, media_type):
+        """Determina el content type basado en el tipo de media."""
+        return self.CONTENT_TYPES.get(media_type, "application/octet-stream")
+
+    def _get_file_extension(self, media_type):
+        """Determina la extensión de archivo basada en el tipo de media."""
+        return self.EXTENSIONS.get(media_type, "bin")
+
+    @abc.abstractmethod
+    def is_configured(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def create_bucket_if_not_exists(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def upload_media_fragment(
+        self, file_obj, participant_event_id, media_type="video", timestamp=None
+    ):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def upload_large_media(
+        self,
+        file_path,
+        participant_event_id,
+        media_type="merged_video",
+        timestamp=None,
+        progress_callback=None,
+    ):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def generate_presigned_upload(
+        self, participant_event_id, media_type="video", timestamp=None, expiration=3600
+    ):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def generate_presigned_url(self, key, expiration=3600):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete_media_fragment(self, key):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_participant_media(
+        self, participant_event_id, media_type=None, start_date=None, end_date=None
+    ):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_media_fragment_info(self, key):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def cleanup_old_fragments(self, days_old=30):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def download_file(self, s3_key, local_file_path):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def download_fileobj(self, s3_key, file_obj):
+        """Escribe el objeto en orden sobre `file_obj` (cualquier objeto con write())."""
+        raise NotImplementedError
+
+
+class _ObjectStoreBackend(StorageBackend):
+    """
+    Base para backends sin servicio externo: implementa la interfaz sobre
+    cuatro primitivas (_put, _get, _delete, _objects) y no firma URLs.
+    """
+
+    @abc.abstractmethod
+    def _put(self, key, file_obj, content_type, metadata):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _get(self, key, dest_path):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _delete(self, key):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _objects(self, prefix):
+        """Genera (key, size, last_modified, content_type, metadata) bajo `prefix`."""
+        raise NotImplementedError
+
+    def is_configured(self):
+        return True
+
+    def create_bucket_if_not_exists(self):
+        return True
+
+    def upload_media_fragment(
+        self, file_obj, participant_event_id, media_type="video", timestamp=None
+    ):
+        try:
+            key = self.generate_media_key(participant_event_id, media_type, timestamp)
+            metadata = self._build_metadata(participant_event_id, media_type, timestamp)
+            self._put(key, file_obj, self._get_content_type(media_type), metadata)
+        except Exception as e:
+            logger.error(f"Error storing media fragment: {e}")
+            return {"success": False, "error": f"Upload failed: {str(e)}"}
+
+        logger.info(f"Successfully stored media fragment: {key}")
+        return {
+            "success": True,
+            "key": key,
+            "url": key,
+            "presigned_url": self.generate_presigned_url(key),
+            "metadata": metadata,
+        }
+
+    def upload_large_media(
+        self,
+        file_path,
+        participant_event_id,
+        media_type="merged_video",
+        timestamp=None,
+        progress_callback=None,
+    ):
+        with open(file_path, "rb") as file_obj:
+            result = self.upload_media_fragment(
+                file_obj, participant_event_id, media_type, timestamp
+            )
+        if result["success"] and progress_callback:
+            size = os.path.getsize(file_path)
+            progress_callback(size, size)
+        return result
+
+    def generate_presigned_upload(
+        self, participant_event_id, media_type="video", timestamp=None, expiration=3600
+    ):
+        # Sin object store no hay URL de subida directa: el cliente debe
+        # enviar el archivo al endpoint de log (multipart)
+        return {
+            "success": False,
+            "error": f"Presigned uploads are not supported by the {self.backend_name} storage backend",
+        }
+
+    def generate_presigned_url(self, key, expiration=3600):
+        # Nadie firma ni sirve estos objetos: la key no es una URL, y los
+        # llamadores recurren a la descarga cuando no hay URL
+        return None
+
+    def delete_media_fragment(self, key):
+        try:
+            self._delete(key)
+        except KeyError:
+            pass
+        except Exception as e:
+            logger.error(f"Error deleting media fragment {key}: {e}")
+            return {"success": False, "error": f"Delete failed: {str(e)}"}
+        logger.info(f"Successfully deleted media fragment: {key}")
+        return {"success": True}
+
+    def list_participant_media(
+        self, participant_event_id, media_type=None, start_date=None, end_date=None
+    ):
+        prefix = f"{MEDIA_PREFIX}{participant_event_id}/"
+        files = []
+        for key, size, last_modified, _content_type, metadata in self._objects(prefix):
+            if media_type and f"/{media_type}_" not in key:
+                continue
+            presigned_url = self.generate_presigned_url(key)
+            files.append(
+                {
+                    "key": key,
+                    "size": size,
+                    "last_modified": last_modified,
+                    "media_type": metadata.get("media_type", "unknown"),
+                    "fragment_timestamp": metadata.get("fragment_timestamp"),
+                    "s3_key": key,
+                    "url": presigned_url,
+                    "presigned_url": presigned_url,
+                }
+            )
+        return files
+
+    def get_media_fragment_info(self, key):
+        for obj_key, size, last_modified, content_type, metadata in self._objects(key):
+            if obj_key != key:
+                continue
+            presigned_url = self.generate_presigned_url(key)
+            return {
+                "key": key,
+                "size": size,
+                "last_modified": last_modified,
+                # Sin ETag real: tamano y fecha de modificacion identifican la version
+                "etag": f"{size}-{last_modified.timestamp()}",
+                "content_type": content_type,
+                "metadata": metadata,
+                "s3_key": key,
+                "url": presigned_url,
+                "presigned_url": presigned_url,
+            }
+        return None
+
+    def cleanup_old_fragments(self, days_old=30):
+        cutoff_date = datetime.now() - timedelta(days=days_old)
+        deleted_count = 0
+        errors = []
+        for key, _size, last_modified, _content_type, _metadata in self._objects(
+            MEDIA_PREFIX
+        ):
+            if last_modified < cutoff_date:
+                try:
+                    self._delete(key)
+                    deleted_count += 1
+                except Exception as e:
+                    errors.append(f"Error deleting {key}: {str(e)}")
+        return {"deleted_count": deleted_count, "errors": errors}
+
+    def download_file(self, s3_key, local_file_path):
+        try:
+            self._get(s3_key, local_file_path)
+        except KeyError:
+            error_msg = f"Error downloading file: {s3_key} not found"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        except Exception as e:
+            error_msg = f"Unexpected error downloading file: {str(e)}"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        return {"success": True}
+
+    def download_fileobj(self, s3_key, file_obj):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "objeto")
+            resultado = self.download_file(s3_key, path)
+            if resultado["success"]:
+                with open(path, "rb") as handle:
+                    shutil.copyfileobj(handle, file_obj)
+            return resultado
+
+
+class LocalStorageBackend(_ObjectStoreBackend):
+    """
+    Almacena la media en disco bajo `root` (instalaciones on-prem de un solo
+    nodo). La key es la ruta relativa; la metadata va en un archivo
+    `<archivo>.meta.json` al lado. Las descargas son hard links (o copias).
+    """
+
+    backend_name = "local"
+    region = "local"
+    META_SUFFIX = ".meta.json"
+
+    def __init__(self, root, base_url=""):
+        self.root = os.path.abspath(root)
+        self.bucket_name = self.root
+        self.base_url = base_url
+
+    def create_bucket_if_not_exists(self):
+        os.makedirs(self.root, exist_ok=True)
+        return True
+
+    def generate_presigned_url(self, key, expiration=3600):
+        if not key:
+            return None
+        # Sin base_url no hay quien sirva el archivo: una ruta del servidor no
+        # es una URL para el cliente
+        if not self.base_url:
+            return None
+        return f"{self.base_url.rstrip('/')}/{key}"
+
+    def path_for(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError(f"Key outside storage root: {key}")
+        return path
+
+    def _put(self, key, file_obj, content_type, metadata):
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = f"{path}.partial-{uuid.uuid4().hex}"
+        try:
+            with open(partial, "wb") as handle:
+                if hasattr(file_obj, "chunks"):
+                    for chunk in file_obj.chunks():
+                        handle.write(chunk)
+                else:
+                    shutil.copyfileobj(file_obj, handle)
+            with open(path + self.META_SUFFIX, "w") as handle:
+                json.dump({"content_type": content_type, "metadata": metadata}, handle)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+    def _get(self, key, dest_path):
+        path = self.path_for(key)
+        if not os.path.isfile(path):
+            raise KeyError(key)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        try:
+            os.link(path, dest_path)
+        except OSError:
+            shutil.copyfile(path, dest_path)
+
+    def _delete(self, key):
+        path = self.path_for(key)
+        if not os.path.isfile(path):
+            raise KeyError(key)
+        os.remove(path)
+        if os.path.exists(path + self.META_SUFFIX):
+            os.remove(path + self.META_SUFFIX)
+
+    def _objects(self, prefix):
+        base = self.path_for(prefix)
+        start = base if os.path.isdir(base) else os.path.dirname(base)
+        for dirpath, _dirnames, filenames in os.walk(start):
+            for name in filenames:
+                if name.endswith(self.META_SUFFIX) or ".partial-" in name:
+                    continue
+                path = os.path.join(dirpath, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if not key.startswith(prefix):
+                    continue
+                info = {}
+                try:
+                    with open(path + self.META_SUFFIX) as handle:
+                        info = json.load(handle)
+                except (OSError, ValueError):
+                    pass
+                stat = os.stat(path)
+                yield (
+                    key,
+                    stat.st_size,
+                    datetime.fromtimestamp(stat.st_mtime),
+                    info.get("content_type"),
+                    info.get("metadata", {}),
+                )
+
+
+class InMemoryStorageBackend(_ObjectStoreBackend):
+    """Backend en memoria del proceso, para tests y benchmarks offline."""
+
+    backend_name = "memory"
+    bucket_name = "memory"
+    region = "memory"
+
+    def __init__(self):
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def _put(self, key, file_obj, content_type, metadata):
+        if hasattr(file_obj, "chunks"):
+            data = b"".join(file_obj.chunks())
+        else:
+            data = file_obj.read()
+        with self._lock:
+            self.objects[key] = {
+                "data": data,
+                "content_type": content_type,
+                "metadata": metadata,
+                "last_modified": datetime.now(),
+            }
+
+    def _get(self, key, dest_path):
+        with self._lock:
+            data = self.objects[key]["data"]
+        with open(dest_path, "wb") as handle:
+            handle.write(data)
+
+    def _delete(self, key):
+        with self._lock:
+            del self.objects[key]
+
+    def _objects(self, prefix):
+        with self._lock:
+            items = sorted(self.objects.items())
+        for key, obj in items:
+            if key.startswith(prefix):
+                yield (
+                    key,
+                    len(obj["data"]),
+                    obj["last_modified"],
+                    obj["content_type"],
+                    obj["metadata"],
+                )
@@ -0,0 +1,95 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+
+from events.media_cache import MediaCache
+from events.s3_service import s3_service
+
+
+def _writer(content):
+    def download(path):
+        with open(path, "wb") as handle:
+            handle.write(content)
+
+    return download
+
+
+class MediaCacheTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+
+    def _dest(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def test_fetch_miss_then_hit(self):
+        cache = MediaCache(self.cache_dir, max_bytes=1024)
+        download = mock.Mock(side_effect=_writer(b"video"))
+
+        first = cache.fetch("media/a.webm", "etag-1", self._dest("a1.webm"), download)
+        second = cache.fetch("media/a.webm", "etag-1", self._dest("a2.webm"), download)
+
+        self.assertFalse(first)
+        self.assertTrue(second)
+        download.assert_called_once()
+        with open(self._dest("a2.webm"), "rb") as handle:
+            self.assertEqual(handle.read(), b"video")
+
+    def test_fetch_new_etag_is_a_miss(self):
+        cache = MediaCache(self.cache_dir, max_bytes=1024)
+        cache.fetch("media/a.webm", "etag-1", self._dest("a1.webm"), _writer(b"v1"))
+        hit = cache.fetch("media/a.webm", "etag-2", self._dest("a2.webm"), _writer(b"v2"))
+
+        self.assertFalse(hit)
+        with open(self._dest("a2.webm"), "rb") as handle:
+            self.assertEqual(handle.read(), b"v2")
+
+    def test_failed_download_leaves_no_entry(self):
+        cache = MediaCache(self.cache_dir, max_bytes=1024)
+
+        def broken(path):
+            with open(path, "wb") as handle:
+                handle.write(b"partial")
+            raise RuntimeError("network")
+
+        with self.assertRaises(RuntimeError):
+            cache.fetch("media/a.webm", "etag", self._dest("a.webm"), broken)
+
+        leftovers = [n for n in os.listdir(self.cache_dir) if not n.endswith(".lock")]
+        self.assertEqual(leftovers, [])
+
+    def test_evicts_least_recently_used(self):
+        cache = MediaCache(self.cache_dir, max_bytes=10)
+        cache.fetch("media/a.webm", "1", self._dest("a.webm"), _writer(b"aaaa"))
+        cache.fetch("media/b.webm", "1", self._dest("b.webm"), _writer(b"bbbb"))
+        a_entry = cache._entry_path("media/a.webm", "1")
+        b_entry = cache._entry_path("media/b.webm", "1")
+        os.utime(b_entry, (1, 1))
+        os.utime(a_entry, (2, 2))
+
+        cache.fetch("media/c.webm", "1", self._dest("c.webm"), _writer(b"cccc"))
+
+        self.assertTrue(os.path.exists(a_entry))
+        self.assertFalse(os.path.exists(b_entry))
+        self.assertTrue(os.path.exists(cache._entry_path("media/c.webm", "1")))
+
+    def test_s3_download_file_uses_cache(self):
+        dest = self._dest("local.webm")
+        with mock.patch.dict(
+            "os.environ", {"MEDIA_CACHE_DIR": self.cache_dir}
+        ), mock.patch.object(s3_service, "s3_client") as s3_client:
+            s3_client.head_object.return_value = {"ETag": '"abc"'}
+            s3_client.download_file.side_effect = lambda Bucket, Key, Filename, Config=None: _writer(
+                b"data"
+            )(Filename)
+            first = s3_service.download_file("media/key.webm", dest)
+            second = s3_service.download_file("media/key.webm", dest)
+
+        self.assertTrue(first["success"])
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertEqual(s3_client.download_file.call_count, 1)
+        self.assertTrue(os.path.exists(dest))
@@ -1,3 +1,6 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from io import BytesIO
 from unittest import mock
@@ -257,3 +260,98 @@ class S3ServiceTests(TestCase):
             result = s3_service.download_file("media/key", "local.file")
 
         self.assertFalse(result["success"])
+
+    def _large_file(self, size):
+        handle = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
+        handle.write(b"x" * size)
+        handle.close()
+        self.addCleanup(os.remove, handle.name)
+        return handle.name
+
+    def test_upload_large_media_retries_failed_part_only(self):
+        path = self._large_file(12 * 1024 * 1024)
+        progress = []
+        attempts = {}
+
+        def upload_part(**kwargs):
+            number = kwargs["PartNumber"]
+            attempts[number] = attempts.get(number, 0) + 1
+            if number == 2 and attempts[number] == 1:
+                raise ClientError({"Error": {"Code": "500"}}, "UploadPart")
+            return {"ETag": f"etag-{number}"}
+
+        with mock.patch.object(s3_service, "multipart_threshold", 5 * 1024 * 1024), \
+                mock.patch.object(s3_service, "multipart_chunksize", 5 * 1024 * 1024), \
+                mock.patch.object(s3_service, "s3_client") as s3_client, \
+                mock.patch.object(
+                    s3_service, "generate_presigned_url", return_value="http://signed"
+                ), mock.patch("events.s3_service.time.sleep"):
+            s3_client.create_multipart_upload.return_value = {"UploadId": "up-1"}
+            s3_client.upload_part.side_effect = upload_part
+            result = s3_service.upload_large_media(
+                path, 1, media_type="merged_video",
+                progress_callback=lambda sent, total: progress.append((sent, total)),
+            )
+
+        self.assertTrue(result["success"])
+        self.assertEqual(attempts, {1: 1, 2: 2, 3: 1})
+        parts = s3_client.complete_multipart_upload.call_args.kwargs[
+            "MultipartUpload"
+        ]["Parts"]
+        self.assertEqual([p["PartNumber"] for p in parts], [1, 2, 3])
+        self.assertEqual(progress[-1], (12 * 1024 * 1024, 12 * 1024 * 1024))
+        s3_client.abort_multipart_upload.assert_not_called()
+
+    def test_upload_large_media_aborts_after_exhausting_retries(self):
+        path = self._large_file(6 * 1024 * 1024)
+        with mock.patch.object(s3_service, "multipart_threshold", 5 * 1024 * 1024), \
+                mock.patch.object(s3_service, "multipart_chunksize", 5 * 1024 * 1024), \
+                mock.patch.object(s3_service, "s3_client") as s3_client, \
+                mock.patch("events.s3_service.time.sleep"):
+            s3_client.create_multipart_upload.return_value = {"UploadId": "up-2"}
+            s3_client.upload_part.side_effect = ClientError(
+                {"Error": {"Code": "500"}}, "UploadPart"
+            )
+            result = s3_service.upload_large_media(path, 1, media_type="merged_video")
+
+        self.assertFalse(result["success"])
+        s3_client.abort_multipart_upload.assert_called_once_with(
+            Bucket="bucket", Key=mock.ANY, UploadId="up-2"
+        )
+        s3_client.complete_multipart_upload.assert_not_called()
+
+    def test_upload_large_media_bounds_parts_in_flight_by_memory(self):
+        path = self._large_file(12 * 1024 * 1024)
+        with mock.patch.object(s3_service, "multipart_threshold", 5 * 1024 * 1024), \
+                mock.patch.object(s3_service, "multipart_chunksize", 5 * 1024 * 1024), \
+                mock.patch.object(s3_service, "multipart_memory", 10 * 1024 * 1024), \
+                mock.patch.object(s3_service, "part_retries", 1), \
+                mock.patch.object(s3_service, "s3_client") as s3_client, \
+                mock.patch.object(
+                    s3_service, "generate_presigned_url", return_value="http://signed"
+                ), mock.patch(
+                    "events.s3_service.ThreadPoolExecutor", wraps=ThreadPoolExecutor
+                ) as executor_mock:
+            s3_client.create_multipart_upload.return_value = {"UploadId": "up-3"}
+            s3_client.upload_part.return_value = {"ETag": "etag"}
+            result = s3_service.upload_large_media(path, 1, media_type="merged_video")
+
+        self.assertTrue(result["success"])
+        self.assertEqual(executor_mock.call_args.kwargs, {"max_workers": 2})
+        self.assertEqual(s3_client.upload_part.call_count, 3)
+
+    def test_part_retries_setting_is_at_least_one_attempt(self):
+        with mock.patch.dict("os.environ", {"S3_PART_RETRIES": "0"}), \
+                mock.patch("events.s3_service.boto3.client"):
+            self.assertEqual(S3Service().part_retries, 1)
+
+    def test_upload_large_media_small_file_single_request(self):
+        path = self._large_file(1024)
+        with mock.patch.object(s3_service, "s3_client") as s3_client, mock.patch.object(
+            s3_service, "generate_presigned_url", return_value="http://signed"
+        ):
+            result = s3_service.upload_large_media(path, 1, media_type="analysis_proxy")
+
+        self.assertTrue(result["success"])
+        s3_client.upload_fileobj.assert_called_once()
+        s3_client.create_multipart_upload.assert_not_called()
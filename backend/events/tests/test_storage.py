@@ -0,0 +1,162 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from events.s3_service import S3Service, get_storage_backend
+from events.storage import (
+    InMemoryStorageBackend,
+    LocalStorageBackend,
+    StorageBackend,
+    extract_s3_key,
+)
+
+
+class StorageBackendContractMixin:
+    def make_backend(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.backend = self.make_backend()
+
+    def test_upload_download_delete_roundtrip(self):
+        result = self.backend.upload_media_fragment(BytesIO(b"frame"), 7, "video")
+        self.assertTrue(result["success"])
+        self.assertTrue(result["key"].startswith("media/participant_events/7/"))
+        self.assertTrue(result["key"].endswith(".webm"))
+
+        dest = os.path.join(self.tmp, "out.webm")
+        self.assertTrue(self.backend.download_file(result["key"], dest)["success"])
+        with open(dest, "rb") as handle:
+            self.assertEqual(handle.read(), b"frame")
+
+        info = self.backend.get_media_fragment_info(result["key"])
+        self.assertEqual(info["size"], 5)
+        self.assertEqual(info["content_type"], "video/webm")
+        self.assertEqual(info["metadata"]["participant_event_id"], "7")
+
+        self.assertTrue(self.backend.delete_media_fragment(result["key"])["success"])
+        self.assertIsNone(self.backend.get_media_fragment_info(result["key"]))
+        self.assertFalse(self.backend.download_file(result["key"], dest)["success"])
+
+    def test_list_participant_media_filters(self):
+        self.backend.upload_media_fragment(BytesIO(b"a"), 1, "video")
+        self.backend.upload_media_fragment(BytesIO(b"b"), 1, "screen")
+        self.backend.upload_media_fragment(BytesIO(b"c"), 10, "video")
+
+        keys = [f["key"] for f in self.backend.list_participant_media(1)]
+        videos = self.backend.list_participant_media(1, media_type="video")
+
+        self.assertEqual(len(keys), 2)
+        self.assertTrue(all("/1/" in key for key in keys))
+        self.assertEqual([f["media_type"] for f in videos], ["video"])
+
+    def test_upload_large_media_reports_progress(self):
+        path = os.path.join(self.tmp, "merged.mp4")
+        with open(path, "wb") as handle:
+            handle.write(b"x" * 100)
+        progress = []
+
+        result = self.backend.upload_large_media(
+            path, 3, "merged_video", progress_callback=lambda *p: progress.append(p)
+        )
+
+        self.assertTrue(result["success"])
+        self.assertTrue(result["key"].endswith(".mp4"))
+        self.assertEqual(progress, [(100, 100)])
+
+    def test_presigned_upload_not_supported(self):
+        result = self.backend.generate_presigned_upload(1)
+        self.assertFalse(result["success"])
+
+
+class LocalStorageBackendTests(StorageBackendContractMixin, TestCase):
+    def make_backend(self):
+        return LocalStorageBackend(os.path.join(self.tmp, "store"))
+
+    def test_presigned_url_needs_base_url(self):
+        key = "media/participant_events/1/a.webm"
+        self.assertIsNone(self.backend.generate_presigned_url(key))
+        self.backend.base_url = "https://files.local/"
+        self.assertEqual(
+            self.backend.generate_presigned_url(key), f"https://files.local/{key}"
+        )
+
+    def test_rejects_keys_outside_root(self):
+        result = self.backend.download_file("../../etc/passwd", os.path.join(self.tmp, "x"))
+        self.assertFalse(result["success"])
+
+    def test_cleanup_old_fragments(self):
+        old = self.backend.upload_media_fragment(BytesIO(b"a"), 1, "video")["key"]
+        new = self.backend.upload_media_fragment(BytesIO(b"b"), 1, "video")["key"]
+        stamp = (datetime.now() - timedelta(days=40)).timestamp()
+        os.utime(self.backend.path_for(old), (stamp, stamp))
+
+        result = self.backend.cleanup_old_fragments(days_old=30)
+
+        self.assertEqual(result, {"deleted_count": 1, "errors": []})
+        self.assertIsNone(self.backend.get_media_fragment_info(old))
+        self.assertIsNotNone(self.backend.get_media_fragment_info(new))
+
+
+class StorageBackendInterfaceTests(SimpleTestCase):
+    def test_extract_s3_key(self):
+        url = (
+            "https://bucket.s3.us-east-1.amazonaws.com/media/file.webm?sig=123"
+        )
+        self.assertEqual(extract_s3_key(url), "media/file.webm")
+        self.assertEqual(extract_s3_key("media/file.webm"), "media/file.webm")
+        self.assertIsNone(extract_s3_key(None))
+
+    def test_backends_must_implement_the_interface(self):
+        class Incompleto(StorageBackend):
+            def is_configured(self):
+                return True
+
+        with self.assertRaises(TypeError):
+            Incompleto()
+
+
+class InMemoryStorageBackendTests(StorageBackendContractMixin, TestCase):
+    def make_backend(self):
+        return InMemoryStorageBackend()
+
+    def test_presigned_url_is_none(self):
+        key = self.backend.upload_media_fragment(BytesIO(b"a"), 1, "video")["key"]
+        self.assertIsNone(self.backend.generate_presigned_url(key))
+
+    @override_settings(
+        AWS_ACCESS_KEY_ID="AKIAEXAMPLE",
+        AWS_SECRET_ACCESS_KEY="secret-example",
+        AWS_STORAGE_BUCKET_NAME="bucket",
+        AWS_S3_REGION_NAME="us-east-1",
+    )
+    def test_setup_s3_check_config_skips_bucket_check(self):
+        out = StringIO()
+        with mock.patch(
+            "events.management.commands.setup_s3.s3_service", self.backend
+        ):
+            call_command("setup_s3", "--check-config", stdout=out)
+
+        self.assertIn("STORAGE_BACKEND=memory", out.getvalue())
+
+
+class StorageBackendFactoryTests(TestCase):
+    def test_selects_backend_from_env(self):
+        with mock.patch.dict("os.environ", {"STORAGE_BACKEND": "memory"}):
+            self.assertIsInstance(get_storage_backend(), InMemoryStorageBackend)
+        with mock.patch.dict(
+            "os.environ", {"STORAGE_BACKEND": "local", "LOCAL_STORAGE_ROOT": "/tmp/x"}
+        ):
+            backend = get_storage_backend()
+            self.assertIsInstance(backend, LocalStorageBackend)
+            self.assertEqual(backend.root, "/tmp/x")
+        with mock.patch.dict("os.environ", {"STORAGE_BACKEND": "s3"}):
+            self.assertIsInstance(get_storage_backend(), S3Service)
@@ -3,12 +3,15 @@ from datetime import timedelta
 from unittest import mock
 
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from authentication.models import CustomUser, UserRole
 from authentication.utils import generate_token
 from behavior_analysis.models import AnalisisComportamiento
+from behavior_analysis.resumen import registrar_log_en_resumen
 from events.models import (
     Event,
     Participant,
@@ -382,6 +385,194 @@ class EventsViewsTests(TestCase):
         payload = json.loads(response.content.decode("utf-8"))
         self.assertEqual(payload["event"]["id"], str(event.id))
 
+    def _listing_events(self, count, status="completado"):
+        base = timezone.now() - timedelta(days=30)
+        events = []
+        for idx in range(count):
+            start = base + timedelta(days=idx)
+            event = Event.objects.create(
+                name=f"Listing {status} {idx}",
+                description="Listing",
+                start_date=start,
+                close_date=start + timedelta(minutes=10),
+                end_date=start + timedelta(minutes=30),
+                duration=30,
+                evaluator=self.admin,
+                status=status,
+            )
+            participant = Participant.objects.create(
+                first_name="L",
+                last_name=str(idx),
+                name=f"L {idx}",
+                email=f"listing-{status}-{idx}@example.com",
+            )
+            participant_event = ParticipantEvent.objects.create(
+                event=event, participant=participant, is_monitoring=bool(idx % 2)
+            )
+            AnalisisComportamiento.objects.create(
+                participant_event=participant_event,
+                video_link="media/v.mp4",
+                status="completado",
+            )
+            events.append(event)
+        return events
+
+    def _get_listing(self, view, path, **params):
+        request = self.factory.get(path, params, **self._auth_headers())
+        response = view(request)
+        return response.status_code, json.loads(response.content.decode("utf-8"))
+
+    def test_event_listings_constant_queries(self):
+        self._listing_events(2)
+        queries = []
+        for view, path in (
+            (views.events, "/events/api/events"),
+            (views.evaluaciones, "/events/api/evaluations"),
+        ):
+            with CaptureQueriesContext(connection) as ctx:
+                self._get_listing(view, path, include="monitoring,analysis")
+            queries.append(len(ctx.captured_queries))
+
+        self._listing_events(5, status="en_progreso")
+        for idx, (view, path) in enumerate(
+            (
+                (views.events, "/events/api/events"),
+                (views.evaluaciones, "/events/api/evaluations"),
+            )
+        ):
+            with CaptureQueriesContext(connection) as ctx:
+                status, payload = self._get_listing(
+                    view, path, include="monitoring,analysis"
+                )
+            self.assertEqual(status, 200)
+            self.assertEqual(len(ctx.captured_queries), queries[idx])
+
+        listed = payload["evaluaciones"][0]
+        self.assertEqual(listed["participants"], 1)
+        self.assertEqual(listed["analysis"]["completado"], 1)
+        self.assertIsNone(listed["analysis"]["processing"])
+        self.assertIn("active", listed["monitoring"])
+
+    def test_event_listings_filters_and_keyset_pagination(self):
+        completed = self._listing_events(3)
+        in_progress = self._listing_events(2, status="en_progreso")
+
+        seen = []
+        params = {"status": "completado,en_progreso", "limit": 2}
+        while True:
+            status, payload = self._get_listing(
+                views.events, "/events/api/events", **params
+            )
+            self.assertEqual(status, 200)
+            seen.extend(event["id"] for event in payload["events"])
+            if not payload["next_cursor"]:
+                break
+            params["cursor"] = payload["next_cursor"]
+        self.assertEqual(
+            seen,
+            [e.id for e in sorted(completed + in_progress, key=lambda e: (e.start_date, e.id))],
+        )
+
+        status, payload = self._get_listing(
+            views.evaluaciones,
+            "/events/api/evaluations",
+            status="completado",
+            **{"from": completed[1].start_date.isoformat()},
+        )
+        self.assertEqual([e["id"] for e in payload["evaluaciones"]], [completed[1].id, completed[2].id])
+        self.assertIsNone(payload["next_cursor"])
+
+        status, _ = self._get_listing(
+            views.evaluaciones, "/events/api/evaluations", status="programado"
+        )
+        self.assertEqual(status, 400)
+        status, _ = self._get_listing(
+            views.events, "/events/api/events", limit=1, cursor="not-a-cursor"
+        )
+        self.assertEqual(status, 400)
+
+    def _roster_event(self):
+        now = timezone.now()
+        return Event.objects.create(
+            name="Roster Event",
+            description="Roster",
+            start_date=now - timedelta(minutes=5),
+            close_date=now + timedelta(minutes=5),
+            end_date=now + timedelta(minutes=30),
+            duration=30,
+            evaluator=self.admin,
+            status="en_progreso",
+        )
+
+    def _add_roster_participants(self, event, start, count):
+        for idx in range(start, start + count):
+            participant = Participant.objects.create(
+                first_name="Roster",
+                last_name=str(idx),
+                name=f"Roster {idx}",
+                email=f"roster-{idx}@example.com",
+            )
+            participant_event = ParticipantEvent.objects.create(
+                event=event, participant=participant, is_blocked=bool(idx % 2)
+            )
+            ParticipantLog.objects.create(
+                name="screen", message="s", participant_event=participant_event
+            )
+
+    def test_event_rosters_constant_queries(self):
+        event = self._roster_event()
+        self._add_roster_participants(event, 0, 2)
+        endpoints = (
+            (views.event_detail, f"/events/api/events/{event.id}"),
+            (views.evaluation_detail, f"/events/api/evaluations/{event.id}"),
+        )
+
+        def query_counts():
+            counts = []
+            for view, path in endpoints:
+                request = self.factory.get(
+                    path, {"include": "activity,analysis"}, **self._auth_headers()
+                )
+                with CaptureQueriesContext(connection) as ctx:
+                    response = view(request, event.id)
+                self.assertEqual(response.status_code, 200)
+                counts.append(len(ctx.captured_queries))
+            return counts
+
+        small = query_counts()
+        self._add_roster_participants(event, 2, 6)
+        self.assertEqual(query_counts(), small)
+
+    def test_event_roster_search_pagination_and_activity(self):
+        event = self._roster_event()
+        self._add_roster_participants(event, 0, 5)
+
+        seen = []
+        params = {"limit": 2, "include": "activity"}
+        while True:
+            request = self.factory.get(
+                f"/events/api/events/{event.id}", params, **self._auth_headers()
+            )
+            payload = json.loads(views.event_detail(request, event.id).content)
+            seen.extend(p["name"] for p in payload["event"]["participants"])
+            for participant in payload["event"]["participants"]:
+                self.assertEqual(participant["activity"]["total_screenshots"], 1)
+                self.assertIsNotNone(participant["activity"]["last_log_at"])
+            if not payload["event"]["participantsNextCursor"]:
+                break
+            params["cursor"] = payload["event"]["participantsNextCursor"]
+        self.assertEqual(seen, [f"Roster {idx}" for idx in range(5)])
+
+        request = self.factory.get(
+            f"/events/api/evaluations/{event.id}",
+            {"search": "roster-3@"},
+            **self._auth_headers(),
+        )
+        payload = json.loads(views.evaluation_detail(request, event.id).content)
+        self.assertEqual([p["name"] for p in payload["event"]["participants"]], ["Roster 3"])
+        self.assertTrue(payload["event"]["participants"][0]["is_blocked"])
+        self.assertNotIn("activity", payload["event"]["participants"][0])
+
     def test_event_participant_logs(self):
         now = timezone.now()
         event = Event.objects.create(
@@ -528,6 +719,47 @@ class EventsViewsTests(TestCase):
         ):
             response = views.log_participant_audio_video_event(request)
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(ParticipantLog.objects.get(url="media/key").size_bytes, 4)
+
+    def test_log_participant_audio_video_event_queues_fragment_analysis(self):
+        now = timezone.now()
+        event = Event.objects.create(
+            name="Incremental Event",
+            description="Media",
+            start_date=now,
+            close_date=now,
+            end_date=now,
+            duration=10,
+            evaluator=self.admin,
+            status="en_progreso",
+        )
+        participant = Participant.objects.create(
+            first_name="Inc",
+            last_name="User",
+            name="Inc User",
+            email="inc@example.com",
+        )
+        participant_event = ParticipantEvent.objects.create(
+            event=event, participant=participant, is_monitoring=True
+        )
+        request = self.factory.post(
+            "/events/api/logging/media/capture",
+            data=json.dumps({"s3_key": "media/fragment.webm"}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {participant_event.event_key}",
+        )
+        with mock.patch.dict(
+            "os.environ", {"ANALYSIS_INCREMENTAL": "true"}
+        ), mock.patch(
+            "events.views.s3_service.generate_presigned_url", return_value="signed"
+        ), mock.patch(
+            "behavior_analysis.tasks.analyze_fragment_task.delay"
+        ) as delay_mock, self.captureOnCommitCallbacks(execute=True):
+            response = views.log_participant_audio_video_event(request)
+
+        self.assertEqual(response.status_code, 200)
+        log = ParticipantLog.objects.get(url="media/fragment.webm")
+        delay_mock.assert_called_once_with(log.id)
 
     def test_notify_proxy_blocked_hosts_update(self):
         event = Event.objects.create(
@@ -853,6 +1085,99 @@ class EventsViewsTests(TestCase):
         self.assertEqual(payload["participant"]["id"], participant.id)
         self.assertTrue(payload["monitoring_is_active"])
 
+    def _snapshot(self, event, **params):
+        request = self.factory.get(
+            f"/events/api/events/{event.id}/monitoring/", params, **self._auth_headers()
+        )
+        response = views.event_monitoring_snapshot(request, event.id)
+        return response.status_code, json.loads(response.content.decode("utf-8"))
+
+    def test_event_monitoring_snapshot_constant_queries(self):
+        event = self._roster_event()
+        self._add_roster_participants(event, 0, 2)
+        ParticipantEvent.objects.filter(event=event, participant__name="Roster 0").update(
+            is_monitoring=True,
+            monitoring_current_session_time=timezone.now() - timedelta(seconds=90),
+            monitoring_total_duration=30,
+            monitoring_sessions_count=2,
+        )
+
+        with CaptureQueriesContext(connection) as small:
+            status, payload = self._snapshot(event)
+        self.assertEqual(status, 200)
+        first = payload["participants"][0]
+        self.assertTrue(first["monitoring_is_active"])
+        self.assertGreaterEqual(first["total_time_seconds"], 120)
+        self.assertEqual(first["monitoring_sessions_count"], 2)
+        self.assertIsNotNone(first["current_session_started_at"])
+        self.assertEqual(first["activity"]["total_screenshots"], 1)
+        self.assertTrue(payload["participants"][1]["is_blocked"])
+
+        self._add_roster_participants(event, 2, 6)
+        with CaptureQueriesContext(connection) as large:
+            status, payload = self._snapshot(event)
+        self.assertEqual(len(payload["participants"]), 8)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_event_monitoring_snapshot_since_returns_changes(self):
+        event = self._roster_event()
+        self._add_roster_participants(event, 0, 4)
+        past = timezone.now() - timedelta(hours=1)
+        ParticipantLog.objects.filter(participant_event__event=event).update(timestamp=past)
+        ParticipantEvent.objects.filter(event=event).update(monitoring_last_change=past)
+        since = (timezone.now() - timedelta(minutes=10)).isoformat()
+
+        status, payload = self._snapshot(event, since=since)
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["participants"], [])
+        self.assertIsNotNone(payload["cursor"])
+
+        logged = ParticipantEvent.objects.get(event=event, participant__name="Roster 2")
+        ParticipantLog.objects.create(name="http", message="h", participant_event=logged)
+        blocked = ParticipantEvent.objects.get(event=event, participant__name="Roster 3")
+        request = self.factory.post(
+            f"/events/api/events/{event.id}/participants/unblock",
+            data=json.dumps({"participant_ids": [blocked.participant_id]}),
+            content_type="application/json",
+            **self._auth_headers(),
+        )
+        views.unblock_participants(request, event.id)
+
+        status, payload = self._snapshot(event, since=since)
+        self.assertEqual(
+            [p["name"] for p in payload["participants"]], ["Roster 2", "Roster 3"]
+        )
+        self.assertEqual(payload["participants"][0]["activity"]["total_blocked_requests"], 1)
+        self.assertFalse(payload["participants"][1]["is_blocked"])
+
+        status, payload = self._snapshot(event, since=payload["cursor"])
+        self.assertEqual(status, 200)
+        self.assertTrue(payload["cursor"].endswith("Z"))
+
+        status, _ = self._snapshot(event, since="yesterday")
+        self.assertEqual(status, 400)
+
+    def test_event_monitoring_snapshot_reads_counters_from_resumen(self):
+        event = self._roster_event()
+        self._add_roster_participants(event, 0, 1)
+        participant_event = ParticipantEvent.objects.get(event=event)
+        registrar_log_en_resumen(participant_event.id, "screen")
+        ParticipantLog.objects.create(
+            name="proxy", message="p", participant_event=participant_event
+        )
+        registrar_log_en_resumen(participant_event.id, "proxy")
+
+        with CaptureQueriesContext(connection) as queries:
+            status, payload = self._snapshot(event)
+        self.assertEqual(status, 200)
+        activity = payload["participants"][0]["activity"]
+        self.assertEqual(activity["total_screenshots"], 1)
+        self.assertEqual(activity["total_proxy_disconnections"], 1)
+        self.assertIsNotNone(activity["last_log_at"])
+        self.assertFalse(
+            any("COUNT(" in query["sql"].upper() for query in queries.captured_queries)
+        )
+
     def test_participant_media_files_invalid_date_and_success(self):
         now = timezone.now()
         event = Event.objects.create(
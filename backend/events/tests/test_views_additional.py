@@ -213,14 +213,18 @@ class EventsViewsAdditionalTests(TestCase):
         )
         with mock.patch(
             "events.views.s3_service.generate_presigned_url", return_value="signed"
+        ), mock.patch(
+            "events.views.s3_service.get_media_fragment_info",
+            return_value={"size": 1234},
         ):
             response = views.log_participant_audio_video_event(request)
 
         self.assertEqual(response.status_code, 200)
-        self.assertTrue(
-            ParticipantLog.objects.filter(
+        self.assertEqual(
+            ParticipantLog.objects.get(
                 participant_event=participant_event, url="media/video"
-            ).exists()
+            ).size_bytes,
+            1234,
         )
 
     def test_log_participant_audio_video_event_missing_s3_key(self):
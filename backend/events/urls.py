@@ -21,6 +21,11 @@ urlpatterns = [
         "api/events/<int:event_id>/participants/<int:participant_id>/logs/",
         views.event_participant_logs,
     ),
+    path(
+        "api/events/<int:event_id>/monitoring/",
+        views.event_monitoring_snapshot,
+        name="event-monitoring-snapshot",
+    ),
     # Rutas para gestión de archivos multimedia en S3
     path(
         "api/events/<int:event_id>/participants/<int:participant_id>/media/",
@@ -14,11 +14,13 @@ from .models import (
     EventConsent,
 )
 from .s3_service import s3_service
+from .storage import extract_s3_key
 
 from django.views.decorators.csrf import csrf_exempt
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import Q
-from django.db.models import Max
+from django.db.models import Count, Exists, Max, OuterRef, Subquery
+from django.utils.dateparse import parse_date, parse_datetime
 from zoneinfo import ZoneInfo
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
@@ -38,7 +40,14 @@ import logging
 from django.utils import timezone
 from django.db import transaction
 logger = logging.getLogger(__name__)
-from behavior_analysis.models import AnalisisComportamiento
+from behavior_analysis.models import AnalisisComportamiento, UnionProgresiva
+from behavior_analysis.reportes import codificar_cursor, decodificar_cursor
+from behavior_analysis.resumen import (
+    CONTADORES_LOG,
+    contadores_actividad_por_participante,
+    registrar_log_en_resumen,
+    resumen_a_dict,
+)
 from events.tasks import delete_event_media_from_s3
 
 EVENT_EXPIRATION_DAYS = 182
@@ -137,14 +146,6 @@ def is_valid_domain(domain):
     return re.match(pattern, domain) is not None
 
 
-def _extract_s3_key(value):
-    if not value:
-        return None
-    if "amazonaws.com" in value:
-        return value.split(".amazonaws.com/")[-1].split("?")[0]
-    return value
-
-
 def _collect_event_media_keys(event_id):
     log_keys = (
         ParticipantLog.objects.filter(participant_event__event_id=event_id)
@@ -158,13 +159,23 @@ def _collect_event_media_keys(event_id):
         .exclude(video_link__exact="")
         .values_list("video_link", flat=True)
     )
+    proxy_keys = (
+        AnalisisComportamiento.objects.filter(participant_event__event_id=event_id)
+        .exclude(video_analisis_link__exact="")
+        .values_list("video_analisis_link", flat=True)
+    )
+    rolling_keys = (
+        UnionProgresiva.objects.filter(participant_event__event_id=event_id)
+        .exclude(video_key__exact="")
+        .values_list("video_key", flat=True)
+    )
     keys = set()
     for key in log_keys:
-        normalized = _extract_s3_key(key)
+        normalized = extract_s3_key(key)
         if normalized:
             keys.add(normalized)
-    for key in analysis_keys:
-        normalized = _extract_s3_key(key)
+    for key in list(analysis_keys) + list(proxy_keys) + list(rolling_keys):
+        normalized = extract_s3_key(key)
         if normalized:
             keys.add(normalized)
     return keys
@@ -294,6 +305,16 @@ def get_participant_event(event_key):
         return None
 
 
+def _media_size(s3_key):
+    """Tamaño de un objeto subido directo a S3; None si no se puede consultar."""
+    try:
+        info = s3_service.get_media_fragment_info(s3_key)
+    except Exception as e:
+        logger.warning(f"Could not read size of {s3_key}: {e}")
+        return None
+    return info.get("size") if info else None
+
+
 def _allow_upload_after_block(participant_event, now=None):
     if getattr(participant_event, "is_monitoring", False):
         return True
@@ -493,6 +514,7 @@ def log_participant_http_event(request: HttpRequest):
         ParticipantLog.objects.create(
             name=log_type, message=data["uri"], participant_event=participant_event
         )
+        registrar_log_en_resumen(participant_event.id, log_type)
         return JsonResponse({"status": "success"})
 
     except Exception as e:
@@ -648,6 +670,7 @@ def log_participant_screen_event(request: HttpRequest):
             message=f"{monitor_name}",
             participant_event=participant_event,
         )
+        registrar_log_en_resumen(participant_event.id, "screen")
         return JsonResponse(
             {
                 "status": "success",
@@ -678,9 +701,11 @@ def log_participant_audio_video_event(request: HttpRequest):
             return JsonResponse({"error": "Monitoring not started"}, status=403)
 
         s3_key = None
+        size_bytes = None
 
         if "media" in request.FILES:
             file = request.FILES["media"]
+            size_bytes = file.size
 
             # Subir archivo de audio/video a S3
             upload_result = s3_service.upload_media_fragment(
@@ -709,6 +734,8 @@ def log_participant_audio_video_event(request: HttpRequest):
             presigned_url = (
                 s3_service.generate_presigned_url(s3_key) if s3_key else None
             )
+            # Subida directa a S3: el tamaño sale del objeto ya subido
+            size_bytes = _media_size(s3_key) if s3_key else None
 
         if not s3_key:
             return JsonResponse(
@@ -717,12 +744,29 @@ def log_participant_audio_video_event(request: HttpRequest):
             )
 
         # Guardar el log con la URL de S3
-        ParticipantLog.objects.create(
+        media_log = ParticipantLog.objects.create(
             name="audio/video",
             url=s3_key,  # guardamos la key en el campo url
             message="Media Capture",
             participant_event=participant_event,
+            size_bytes=size_bytes,
+        )
+        registrar_log_en_resumen(participant_event.id, "audio/video")
+
+        # Analizar/unir el fragmento apenas llega para no concentrar la carga al final
+        from behavior_analysis.tasks import (
+            analyze_fragment_task,
+            incremental_enabled,
+            rolling_merge_enabled,
+            rolling_merge_task,
         )
+
+        if incremental_enabled():
+            transaction.on_commit(lambda: analyze_fragment_task.delay(media_log.id))
+        if rolling_merge_enabled():
+            transaction.on_commit(
+                lambda: rolling_merge_task.delay(participant_event.id)
+            )
         return JsonResponse(
             {
                 "status": "success",
@@ -1292,6 +1336,176 @@ def participant_detail(request, participant_id):
     return JsonResponse({"error": "Método no permitido"}, status=405)
 
 
+# Tamano maximo de pagina de los listados de eventos y participantes (?limit=)
+LISTADO_PAGINA_MAXIMA = 500
+
+
+def _fecha_de_listado(valor, fin=False):
+    """
+    Fecha del filtro `from`/`to` (ISO, fecha o fecha y hora). Una fecha sin
+    hora cubre el dia completo: `to=2024-05-31` incluye ese dia.
+    """
+    fecha = parse_datetime(valor)
+    if fecha is None:
+        dia = parse_date(valor)
+        if dia is None:
+            raise ValueError(f"Fecha inválida: {valor}")
+        fecha = datetime.combine(dia + timedelta(days=1) if fin else dia, datetime.min.time())
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+def _filtrar_eventos(queryset, request, estados_validos):
+    """Filtros `status` (separados por coma), `from` y `to` sobre start_date."""
+    estados = request.GET.get("status")
+    if estados:
+        estados = [estado.strip() for estado in estados.split(",") if estado.strip()]
+        invalidos = [estado for estado in estados if estado not in estados_validos]
+        if invalidos:
+            raise ValueError(f"Estado inválido: {', '.join(invalidos)}")
+        queryset = queryset.filter(status__in=estados)
+    desde = request.GET.get("from")
+    if desde:
+        queryset = queryset.filter(start_date__gte=_fecha_de_listado(desde))
+    hasta = request.GET.get("to")
+    if hasta:
+        queryset = queryset.filter(start_date__lt=_fecha_de_listado(hasta, fin=True))
+    return queryset
+
+
+def _incluidos(request):
+    """Agregados opcionales pedidos con `include=` (separados por coma)."""
+    return {parte.strip() for parte in request.GET.get("include", "").split(",")}
+
+
+def _anotar_eventos(queryset, request):
+    """
+    Anota el numero de participantes y, con `include=monitoring,analysis`,
+    los agregados de monitoreo y de estado del analisis, para que el listado
+    sea una sola consulta sin importar cuantos eventos haya.
+    """
+    incluir = _incluidos(request)
+    anotaciones = {"participant_count": Count("participant_events")}
+    if "monitoring" in incluir:
+        anotaciones["monitoring_active"] = Count(
+            "participant_events", filter=Q(participant_events__is_monitoring=True)
+        )
+        anotaciones["monitoring_blocked"] = Count(
+            "participant_events", filter=Q(participant_events__is_blocked=True)
+        )
+    if "analysis" in incluir:
+        for estado, _ in AnalisisComportamiento.STATUS_CHOICES:
+            anotaciones[f"analysis_{estado}"] = Count(
+                "participant_events",
+                filter=Q(participant_events__analisis_comportamiento__status=estado),
+            )
+        queryset = queryset.select_related("procesamiento_analisis")
+    return queryset.select_related("evaluator").annotate(**anotaciones), incluir
+
+
+def _agregados_evento(event, incluir):
+    datos = {}
+    if "monitoring" in incluir:
+        datos["monitoring"] = {
+            "active": event.monitoring_active,
+            "blocked": event.monitoring_blocked,
+        }
+    if "analysis" in incluir:
+        procesamiento = getattr(event, "procesamiento_analisis", None)
+        datos["analysis"] = {
+            estado: getattr(event, f"analysis_{estado}")
+            for estado, _ in AnalisisComportamiento.STATUS_CHOICES
+        }
+        datos["analysis"]["processing"] = procesamiento.status if procesamiento else None
+    return datos
+
+
+def _paginar_listado(queryset, request, campo, convertir=lambda valor: valor):
+    """
+    Con `limit`, pagina por (campo, id) usando `cursor`; sin `limit` retorna
+    todas las filas. `convertir` interpreta el valor del cursor. Retorna
+    (filas, next_cursor).
+    """
+    queryset = queryset.order_by(campo, "id")
+    limite = request.GET.get("limit")
+    if limite in (None, ""):
+        return list(queryset), None
+    limite = int(limite)
+    if limite < 1 or limite > LISTADO_PAGINA_MAXIMA:
+        raise ValueError(f"limit debe estar entre 1 y {LISTADO_PAGINA_MAXIMA}")
+    cursor = request.GET.get("cursor")
+    if cursor:
+        valor, id_ = decodificar_cursor(cursor)
+        try:
+            valor = convertir(valor)
+        except (TypeError, ValueError):
+            valor = None
+        if valor is None:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        queryset = queryset.filter(
+            Q(**{f"{campo}__gt": valor}) | Q(**{campo: valor, "id__gt": id_})
+        )
+    filas = list(queryset[: limite + 1])
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor(getattr(filas[-1], campo), filas[-1].id)
+    return filas, siguiente
+
+
+def _paginar_eventos(queryset, request):
+    return _paginar_listado(queryset, request, "start_date", parse_datetime)
+
+
+def _anotar_actividad(queryset):
+    """Ultimo log, total de logs y contadores por tipo de cada ParticipantEvent."""
+    return queryset.annotate(
+        last_log_at=Max("participantlog__timestamp"),
+        log_count=Count("participantlog"),
+        **{
+            campo: Count("participantlog", filter=Q(participantlog__name=nombre))
+            for nombre, campo in CONTADORES_LOG.items()
+        },
+    )
+
+
+def _roster_de_evento(event, request, incluir, relacionados=()):
+    """
+    ParticipantEvents del evento con su participante en una sola consulta,
+    filtrados por `search` (nombre o email), con `include=activity` (ultimo
+    log y conteos de logs por tipo) y paginados por participante con
+    `limit`/`cursor`. Retorna (participant_events, next_cursor).
+    """
+    queryset = ParticipantEvent.objects.filter(event=event).select_related(
+        "participant", *relacionados
+    )
+    busqueda = request.GET.get("search", "").strip()
+    if busqueda:
+        queryset = queryset.filter(
+            Q(participant__name__icontains=busqueda)
+            | Q(participant__email__icontains=busqueda)
+        )
+    if "activity" in incluir:
+        queryset = _anotar_actividad(queryset)
+    return _paginar_listado(queryset, request, "participant_id", int)
+
+
+def _actividad_participante(participant_event, incluir):
+    if "activity" not in incluir:
+        return {}
+    return {
+        "activity": {
+            "last_log_at": participant_event.last_log_at,
+            "log_count": participant_event.log_count,
+            **{
+                campo: getattr(participant_event, campo)
+                for campo in CONTADORES_LOG.values()
+            },
+        }
+    }
+
+
 @csrf_exempt
 @jwt_required()
 def events(request):
@@ -1306,16 +1520,23 @@ def events(request):
 
         # Filtrar eventos según rol: admin/superadmin -> todos, evaluator -> solo sus eventos
         if user_role in ("admin", "superadmin"):
-            events = Event.objects.all().order_by("start_date")
+            events = Event.objects.all()
         elif user_role == "evaluator":
-            events = Event.objects.filter(evaluator__id=user.id).order_by("start_date")
+            events = Event.objects.filter(evaluator__id=user.id)
         else:
             # Comportamiento por defecto (sin token o rol desconocido): listar todos
-            events = Event.objects.all().order_by("start_date")
+            events = Event.objects.all()
+
+        try:
+            events = _filtrar_eventos(events, request, dict(Event.STATUS_CHOICES))
+            events, incluir = _anotar_eventos(events, request)
+            events, next_cursor = _paginar_eventos(events, request)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
 
         events_data = []
         for event in events:
-            participant_count = Participant.objects.filter(events=event).count()
+            participant_count = event.participant_count
 
             # Formatear fecha y hora para el frontend
             date_str = event.start_date.strftime("%d/%m/%Y") if event.start_date else ""
@@ -1362,10 +1583,11 @@ def events(request):
                     "participants": participant_count,
                     "status": display_status,
                     "evaluator": evaluator_data,
+                    **_agregados_evento(event, incluir),
                 }
             )
 
-        return JsonResponse({"events": events_data})
+        return JsonResponse({"events": events_data, "next_cursor": next_cursor})
 
     elif request.method == "POST":
 
@@ -1674,36 +1896,42 @@ def event_detail(request, event_id):
         user_role = None
 
     try:
-        event = Event.objects.get(id=event_id)
+        event = Event.objects.select_related("evaluator").get(id=event_id)
     except Event.DoesNotExist:
         return JsonResponse({"error": "Evento no encontrado"}, status=404)
 
     if request.method == "GET":
-        # Obtener detalles del evento
-        participants = Participant.objects.filter(events=event)
+        # Roster en una sola consulta (con analisis si se pide include=analysis)
+        incluir = _incluidos(request)
+        try:
+            participant_events, next_cursor = _roster_de_evento(
+                event,
+                request,
+                incluir,
+                relacionados=("analisis_comportamiento",) if "analysis" in incluir else (),
+            )
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
         participants_data = []
 
-        for participant in participants:
-            # Obtener el ParticipantEvent para acceder a is_blocked
-            participant_event = ParticipantEvent.objects.filter(
-                event=event, participant=participant
-            ).first()
-
-            participants_data.append(
-                {
-                    "id": participant.id,
-                    "name": participant.name,
-                    "email": participant.email,
-                    "initials": participant.get_initials(),
-                    "color": f"bg-{['blue', 'green', 'purple', 'red', 'yellow', 'indigo', 'pink'][participant.id % 7]}-200",
-                    "is_blocked": (
-                        participant_event.is_blocked if participant_event else False
-                    ),
-                    "is_monitoring": (
-                        participant_event.is_monitoring if participant_event else False
-                    ),
-                }
-            )
+        for participant_event in participant_events:
+            participant = participant_event.participant
+            participant_data = {
+                "id": participant.id,
+                "name": participant.name,
+                "email": participant.email,
+                "initials": participant.get_initials(),
+                "color": f"bg-{['blue', 'green', 'purple', 'red', 'yellow', 'indigo', 'pink'][participant.id % 7]}-200",
+                "is_blocked": participant_event.is_blocked,
+                "is_monitoring": participant_event.is_monitoring,
+                **_actividad_participante(participant_event, incluir),
+            }
+            if "analysis" in incluir:
+                analisis = getattr(participant_event, "analisis_comportamiento", None)
+                participant_data["analysis_status"] = (
+                    analisis.status if analisis else "no_solicitado"
+                )
+            participants_data.append(participant_data)
 
         # Formatear hora para el frontend
         close_time_str = (
@@ -1746,6 +1974,7 @@ def event_detail(request, event_id):
             "evaluatorId": evaluator_id,
             "status": event.status,
             "participants": participants_data,
+            "participantsNextCursor": next_cursor,
             "endDate": end_date_str,
             "endTime": end_time_str,
             "blockedWebsites": blocked_websites,
@@ -2291,17 +2520,22 @@ def evaluaciones(request):
     # Filtrar eventos por estado
     estados = ["en_progreso", "completado"]
     if user_role in ("admin", "superadmin"):
-        eventos = Event.objects.filter(status__in=estados).order_by("start_date")
+        eventos = Event.objects.filter(status__in=estados)
     elif user_role == "evaluator":
-        eventos = Event.objects.filter(
-            status__in=estados, evaluator__id=user.id
-        ).order_by("start_date")
+        eventos = Event.objects.filter(status__in=estados, evaluator__id=user.id)
     else:
-        eventos = Event.objects.filter(status__in=estados).order_by("start_date")
+        eventos = Event.objects.filter(status__in=estados)
+
+    try:
+        eventos = _filtrar_eventos(eventos, request, estados)
+        eventos, incluir = _anotar_eventos(eventos, request)
+        eventos, next_cursor = _paginar_eventos(eventos, request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
     eventos_data = []
     for evento in eventos:
-        participant_count = Participant.objects.filter(events=evento).count()
+        participant_count = evento.participant_count
         eventos_data.append(
             {
                 "id": evento.id,
@@ -2327,10 +2561,11 @@ def evaluaciones(request):
                 ),
                 "participants": participant_count,
                 "status": evento.status,
+                **_agregados_evento(evento, incluir),
             }
         )
 
-    return JsonResponse({"evaluaciones": eventos_data})
+    return JsonResponse({"evaluaciones": eventos_data, "next_cursor": next_cursor})
 
 
 @csrf_exempt
@@ -2342,33 +2577,39 @@ def evaluation_detail(request, evaluation_id):
     Devuelve los datos en el formato de EvaluationDetail.
     """
     try:
-        event = Event.objects.get(id=evaluation_id)
+        event = Event.objects.select_related("evaluator").get(id=evaluation_id)
     except Event.DoesNotExist:
         return JsonResponse({"error": "Evaluación no encontrada"}, status=404)
 
-    participants = Participant.objects.filter(events=event)
+    # Una sola consulta: participante, resumen de analisis y estado del analisis
+    incluir = _incluidos(request)
+    try:
+        participant_events, next_cursor = _roster_de_evento(
+            event,
+            request,
+            incluir,
+            relacionados=("resumen_analisis", "analisis_comportamiento"),
+        )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
     participants_data = []
 
-    for p in participants:
-        # Obtener estado de monitoreo y bloqueo
-        monitoring_status = False
-        is_blocked_status = False
-
-        try:
-            participant_event = ParticipantEvent.objects.get(event=event, participant=p)
-            monitoring_status = getattr(participant_event, "is_monitoring", False)
-            is_blocked_status = getattr(participant_event, "is_blocked", False)
-        except ParticipantEvent.DoesNotExist:
-            pass
+    for participant_event in participant_events:
+        p = participant_event.participant
+        resumen = getattr(participant_event, "resumen_analisis", None)
+        analisis = getattr(participant_event, "analisis_comportamiento", None)
 
         participants_data.append(
             {
                 "id": str(p.id),
                 "name": p.name,
                 "initials": p.get_initials() if hasattr(p, "get_initials") else "",
-                "monitoring_is_active": monitoring_status,
-                "is_blocked": is_blocked_status,
+                "monitoring_is_active": participant_event.is_monitoring,
+                "is_blocked": participant_event.is_blocked,
                 "color": f"bg-{['blue', 'green', 'purple', 'red', 'yellow', 'indigo', 'pink'][p.id % 7]}-200",
+                "analysis_status": analisis.status if analisis else "no_solicitado",
+                "risk_indicators": resumen_a_dict(resumen) if resumen else None,
+                **_actividad_participante(participant_event, incluir),
             }
         )
 
@@ -2389,6 +2630,7 @@ def evaluation_detail(request, evaluation_id):
         "endTime": event.end_date.strftime("%H:%M") if event.end_date else "",
         "status": event.status,
         "participants": participants_data,
+        "participantsNextCursor": next_cursor,
         "evaluator": evaluator_name,
     }
 
@@ -2510,6 +2752,110 @@ def participant_connection_stats(request, event_id, participant_id):
         return JsonResponse({"error": str(e)}, status=500)
 
 
+# Solape del cursor `since`: cubre logs que se confirman mientras corre la consulta
+SNAPSHOT_SOLAPE_SEGUNDOS = 5
+
+
+@csrf_exempt
+@jwt_required()
+@require_GET
+def event_monitoring_snapshot(request, event_id):
+    """
+    Estado de monitoreo de todos los participantes de un evento en una
+    consulta: monitoreo activo, segundos acumulados (con la sesion actual),
+    sesiones, bloqueo, ultimo log y contadores de actividad. Los contadores
+    se leen del resumen del participante, sin agregar sus logs en cada poll.
+
+    Con `since` (el `cursor` de la respuesta anterior) solo incluye los
+    participantes cuyo estado de monitoreo cambio o que registraron logs
+    desde entonces. Los segundos de una sesion activa siguen creciendo sin
+    cambios: el cliente puede extrapolarlos desde `current_session_started_at`.
+    """
+    if not Event.objects.filter(id=event_id).exists():
+        return JsonResponse({"error": "Event not found"}, status=404)
+
+    since = request.GET.get("since")
+    if since:
+        since = parse_datetime(since)
+        if since is None:
+            return JsonResponse({"error": "Invalid since cursor"}, status=400)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+
+    now = timezone.now()
+    logs = ParticipantLog.objects.filter(participant_event=OuterRef("pk"))
+    participant_events = (
+        ParticipantEvent.objects.filter(event_id=event_id)
+        .select_related("participant", "resumen_analisis")
+        .annotate(
+            last_log_at=Subquery(logs.order_by("-timestamp").values("timestamp")[:1])
+        )
+    )
+    if since:
+        participant_events = participant_events.filter(
+            Q(monitoring_last_change__gte=since)
+            | Exists(logs.filter(timestamp__gte=since))
+        )
+    participant_events = list(participant_events.order_by("participant_id"))
+
+    # Los contadores salen del resumen; solo los participantes sin resumen
+    # (logs anteriores a el) se cuentan desde sus logs
+    sin_resumen = contadores_actividad_por_participante(
+        [
+            pe.id
+            for pe in participant_events
+            if getattr(pe, "resumen_analisis", None) is None
+        ]
+    )
+
+    participants_data = []
+    for participant_event in participant_events:
+        participant = participant_event.participant
+        resumen = getattr(participant_event, "resumen_analisis", None)
+        participants_data.append(
+            {
+                "id": participant.id,
+                "name": participant.name,
+                "email": participant.email,
+                "monitoring_is_active": participant_event.is_monitoring,
+                "is_blocked": participant_event.is_blocked,
+                "total_time_seconds": participant_event.get_total_monitoring_seconds(),
+                "current_session_started_at": (
+                    participant_event.monitoring_current_session_time
+                    if participant_event.is_monitoring
+                    else None
+                ),
+                "monitoring_last_change": participant_event.monitoring_last_change,
+                "monitoring_sessions_count": participant_event.monitoring_sessions_count,
+                "activity": {
+                    "last_log_at": participant_event.last_log_at,
+                    **{
+                        campo: (
+                            getattr(resumen, campo)
+                            if resumen is not None
+                            else sin_resumen.get(participant_event.id, {}).get(campo, 0)
+                        )
+                        for campo in CONTADORES_LOG.values()
+                    },
+                },
+            }
+        )
+
+    return JsonResponse(
+        {
+            "event_id": event_id,
+            "server_time": now,
+            "since": since,
+            # En UTC con "Z": un "+00:00" sin codificar llega como espacio en la query
+            "cursor": (now - timedelta(seconds=SNAPSHOT_SOLAPE_SEGUNDOS))
+            .isoformat()
+            .replace("+00:00", "Z"),
+            "participants": participants_data,
+        },
+        encoder=DjangoJSONEncoder,
+    )
+
+
 @csrf_exempt
 @jwt_required()
 @require_POST
@@ -3179,7 +3525,7 @@ def unblock_participants(request, event_id):
         # Desbloquear los participantes seleccionados
         unblocked_count = ParticipantEvent.objects.filter(
             event=event, participant_id__in=participant_ids
-        ).update(is_blocked=False)
+        ).update(is_blocked=False, monitoring_last_change=timezone.now())
 
         return JsonResponse(
             {
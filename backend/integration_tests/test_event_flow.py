@@ -132,14 +132,8 @@ class EventLifecycleIntegrationTests(TestCase):
                 status="completado",
             )
 
-        task_results = [
-            mock.Mock(id=f"task-{index}")
-            for index in range(1, len(participant_events) + 1)
-        ]
-        with mock.patch(
-            "behavior_analysis.tasks.process_participant_completion_task.delay",
-            side_effect=task_results,
-        ):
+        with mock.patch("behavior_analysis.tasks.chord") as chord_mock:
+            chord_mock.return_value.freeze.return_value = mock.Mock(id="event-task")
             response = self.client.post(
                 "/analysis/process-event-completion/",
                 data=json.dumps({"event_id": event_id}),